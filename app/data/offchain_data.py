@@ -3,11 +3,11 @@ import os
 from datetime import datetime
 from dotenv import load_dotenv
 from loguru import logger
-from pymongo import MongoClient
 
 from data.onchain_data import get_setup, get_location_id
 from util.csv import load_csv
 from util.excel import get_data
+from util.mongo import get_client
 from util.nanoid import generate_nanoid_deterministic
 
 DOT_ENV_PATH = 'server/.env'
@@ -109,7 +109,7 @@ def update_mongo(policies, locations):
         logger.warning(f"unexpeced MONGO_URL value '{mongo_url}': missing prefix 'mongodb://'. skipping mongodb refresh")
         return
 
-    client = MongoClient(mongo_url)
+    client = get_client(mongo_url)
 
     db_name = os.getenv('DB_NAME')
     if db_name is None or len(db_name) == 0:
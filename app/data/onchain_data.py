@@ -1,16 +1,37 @@
 import json
 import os
+import threading
+
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from loguru import logger
+from requests import Session
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 
+from web3utils.batch import batch_call, batch_call_mapping
+
 DOT_ENV_PATH = './server/.env'
 
 INFURA='Infura'
 ALCHEMY='Alchemy'
 NODE=ALCHEMY
 
+HTTP_POOL_SIZE=20
+
+# setup (web3 and contracts) per rpc node url and contract files/addresses,
+# created on first use and shared by all callers of the process
+SETUP_VARIABLES = [
+    'MAPPER_FILE', 'MAPPER_ADDRESS',
+    'PRODUCT_FILE', 'PRODUCT_ADDRESS',
+    'MODEL_FILE', 'MODEL_ADDRESS',
+    'INSTANCE_SERVICE_FILE', 'INSTANCE_SERVICE_ADDRESS']
+
+web3_cache = {}
+setup_cache = {}
+setup_lock = threading.RLock()
+
 # load .env file entries
 load_dotenv(DOT_ENV_PATH)
 
@@ -31,14 +52,23 @@ def help():
     print('name,year,start,end,index,source,trg_severe,trg_med,trg_low')
     print('')
 
-# connect to rpc node
+# connect to rpc node, connections are kept alive and reused
 def get_web3():
-    loaded = load_dotenv(DOT_ENV_PATH)
-    if not loaded:
-        logger.warning(f"failed to load .env file {DOT_ENV_PATH}, assuming variable are defined externally")
-    else:
-        logger.info(f".env file {DOT_ENV_PATH} successfully loaded")
+    rpc_url = get_rpc_url()
+
+    with setup_lock:
+        if rpc_url not in web3_cache:
+            logger.info(f"using {NODE} rpc node")
+            session = Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            web3_cache[rpc_url] = Web3(Web3.HTTPProvider(rpc_url, session=session))
+
+        return web3_cache[rpc_url]
 
+
+def get_rpc_url():
     endpoint = os.getenv('WEB3_INFURA_ENDPOINT')
     key = os.getenv('WEB3_INFURA_PROJECT_ID')
 
@@ -46,15 +76,11 @@ def get_web3():
         endpoint = os.getenv('WEB3_ALCHEMY_ENDPOINT')
         key = os.getenv('WEB3_ALCHEMY_PROJECT_ID')
 
-    logger.info(f"using {NODE} rpc node")
-    return Web3(Web3.HTTPProvider(f"{endpoint}/{key}"))
-    
+    return f"{endpoint}/{key}"
+
 # returns a web3 contract object given its abi file and contract address
 def get_contract(web3, contract_file_name, contract_address):
-    abi = None
-
-    with open(contract_file_name) as f:
-        abi = json.load(f)['abi']
+    abi = load_abi(contract_file_name)
 
     if abi is None:
         return None
@@ -63,20 +89,48 @@ def get_contract(web3, contract_file_name, contract_address):
             address=contract_address, 
             abi=abi)
 
+# parsed abi per contract file (abi lists are shared, do not modify)
+@lru_cache(maxsize=None)
+def load_abi(contract_file_name):
+    with open(contract_file_name) as f:
+        return json.load(f)['abi']
+
 # get polygon setup to query wfp contracts
+# a changed rpc url, contract file or address results in a new setup
 def get_setup():
-    web3 = get_web3()
-    mapper = get_contract(web3, os.getenv('MAPPER_FILE'), os.getenv('MAPPER_ADDRESS'))
-    product = get_contract(web3, os.getenv('PRODUCT_FILE'), os.getenv('PRODUCT_ADDRESS'))
-    model = get_contract(web3, os.getenv('MODEL_FILE'), os.getenv('MODEL_ADDRESS'))
-    instance_service = get_contract(web3, os.getenv('INSTANCE_SERVICE_FILE'), os.getenv('INSTANCE_SERVICE_ADDRESS'))
-
-    return (
-        web3,
-        mapper,
-        product,
-        model,
-        instance_service)
+    setup_key = (get_rpc_url(),) + tuple(os.getenv(variable) for variable in SETUP_VARIABLES)
+
+    with setup_lock:
+        if setup_key not in setup_cache:
+            logger.info(f"creating onchain setup")
+            web3 = get_web3()
+            mapper = get_contract(web3, os.getenv('MAPPER_FILE'), os.getenv('MAPPER_ADDRESS'))
+            product = get_contract(web3, os.getenv('PRODUCT_FILE'), os.getenv('PRODUCT_ADDRESS'))
+            model = get_contract(web3, os.getenv('MODEL_FILE'), os.getenv('MODEL_ADDRESS'))
+            instance_service = get_contract(web3, os.getenv('INSTANCE_SERVICE_FILE'), os.getenv('INSTANCE_SERVICE_ADDRESS'))
+
+            setup_cache[setup_key] = (
+                web3,
+                mapper,
+                product,
+                model,
+                instance_service)
+
+        return setup_cache[setup_key]
+
+# drop cached setups, web3 instances and abis, optionally re-reading the .env file
+def invalidate_setup(reload_env=True):
+    with setup_lock:
+        setup_cache.clear()
+        web3_cache.clear()
+        load_abi.cache_clear()
+
+    if reload_env:
+        loaded = load_dotenv(DOT_ENV_PATH, override=True)
+        if not loaded:
+            logger.warning(f"failed to load .env file {DOT_ENV_PATH}, assuming variable are defined externally")
+        else:
+            logger.info(f".env file {DOT_ENV_PATH} successfully loaded")
 
 
 def get_config(model, config_idx=0):
@@ -125,7 +179,7 @@ def get_risk(risk_id:str):
 
 def get_risks(page:int, items:int):
     logger.info(f"getting onchain risks for page {page} with items {items}...")
-    (_, _, _, model, _) = get_setup()
+    (w3, _, _, model, _) = get_setup()
 
     idx_start = (page - 1) * items
     idx_end = idx_start + items
@@ -137,13 +191,12 @@ def get_risks(page:int, items:int):
     if idx_end > risks_count:
         idx_end = risks_count
 
-    risks = []
-    for idx in range(idx_start, idx_end):
-        risk_id = to_hex(model.functions.getRiskId(idx).call())
-        logger.info(f"getting onchain risk {idx-idx_start+1}/{idx_end-idx_start} at {idx} {risk_id}")
-        risks.append(get_risk(risk_id))
+    # one batch for the risk ids, one batch for the risks of the page
+    risk_ids = batch_call(w3, [model.functions.getRiskId(idx) for idx in range(idx_start, idx_end)])
+    risks = batch_call(w3, [model.functions.getRisk(risk_id) for risk_id in risk_ids])
+    logger.info(f"obtained {len(risks)} onchain risks at {idx_start}..{idx_end-1}")
 
-    return risks
+    return [get_risk_dict(risk_id, risk) for (risk_id, risk) in zip(risk_ids, risks)]
 
 
 def get_config(config_id:str):
@@ -163,13 +216,10 @@ def get_configs(page:int, items:int):
     if num_configs > items:
         raise ValueError('too many items')
 
-    configs = []
-    for idx in range(num_configs):
-        config_id = model.functions.getConfigId(idx).call()
-        config = model.functions.getConfig(config_id).call()
-        configs.append(get_config_dict(config_id, config))
+    config_ids = batch_call(w3, [model.functions.getConfigId(idx) for idx in range(num_configs)])
+    configs = batch_call(w3, [model.functions.getConfig(config_id) for config_id in config_ids])
 
-    return configs
+    return [get_config_dict(config_id, config) for (config_id, config) in zip(config_ids, configs)]
 
 
 def get_risk_dict(risk_id, risk):
@@ -220,16 +270,23 @@ def get_onchain_onboarding_data(yelen_id:str) -> dict:
         return None
 
     (
-        _,
+        w3,
         mapper,
         product,
         model,
         instance_service
     ) = get_setup()
 
+    # calls are batched per dependency level, each level is a single round-trip
     yelen_num = int(yelen_id[4:])
     process_id = mapper.functions.getProcessId(yelen_num).call()
 
+    process_data = batch_call_mapping(w3, {
+        'application': instance_service.functions.getApplication(process_id),
+        'claims': instance_service.functions.claims(process_id),
+        'payouts': instance_service.functions.payouts(process_id),
+    })
+
     (
         application_state, 
         premium, 
@@ -237,7 +294,7 @@ def get_onchain_onboarding_data(yelen_id:str) -> dict:
         application_data, 
         application_created_at, 
         application_updated_at
-    ) = instance_service.functions.getApplication(process_id).call()
+    ) = process_data['application']
 
     (
         risk_id, 
@@ -248,10 +305,15 @@ def get_onchain_onboarding_data(yelen_id:str) -> dict:
         subscription_date
     ) = product.functions.decodeApplicationData(application_data).call()
 
+    risk_data = batch_call_mapping(w3, {
+        'beneficiary': model.functions.getBeneficiary(beneficiary_id),
+        'risk': model.functions.getRisk(risk_id),
+    })
+
     (
         beneficiary_wallet,
         beneficiary_sex
-    ) = model.functions.getBeneficiary(beneficiary_id).call()
+    ) = risk_data['beneficiary']
 
     (
         risk_valid, 
@@ -263,7 +325,7 @@ def get_onchain_onboarding_data(yelen_id:str) -> dict:
         is_final, 
         risk_created_at, 
         risk_updated_at
-    ) = model.functions.getRisk(risk_id).call()
+    ) = risk_data['risk']
 
     (
         config_valid,
@@ -283,8 +345,8 @@ def get_onchain_onboarding_data(yelen_id:str) -> dict:
         config_updated_at
     ) = model.functions.getConfig(config_id).call()
 
-    claims = instance_service.functions.claims(process_id).call()
-    payouts = instance_service.functions.payouts(process_id).call()
+    claims = process_data['claims']
+    payouts = process_data['payouts']
 
     onchain_policy_data = {
         'year': year,
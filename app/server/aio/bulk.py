@@ -0,0 +1,75 @@
+from pydantic import ValidationError
+
+from server.aio.mongo import create_many_in_collection
+from server.aio.reference import get_missing_references
+from server.model.bulk import BulkResult
+from util.logging import get_logger
+
+# setup for module
+logger = get_logger()
+
+
+async def create_in_collection_bulk(rows, cls_in, cls, batch_size: int, prepare = None) -> list[BulkResult]:
+    """Validates and creates the provided rows batch by batch.
+
+    rows: async iterable of dicts to be validated against cls_in
+    prepare: optional coroutine converting a list of validated cls_in objects into the objects to persist
+
+    References declared on cls_in are verified with a single query per referenced collection and batch.
+    """
+    if batch_size <= 0:
+        raise ValueError(f"batch size {batch_size} invalid, must be positive")
+
+    results = []
+    batch = []
+    row = 0
+
+    async for data in rows:
+        batch.append((row, data))
+        row += 1
+
+        if len(batch) >= batch_size:
+            results.extend(await _create_batch(batch, cls_in, cls, prepare))
+            batch = []
+
+    if len(batch) > 0:
+        results.extend(await _create_batch(batch, cls_in, cls, prepare))
+
+    created = len([result for result in results if result.error is None])
+    logger.info(f"bulk create {created} of {len(results)} rows created for {cls.__name__}")
+
+    return results
+
+
+async def _create_batch(batch: list, cls_in, cls, prepare) -> list[BulkResult]:
+    results = {}
+    models = {}
+
+    # validate rows
+    for (row, data) in batch:
+        if not isinstance(data, dict):
+            results[row] = BulkResult(row=row, error="row is not a valid json object")
+            continue
+
+        try:
+            models[row] = cls_in.model_validate(data)
+        except ValidationError as e:
+            results[row] = BulkResult(row=row, error=str(e))
+
+    # verify referenced documents exist
+    rows = list(models.keys())
+    for (row, error) in zip(rows, await get_missing_references(list(models.values()))):
+        if error is not None:
+            results[row] = BulkResult(row=row, error=error)
+            del models[row]
+
+    # persist remaining rows in a single round-trip
+    if len(models) > 0:
+        objs = list(models.values())
+        if prepare:
+            objs = await prepare(objs)
+
+        for (row, (document_id, error)) in zip(models.keys(), await create_many_in_collection(objs, cls)):
+            results[row] = BulkResult(row=row, id=document_id if error is None else None, error=error)
+
+    return [results[row] for (row, _) in batch]
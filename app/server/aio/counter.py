@@ -0,0 +1,98 @@
+import asyncio
+
+from pymongo import DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from server.aio.mongo import get_mongo_collection
+from server.config import settings
+from util.logging import get_logger
+
+# counters are stored in collection 'Counter', one document per counter:
+# { "_id": <counter name>, "value": <next index not yet reserved by any worker> }
+
+COUNTER_COLLECTION = "Counter"
+COUNTER_VALUE_ATTRIBUTE = "value"
+
+# setup for module
+logger = get_logger()
+
+
+class IndexAllocator:
+    """Hands out unique consecutive indices for an integer attribute of a collection.
+
+    Indices are reserved in blocks with an atomic $inc on the counter document,
+    the reserved block is then consumed locally without further round-trips.
+    Indices of a block not consumed before the worker stops are skipped.
+    """
+
+    def __init__(self, collection_name: str, attribute: str, base_index: int, block_size: int) -> None:
+        if block_size <= 0:
+            raise ValueError(f"block size {block_size} invalid, must be positive")
+
+        self.collection_name = collection_name
+        self.attribute = attribute
+        self.base_index = base_index
+        self.block_size = block_size
+        self.counter_name = f"{collection_name}.{attribute}"
+
+        self._next_index = 0
+        self._end_index = 0
+        self._initialized = False
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, count: int = 1) -> list[int]:
+        """Returns count unique indices in ascending order."""
+        if count <= 0:
+            return []
+
+        async with self._lock:
+            if not self._initialized:
+                await self._initialize()
+
+            indices = list(range(self._next_index, self._end_index))[:count]
+            self._next_index += len(indices)
+
+            missing = count - len(indices)
+            if missing > 0:
+                first_index = await self._reserve(max(missing, self.block_size))
+                indices.extend(range(first_index, first_index + missing))
+                self._next_index = first_index + missing
+
+            return indices
+
+    async def _reserve(self, size: int) -> int:
+        counters = await get_mongo_collection(COUNTER_COLLECTION)
+        counter = await counters.find_one_and_update(
+            {settings.MONGO_ID_ATTRIBUTE: self.counter_name},
+            {"$inc": {COUNTER_VALUE_ATTRIBUTE: size}},
+            return_document=ReturnDocument.AFTER)
+
+        self._end_index = counter[COUNTER_VALUE_ATTRIBUTE]
+        first_index = self._end_index - size
+        logger.info(f"{self.counter_name} indices {first_index}..{self._end_index - 1} reserved")
+
+        return first_index
+
+    async def _initialize(self) -> None:
+        # the unique (partial) index guarding against duplicates is declared by the model
+        collection = await get_mongo_collection(self.collection_name)
+
+        # start counter after the largest index in use (existing data)
+        start_index = self.base_index
+        document = await collection.find_one(
+            {self.attribute: {"$type": "number"}},
+            {self.attribute: 1},
+            sort=[(self.attribute, DESCENDING)])
+
+        if document is not None:
+            start_index = max(start_index, document[self.attribute] + 1)
+
+        counters = await get_mongo_collection(COUNTER_COLLECTION)
+        try:
+            await counters.insert_one({settings.MONGO_ID_ATTRIBUTE: self.counter_name, COUNTER_VALUE_ATTRIBUTE: start_index})
+            logger.info(f"counter {self.counter_name} created with start index {start_index}")
+        except DuplicateKeyError:
+            # counter already created by another worker
+            pass
+
+        self._initialized = True
@@ -0,0 +1,331 @@
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from server.cache import document_cache, existence_cache
+from server.config import settings
+from server.error import NotFoundError, raise_with_log
+from server.mongo import (
+    CACHE_INVALIDATION_COLLECTION,
+    check_field_update,
+    encode_cursor,
+    get_collection_name_for_class,
+    get_collection_name_for_object,
+    get_cursor_filter,
+    get_field_update,
+    get_mongo_uri,
+    get_pool_options,
+    to_model
+)
+from util.logging import get_logger
+from util.mongo import (
+    get_async_client,
+    get_async_collection
+)
+from util.nanoid import generate_nanoid, is_valid_nanoid
+
+# async (non-blocking) variant of the server.mongo api.
+# function names and semantics match server.mongo, all functions
+# performing a round-trip to mongodb are coroutines.
+
+logger = get_logger()
+mongo_client_available = False
+mongo_client = None
+
+mongo_collections = {}
+change_streams_available = None
+
+
+async def count_documents(cls) -> int:
+    collection = await get_collection_for_class(cls)
+    return await collection.count_documents({})
+
+
+async def create_in_collection(obj, cls):
+    collection = await get_collection_for_object(obj)
+    document = obj.toMongoDict()
+    document_id = document[settings.MONGO_ID_ATTRIBUTE]
+
+    if not document_id or len(document_id) == 0:
+        document_id = generate_nanoid()
+        document[settings.MONGO_ID_ATTRIBUTE] = document_id
+
+    await collection.insert_one(document)
+    existence_cache.add(collection.name, [document_id])
+    document_cache.invalidate(collection.name, [document_id])
+    logger.info(f"document {document} for id {document_id} created in {collection.name}")
+    model = cls.fromMongoDict(document)
+    return model
+
+
+async def create_many_in_collection(objs: list, cls) -> list[tuple[str, str | None]]:
+    """Inserts the provided objects unordered in a single round-trip.
+
+    Returns the document id and the error message per object, the error is None for created documents."""
+    collection = await get_collection_for_class(cls)
+    documents = [obj.toMongoDict() for obj in objs]
+    errors = [None] * len(documents)
+
+    for document in documents:
+        if not document[settings.MONGO_ID_ATTRIBUTE]:
+            document[settings.MONGO_ID_ATTRIBUTE] = generate_nanoid()
+
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for write_error in e.details.get('writeErrors', []):
+            errors[write_error['index']] = write_error['errmsg']
+
+    existence_cache.add(collection.name, [document[settings.MONGO_ID_ATTRIBUTE] for (document, error) in zip(documents, errors) if error is None])
+
+    logger.info(f"{errors.count(None)} of {len(documents)} documents created in {collection.name}")
+    return [(document[settings.MONGO_ID_ATTRIBUTE], error) for (document, error) in zip(documents, errors)]
+
+
+async def get_existing_ids(collection_name: str, ids: set[str]) -> set[str]:
+    """Returns the subset of the provided ids with a document in the specified collection."""
+    if len(ids) == 0:
+        return set()
+
+    collection = await get_mongo_collection(collection_name)
+    id_attr = settings.MONGO_ID_ATTRIBUTE
+    result_set = collection.find({id_attr: {"$in": list(ids)}}, {id_attr: 1})
+    return {document[id_attr] async for document in result_set}
+
+
+async def find_in_collection(obj_id: str, cls, projection: dict | None = None, use_cache: bool = True):
+    if not is_valid_nanoid(obj_id):
+        raise_with_log(ValueError, f"id {obj_id} is not a valid nanoid");
+
+    collection_name = get_collection_name_for_class(cls)
+    cached = use_cache and document_cache.is_cached(collection_name) and projection is None
+    document = document_cache.get(collection_name, obj_id) if cached else None
+
+    if document is None:
+        collection = await get_collection_for_class(cls)
+        logger.info(f"fetching document with id {obj_id} from {collection.name}")
+        document = await collection.find_one({settings.MONGO_ID_ATTRIBUTE: obj_id}, projection)
+
+        if document is None:
+            raise_with_log(NotFoundError, f"no document found for id {obj_id} in collection {collection.name}")
+
+        if cached:
+            document_cache.put(collection.name, obj_id, document)
+
+    return to_model(cls, document, projection)
+
+
+async def update_in_collection(obj, cls):
+    collection = await get_collection_for_object(obj)
+    document = obj.toMongoDict()
+    document['_id'] = obj.id
+    document_id = document[settings.MONGO_ID_ATTRIBUTE]
+
+    if not document_id or len(document_id) == 0:
+        raise_with_log(ValueError, f"document id not set for update")
+
+    await collection.replace_one({settings.MONGO_ID_ATTRIBUTE: document_id}, document)
+    await invalidate_documents(collection.name, [document_id])
+    logger.info(f"document {document} for id {document_id} updated in {collection.name}")
+    model = cls.fromMongoDict(document)
+    return model
+
+
+async def update_fields_in_collection(obj, cls, check_updated_at: bool = False):
+    collection = await get_collection_for_object(obj)
+    (query, fields) = get_field_update(obj, check_updated_at)
+
+    if len(fields) == 0:
+        logger.info(f"document {obj.id} unchanged in {collection.name}")
+        return obj
+
+    result = await collection.update_one(query, {'$set': fields})
+    check_field_update(result, obj, collection.name, check_updated_at)
+
+    await invalidate_documents(collection.name, [obj.id])
+    obj.clearChanges()
+    logger.info(f"document {obj.id} fields {fields} updated in {collection.name}")
+    return obj
+
+
+async def get_list_of_models_in_collection(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
+    collection_name = get_collection_name_for_class(cls)
+    logger.info(f"fetching from {collection_name} page {page} items {items_per_page} after {after}")
+    result_set = await _get_list_as_result_set(cls, page, items_per_page, after, projection)
+
+    documents = []
+    async for document in result_set:
+        documents.append(to_model(cls, document, projection))
+
+    return documents
+
+
+async def get_filtered_list_of_models_in_collection(cls, filter, projection: dict | None = None):
+    collection_name = get_collection_name_for_class(cls)
+    logger.info(f"fetching from {collection_name} with filter {filter}")
+
+    collection = await get_collection_for_class(cls)
+    result_set = collection.find(filter, projection)
+    documents = []
+
+    async for document in result_set:
+        documents.append(to_model(cls, document, projection))
+
+    return documents
+
+
+async def get_list_of_dicts_in_collection(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
+    result_set = await _get_list_as_result_set(cls, page, items_per_page, after, projection)
+
+    documents = []
+    async for document in result_set:
+        document[settings.MODEL_ID_ATTRIBUTE] = document[settings.MONGO_ID_ATTRIBUTE]
+        del document[settings.MONGO_ID_ATTRIBUTE]
+        documents.append(document)
+
+    return documents
+
+
+async def get_dicts_iterator_in_collection(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
+    """Returns an async iterator over the (projected) documents of the requested page.
+
+    Paging arguments are validated before the iterator is returned, an items_per_page value of 0
+    iterates over the complete collection."""
+    result_set = await _get_list_as_result_set(cls, page, items_per_page, after, projection)
+    return _iterate_dicts(result_set.batch_size(settings.MODEL_CSV_CHUNK_ROWS))
+
+
+async def _iterate_dicts(result_set):
+    async for document in result_set:
+        document[settings.MODEL_ID_ATTRIBUTE] = document.pop(settings.MONGO_ID_ATTRIBUTE)
+        yield document
+
+
+async def get_next_cursor_in_collection(cls, page: int, items_per_page: int, after: str | None = None) -> str | None:
+    """Returns the cursor for the page following the requested page (after the provided cursor or by page number).
+
+    Only the _id index is scanned, the documents of the page itself are not fetched.
+    None if the requested page is not full (last page)."""
+    if items_per_page <= 0:
+        return None
+
+    collection = await get_collection_for_class(cls)
+
+    if after is not None:
+        (query, skip_count) = (get_cursor_filter(after), items_per_page - 1)
+    else:
+        (query, skip_count) = ({}, page * items_per_page - 1)
+
+    result_set = collection.find(query, {settings.MONGO_ID_ATTRIBUTE: 1}).sort(settings.MONGO_ID_ATTRIBUTE, 1).skip(skip_count).limit(1)
+
+    async for document in result_set:
+        return encode_cursor(document[settings.MONGO_ID_ATTRIBUTE])
+
+    return None
+
+
+async def _get_list_as_result_set(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
+    collection = await get_collection_for_class(cls)
+
+    # keyset pagination, no counting and skipping required
+    if after is not None:
+        logger.info(f"fetching documents from {collection.name}, after: {after}, items: {items_per_page}")
+        return collection.find(get_cursor_filter(after), projection).sort(settings.MONGO_ID_ATTRIBUTE, 1).limit(max(items_per_page, 0))
+
+    # no paging, full collection
+    if items_per_page <= 0:
+        logger.info(f"fetching all documents from {collection.name}")
+        return collection.find({}, projection)
+
+    logger.info(f"fetching documents from {collection.name}, page: {page}, items: {items_per_page}")
+
+    pages_count = int((await collection.count_documents({}) + items_per_page - 1) / items_per_page)
+    if page > 1 and page > pages_count:
+        raise_with_log(ValueError, f"page {page} > expected number of pages ({pages_count})")
+
+    # sorted by id, the last document of a page is the cursor for the following documents
+    skip_count = (page - 1) * items_per_page
+    return collection.find({}, projection).sort(settings.MONGO_ID_ATTRIBUTE, 1).skip(skip_count).limit(items_per_page)
+
+
+async def get_collection_for_object(obj):
+    collection_name = get_collection_name_for_object(obj)
+    return await get_mongo_collection(collection_name)
+
+async def get_collection_for_class(cls):
+    collection_name = get_collection_name_for_class(cls)
+    return await get_mongo_collection(collection_name)
+
+
+async def get_mongo_collection(collection_name: str):
+    global mongo_collections
+
+    if collection_name in mongo_collections:
+        logger.debug(f"fetching collection {collection_name} from cache")
+        return mongo_collections[collection_name]
+
+    client = get_mongo()
+    create_collection = settings.MONGO_CREATE_COLLECTIONS
+    collection = await get_async_collection(client, collection_name, create_collection)
+
+    if collection is not None:
+        mongo_collections[collection_name] = collection
+    else:
+        logger.error(f"failed to load collection {collection_name}")
+
+    return collection
+
+
+async def invalidate_documents(collection_name: str, document_ids = None) -> None:
+    if not document_cache.is_cached(collection_name):
+        return
+
+    document_cache.invalidate(collection_name, document_ids)
+
+    if not await has_change_streams():
+        collection = await get_invalidation_collection()
+        await collection.insert_one({
+            'collection': collection_name,
+            'ids': list(document_ids) if document_ids is not None else None})
+
+
+async def has_change_streams() -> bool:
+    global change_streams_available
+
+    if change_streams_available is None:
+        hello = await get_mongo().admin.command('hello')
+        change_streams_available = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+
+    return change_streams_available
+
+
+async def get_invalidation_collection():
+    if CACHE_INVALIDATION_COLLECTION in mongo_collections:
+        return mongo_collections[CACHE_INVALIDATION_COLLECTION]
+
+    db = get_mongo().get_database()
+    try:
+        await db.create_collection(CACHE_INVALIDATION_COLLECTION, capped=True, size=settings.MONGO_CACHE_INVALIDATION_SIZE)
+        await db[CACHE_INVALIDATION_COLLECTION].insert_one({'collection': None, 'ids': []})
+    except CollectionInvalid:
+        pass
+
+    mongo_collections[CACHE_INVALIDATION_COLLECTION] = db[CACHE_INVALIDATION_COLLECTION]
+    return mongo_collections[CACHE_INVALIDATION_COLLECTION]
+
+
+def get_mongo() -> AsyncMongoClient:
+    global mongo_client_available
+    global mongo_client
+
+    if mongo_client_available:
+        logger.debug(f"fetching async mongo client from cache")
+        return mongo_client
+
+    logger.info(f"creating new async mongo client")
+    mongo_uri = get_mongo_uri()
+    mongo_client = get_async_client(mongo_uri, **get_pool_options())
+
+    if isinstance(mongo_client, AsyncMongoClient):
+        mongo_client_available = True
+
+    return mongo_client
@@ -0,0 +1,189 @@
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from server.aio.mongo import get_collection_for_class
+from server.cache import existence_cache
+from server.config import settings
+from server.error import raise_with_log
+from server.model.claim import ClaimOut
+from server.model.payout import PayoutOut
+from server.model.person import PersonOut
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import get_collection_name_for_class
+from util.logging import get_logger
+from util.nanoid import generate_nanoid
+
+# claims and payouts of a risk are created with a fixed number of round-trips:
+# one aggregation over the policies of the risk (amounts computed by mongodb,
+# existing claims/payouts and the beneficiary wallet joined via $lookup),
+# one bulk upsert of the missing claims (by policy id) and a lookup of their ids,
+# followed by one insert_many for the payouts.
+# policies with a payout are skipped, policies with a claim but no payout
+# (interrupted run) reuse the existing claim. the unique indexes on Claim.policyId
+# and Payout.policyId (see models) guard against concurrent runs.
+
+# setup for module
+logger = get_logger()
+
+
+async def process_risk_payouts(risk: RiskOut) -> dict:
+    """Creates the claims and payouts for all policies of the risk, returns a summary."""
+    if risk.finalPayout is None or risk.finalPayout < 0:
+        raise_with_log(ValueError, f"final payout {risk.finalPayout} of risk {risk.id} invalid")
+
+    policies = await get_collection_for_class(PolicyOut)
+    claims = await get_collection_for_class(ClaimOut)
+    payouts = await get_collection_for_class(PayoutOut)
+
+    rows = await (await policies.aggregate(get_pipeline(risk, claims.name, payouts.name))).to_list()
+
+    now = int(time.time())
+    claim_ids = {}
+    new_claims = []
+    payout_rows = []
+    skipped = 0
+
+    for row in rows:
+        if row['paid']:
+            skipped += 1
+            continue
+
+        if not row['claimAmount'] or row['claimAmount'] <= 0:
+            continue
+
+        policy_id = row[settings.MONGO_ID_ATTRIBUTE]
+        payout_rows.append(row)
+
+        if row['claimId']:
+            claim_ids[policy_id] = row['claimId']
+        else:
+            new_claims.append({
+                settings.MONGO_ID_ATTRIBUTE: generate_nanoid(),
+                'onChainId': "",
+                'policyId': policy_id,
+                'claimAmount': row['claimAmount'],
+                'paidAmount': row['claimAmount'],
+                'closedAt': now,
+                'createdAt': now,
+                'updatedAt': now,
+                'tx': None})
+
+    created_claims = await _upsert_claims(claims, new_claims)
+    claim_ids.update(await _get_claim_ids(claims, [claim['policyId'] for claim in new_claims]))
+
+    new_payouts = [
+        {
+            settings.MONGO_ID_ATTRIBUTE: generate_nanoid(),
+            'onChainId': "",
+            'policyId': row[settings.MONGO_ID_ATTRIBUTE],
+            'claimId': claim_ids[row[settings.MONGO_ID_ATTRIBUTE]],
+            'amount': row['claimAmount'],
+            'paidAt': now,
+            'beneficiary': row['beneficiary'] or "",
+            'createdAt': now,
+            'updatedAt': now
+        }
+        for row in payout_rows if row[settings.MONGO_ID_ATTRIBUTE] in claim_ids]
+
+    created_payouts = await _insert_many(payouts, new_payouts)
+
+    result = {
+        'riskId': risk.id,
+        'policies': len(rows),
+        'skipped': skipped,
+        'claims': created_claims,
+        'payouts': len(created_payouts),
+        'payoutAmount': sum(payout['amount'] for payout in created_payouts)
+    }
+
+    logger.info(f"risk {risk.id} processed {result}")
+    return result
+
+
+def get_pipeline(risk: RiskOut, claims_name: str, payouts_name: str) -> list[dict]:
+    """Returns the aggregation pipeline over the policies of the risk, one row per policy."""
+    id_attr = settings.MONGO_ID_ATTRIBUTE
+
+    return [
+        {'$match': {'riskId': risk.id}},
+        {'$lookup': {
+            'from': payouts_name,
+            'localField': id_attr,
+            'foreignField': 'policyId',
+            'pipeline': [{'$project': {id_attr: 1}}, {'$limit': 1}],
+            'as': 'payouts'}},
+        {'$lookup': {
+            'from': claims_name,
+            'localField': id_attr,
+            'foreignField': 'policyId',
+            'pipeline': [{'$project': {id_attr: 1}}, {'$limit': 1}],
+            'as': 'claims'}},
+        {'$lookup': {
+            'from': get_collection_name_for_class(PersonOut),
+            'localField': 'personId',
+            'foreignField': id_attr,
+            'pipeline': [{'$project': {id_attr: 0, 'wallet': 1}}],
+            'as': 'person'}},
+        {'$project': {
+            id_attr: 1,
+            'paid': {'$gt': [{'$size': '$payouts'}, 0]},
+            # $arrayElemAt of an empty array is missing, not null
+            'claimId': {'$ifNull': [{'$arrayElemAt': [f'$claims.{id_attr}', 0]}, None]},
+            'beneficiary': {'$ifNull': [{'$arrayElemAt': ['$person.wallet', 0]}, None]},
+            'claimAmount': {'$toLong': {'$round': [{'$multiply': ['$sumInsuredAmount', risk.finalPayout]}, 0]}}}}
+    ]
+
+
+async def _upsert_claims(collection, claims: list[dict]) -> int:
+    """Creates the claims of policies without claim, returns the number of created claims."""
+    if len(claims) == 0:
+        return 0
+
+    # policyId of the inserted claim is taken from the filter
+    operations = [
+        UpdateOne({'policyId': claim['policyId']}, {'$setOnInsert': {name: value for (name, value) in claim.items() if name != 'policyId'}}, upsert=True)
+        for claim in claims]
+
+    try:
+        result = await collection.bulk_write(operations, ordered=False)
+        upserted_ids = list(result.upserted_ids.values())
+    except BulkWriteError as e:
+        # claim created concurrently by another run
+        write_errors = e.details.get('writeErrors', [])
+        upserted_ids = [upserted['_id'] for upserted in e.details.get('upserted', [])]
+        logger.warning(f"{len(write_errors)} claims not created in {collection.name}: {write_errors[0]['errmsg']}")
+
+    existence_cache.add(collection.name, upserted_ids)
+    return len(upserted_ids)
+
+
+async def _get_claim_ids(collection, policy_ids: list[str]) -> dict:
+    """Returns the claim id per policy id."""
+    if len(policy_ids) == 0:
+        return {}
+
+    id_attr = settings.MONGO_ID_ATTRIBUTE
+    result_set = collection.find({'policyId': {'$in': policy_ids}}, {id_attr: 1, 'policyId': 1})
+    return {document['policyId']: document[id_attr] async for document in result_set}
+
+
+async def _insert_many(collection, documents: list[dict]) -> list[dict]:
+    """Inserts the documents unordered, returns the created documents."""
+    if len(documents) == 0:
+        return []
+
+    failed = set()
+
+    try:
+        await collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        write_errors = e.details.get('writeErrors', [])
+        failed = {write_error['index'] for write_error in write_errors}
+        logger.warning(f"{len(write_errors)} documents not created in {collection.name}: {write_errors[0]['errmsg']}")
+
+    created = [document for (index, document) in enumerate(documents) if index not in failed]
+    existence_cache.add(collection.name, [document[settings.MONGO_ID_ATTRIBUTE] for document in created])
+    return created
@@ -0,0 +1,56 @@
+from collections import defaultdict
+
+from server.aio.mongo import get_existing_ids
+from server.cache import existence_cache
+from server.error import raise_with_log
+from util.logging import get_logger
+
+# references to other documents are declared per inbound api model
+# in the class attribute 'references' (attribute name -> collection name).
+# they are verified here and not in pydantic validators, so documents
+# read back from mongo are hydrated without any additional round-trip.
+
+# setup for module
+logger = get_logger()
+
+
+async def verify_references(obj) -> None:
+    error = (await get_missing_references([obj]))[0]
+
+    if error is not None:
+        raise_with_log(ValueError, error)
+
+
+async def get_missing_references(objs: list) -> list[str | None]:
+    """Returns per object the error for the first reference to a missing document or None.
+
+    Ids are verified with a single query per referenced collection,
+    ids known to exist are served from the existence cache."""
+    ids_to_check = defaultdict(set)
+
+    for obj in objs:
+        for (attribute, collection_name) in get_references(obj).items():
+            document_id = getattr(obj, attribute)
+            if not existence_cache.contains(collection_name, document_id):
+                ids_to_check[collection_name].add(document_id)
+
+    missing_ids = {}
+    for (collection_name, document_ids) in ids_to_check.items():
+        existing_ids = await get_existing_ids(collection_name, document_ids)
+        existence_cache.add(collection_name, existing_ids)
+        missing_ids[collection_name] = document_ids - existing_ids
+
+    return [_get_missing_reference(obj, missing_ids) for obj in objs]
+
+
+def get_references(obj) -> dict[str, str]:
+    return getattr(obj, 'references', {})
+
+
+def _get_missing_reference(obj, missing_ids: dict) -> str | None:
+    for (attribute, collection_name) in get_references(obj).items():
+        document_id = getattr(obj, attribute)
+        if document_id in missing_ids.get(collection_name, set()):
+            return f"no {collection_name.lower()} found for id {document_id}"
+
+    return None
@@ -1,11 +1,11 @@
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
 from server.model.claim import ClaimOut
+from server.api.util import get_csv_response, get_json_list_response
 from server.config import settings
-from server.mongo import find_in_collection, get_list_of_models_in_collection, get_list_of_dicts_in_collection
+from server.aio.mongo import find_in_collection
 
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
 
 PATH_PREFIX = "/claim"
@@ -18,26 +18,27 @@ persons = {}
 
 @router.get("/{claim_id}", response_model=ClaimOut, response_description="Claim data obtained")
 async def get_claim(claim_id: str) -> ClaimOut:
-    return find_in_collection(claim_id, ClaimOut)
+    return await find_in_collection(claim_id, ClaimOut)
 
 
 @router.get("/all/json", response_model=list[ClaimOut], response_description="Claims obtained")
 async def get_all_claims(
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MONGO_DOCUMENTS_PER_PAGE,
+    after: str | None = None,
+    fields: str | None = None
 ):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(ClaimOut, page, items)
+    return await get_json_list_response(ClaimOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Claims csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Claims csv created")
 async def get_all_claims_csv(
     fields: str = settings.MODEL_CSV_CLAIM_FIELDS, 
     delimiter: str = settings.MODEL_CSV_DELIMITER,
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(ClaimOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(ClaimOut, fields, delimiter, page, items, after)
 
@@ -1,14 +1,14 @@
 from datetime import datetime
 
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
+from server.api.util import get_csv_response, get_json_list_response
 from server.config import settings
 from server.error import raise_with_log
 from server.model.config import ConfigIn, ConfigOut
-from server.mongo import create_in_collection, find_in_collection, get_list_of_models_in_collection, get_list_of_dicts_in_collection
+from server.aio.mongo import create_in_collection, find_in_collection
 
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
 
 PATH_PREFIX = "/config"
@@ -34,25 +34,26 @@ async def create_config(config: ConfigIn):
     document['seasonDays'] = (season_end - season_start).days + 1
     config = ConfigOut.fromMongoDict(document)
 
-    return create_in_collection(config, ConfigOut)
+    return await create_in_collection(config, ConfigOut)
 
 
 @router.get("/all/json", response_model=list[ConfigOut], response_description="Configs obtained")
 async def get_onchain_configs(
     page:int = 1, 
-    items:int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items:int = settings.MONGO_DOCUMENTS_PER_PAGE,
+    after: str | None = None,
+    fields: str | None = None
 ):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(ConfigOut, page, items)
+    return await get_json_list_response(ConfigOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Configs csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Configs csv created")
 async def get_configs_csv(
     fields:str = settings.MODEL_CSV_CONFIG_FIELDS, 
     delimiter:str = settings.MODEL_CSV_DELIMITER,
     page:int = 1, 
-    items:int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items:int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    configs = get_list_of_dicts_in_collection(ConfigOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, configs, delimiter)
+    return await get_csv_response(ConfigOut, fields, delimiter, page, items, after)
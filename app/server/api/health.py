@@ -1,8 +1,11 @@
 from fastapi.responses import JSONResponse
 from fastapi.routing import APIRouter
 
-from server.mongo import get_mongo
+from server.aio.mongo import get_mongo
+from server.cache import document_cache
+from server.sync.onchain import onchain
 from util.logging import get_logger
+from util.mongo import get_pool_stats
 
 PATH_PREFIX = "/health"
 TAGS = ["Health"]
@@ -24,7 +27,7 @@ async def get_health_ping() -> JSONResponse:
 @router.get("/ping_mongo", response_description="returns state and infor regarding mongodb client")
 async def get_health_ping_mongo() -> JSONResponse:
     logger.info(f"GET {PATH_PREFIX}/ping_mongo")
-    (status, database) = get_mongo_client_status()
+    (status, database) = await get_mongo_client_status()
     return JSONResponse(
         content = { 
             "status": status,
@@ -32,12 +35,33 @@ async def get_health_ping_mongo() -> JSONResponse:
         })
 
 
-def get_mongo_client_status() -> tuple[str, str]:
+async def get_mongo_client_status() -> tuple[str, str]:
     try:
         mongo = get_mongo()
         database = mongo.get_default_database().name
         logger.info(f"attempt to ping mongdb {database}")
-        mongo.admin.command('ping')
+        await mongo.admin.command('ping')
         return ("connected", database)
     except Exception as e:
-        return (f"error in connection: {e}", None)
\ No newline at end of file
+        return (f"error in connection: {e}", None)
+
+
+@router.get("/mongo_pool", response_description="returns the connection pool statistics of the shared mongodb clients")
+async def get_health_mongo_pool() -> JSONResponse:
+    logger.info(f"GET {PATH_PREFIX}/mongo_pool")
+    return JSONResponse(content = get_pool_stats())
+
+
+@router.get("/cache", response_description="returns the hit/miss statistics of the document cache")
+async def get_health_cache() -> JSONResponse:
+    logger.info(f"GET {PATH_PREFIX}/cache")
+    return JSONResponse(content = document_cache.get_stats())
+
+
+@router.get("/ping_onchain", response_description="returns whether the onchain handles (contracts, operator wallet) are resolved")
+async def get_health_ping_onchain() -> JSONResponse:
+    logger.info(f"GET {PATH_PREFIX}/ping_onchain")
+    return JSONResponse(
+        content = {
+            "ready": onchain.is_ready()
+        })
@@ -0,0 +1,16 @@
+from fastapi.routing import APIRouter
+
+from server.model.job import JobOut
+from server.queue import find_job
+from util.logging import get_logger
+
+PATH_PREFIX = "/jobs"
+TAGS = ["Job"]
+
+# setup for module
+logger = get_logger()
+router = APIRouter(prefix=PATH_PREFIX, tags=TAGS)
+
+@router.get("/{job_id}", response_model=JobOut, response_description="Job status obtained")
+async def get_job(job_id: str) -> JobOut:
+    return await find_job(job_id)
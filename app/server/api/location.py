@@ -1,11 +1,14 @@
-from fastapi.responses import FileResponse
+from fastapi import Request
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
+from server.aio.bulk import create_in_collection_bulk
+from server.api.util import get_csv_response, get_json_list_response, read_bulk_rows
 from server.config import settings
+from server.model.bulk import BulkResult
 from server.model.location import LocationIn, LocationOut
-from server.mongo import create_in_collection, find_in_collection, get_list_of_models_in_collection, get_list_of_dicts_in_collection
+from server.aio.mongo import create_in_collection, find_in_collection
 
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
 
 PATH_PREFIX = "/location"
@@ -18,38 +21,48 @@ router = APIRouter(prefix=PATH_PREFIX, tags=TAGS)
 @router.post("/", response_model=LocationOut, response_description="Location data created")
 async def create_location(location: LocationIn):
     logger.info(f"POST {PATH_PREFIX} {location}")
+    return await create_in_collection(to_location_out(location), LocationOut)
 
-    document = location.toMongoDict()
-    document['openstreetmap'] = f'https://www.openstreetmap.org/#map=14/{location.latitude}/{location.longitude}'
-    location = LocationOut.fromMongoDict(document)
 
-    return create_in_collection(location, LocationOut)
+@router.post("/bulk", response_model=list[BulkResult], response_description="Locations data created")
+async def create_locations(request: Request, batch_size: int = settings.MONGO_BULK_BATCH_SIZE) -> list[BulkResult]:
+    logger.info(f"POST {PATH_PREFIX}/bulk batch_size {batch_size}")
+
+    async def prepare(locations: list[LocationIn]) -> list[LocationOut]:
+        return [to_location_out(location) for location in locations]
+
+    return await create_in_collection_bulk(read_bulk_rows(request), LocationIn, LocationOut, batch_size, prepare)
 
 
 @router.get("/{location_id}", response_description="Location data obtained")
 async def get_single_location(location_id: str):
-    return find_in_collection(location_id, LocationOut)
+    return await find_in_collection(location_id, LocationOut)
 
 
 @router.get("/all/json", response_model=list[LocationOut], response_description="Locations obtained")
-async def get_all_locations(page: int = 1, items: int = settings.MONGO_DOCUMENTS_PER_PAGE):
+async def get_all_locations(page: int = 1, items: int = settings.MONGO_DOCUMENTS_PER_PAGE, after: str | None = None, fields: str | None = None):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(LocationOut, page, items)
+    return await get_json_list_response(LocationOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Locations csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Locations csv created")
 async def get_all_locations_csv(
     fields: str = settings.MODEL_CSV_LOCATION_FIELDS, 
     delimiter: str = settings.MODEL_CSV_DELIMITER,
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(LocationOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(LocationOut, fields, delimiter, page, items, after)
 
 
 @router.get("/all/pending", response_model=list[LocationOut], response_description="Locations obtained")
 async def get_all_locations_to_sync(page: int = 1, items: int = settings.MONGO_DOCUMENTS_PER_PAGE):
     logger.info(f"GET {PATH_PREFIX}/all/json")
     return get_new_locations()
+
+
+def to_location_out(location: LocationIn) -> LocationOut:
+    document = location.toMongoDict()
+    document['openstreetmap'] = f'https://www.openstreetmap.org/#map=14/{location.latitude}/{location.longitude}'
+    return LocationOut.fromMongoDict(document)
@@ -1,11 +1,11 @@
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
 from server.model.payout import PayoutOut
+from server.api.util import get_csv_response, get_json_list_response
 from server.config import settings
-from server.mongo import find_in_collection, get_list_of_models_in_collection, get_list_of_dicts_in_collection
+from server.aio.mongo import find_in_collection
 
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
 
 PATH_PREFIX = "/payout"
@@ -18,26 +18,27 @@ persons = {}
 
 @router.get("/{payout_id}", response_model=PayoutOut, response_description="Payout data obtained")
 async def get_payout(payout_id: str) -> PayoutOut:
-    return find_in_collection(payout_id, PayoutOut)
+    return await find_in_collection(payout_id, PayoutOut)
 
 
 @router.get("/all/json", response_model=list[PayoutOut], response_description="Payouts obtained")
 async def get_all_payouts(
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MONGO_DOCUMENTS_PER_PAGE,
+    after: str | None = None,
+    fields: str | None = None
 ):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(PayoutOut, page, items)
+    return await get_json_list_response(PayoutOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Payouts csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Payouts csv created")
 async def get_all_payouts_csv(
     fields: str = settings.MODEL_CSV_PAYOUT_FIELDS, 
     delimiter: str = settings.MODEL_CSV_DELIMITER,
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(PayoutOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(PayoutOut, fields, delimiter, page, items, after)
 
@@ -1,12 +1,21 @@
-from fastapi.responses import FileResponse
+from fastapi import Body, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
+from server.aio.bulk import create_in_collection_bulk
+from server.aio.counter import IndexAllocator
+from server.aio.reference import verify_references
+from server.api.util import get_csv_response, get_json_list_response, read_bulk_rows
 from server.config import settings
+from server.model.bulk import BulkResult
+from server.model.job import JobOut
 from server.model.person import PersonIn, PersonOut
-from server.mongo import count_documents, create_in_collection, find_in_collection, get_list_of_models_in_collection, get_list_of_dicts_in_collection
-from util.csv import write_csv_temp_file, get_field_list
+from server.aio.mongo import create_in_collection, find_in_collection
+from server.queue import JOB_PERSON_FUNDING, enqueue_job
 from util.logging import get_logger
-from web3utils.wallet import Wallet
+from util.nanoid import generate_nanoid
+from web3utils.derivation import derive_address
 
 
 PATH_PREFIX = "/person"
@@ -16,45 +25,82 @@ PERSON_BASE_INDEX = 100000
 # setup for module
 logger = get_logger()
 router = APIRouter(prefix=PATH_PREFIX, tags=TAGS)
-persons = {}
+wallet_indices = IndexAllocator("Person", "walletIndex", PERSON_BASE_INDEX, settings.WALLET_INDEX_BLOCK_SIZE)
 
 @router.post("/", response_model=PersonOut, response_description="Person data created")
 async def create_person(person: PersonIn) -> PersonOut:
+    await verify_references(person)
+
     # create unique wallet address for person
-    persons = count_documents(PersonOut)
-    wallet_index = PERSON_BASE_INDEX + persons
-    wallet = Wallet.from_mnemonic(settings.FARMER_WALLET_MNEMONIC, index=wallet_index)
+    wallet_index = (await wallet_indices.allocate())[0]
+    person_out = to_person_out(person, wallet_index)
+
+    return await create_in_collection(person_out, PersonOut)
+
+
+@router.post("/bulk", response_model=list[BulkResult], response_description="Persons data created")
+async def create_persons(request: Request, batch_size: int = settings.MONGO_BULK_BATCH_SIZE) -> list[BulkResult]:
+    logger.info(f"POST {PATH_PREFIX}/bulk batch_size {batch_size}")
+
+    async def prepare(persons: list[PersonIn]) -> list[PersonOut]:
+        indices = await wallet_indices.allocate(len(persons))
+        return await run_in_threadpool(to_persons_out, persons, indices)
+
+    return await create_in_collection_bulk(read_bulk_rows(request), PersonIn, PersonOut, batch_size, prepare)
 
-    # persist wallet info
-    person_dict = person.toMongoDict()
-    person_dict['walletIndex'] = wallet_index
-    person_dict['wallet'] = wallet.address
-    person_out = PersonOut.fromMongoDict(person_dict)
 
-    return create_in_collection(person_out, PersonOut)
+@router.post("/fund/bulk", response_model=JobOut, response_description="Farmer wallet funding job queued")
+async def fund_persons_onchain(
+    person_ids: list[str] | None = Body(default=None),
+    force: bool = False,
+    batch_size: int = settings.FUNDING_BATCH_SIZE,
+    max_in_flight: int = settings.SYNC_MAX_IN_FLIGHT_TXS
+) -> JobOut:
+    logger.info(f"POST {PATH_PREFIX}/fund/bulk persons {len(person_ids) if person_ids else 'unfunded'} force {force} batch_size {batch_size} max_in_flight {max_in_flight}")
+
+    # without ids the worker selects all persons not yet funded onchain
+    entity_id = generate_nanoid() if person_ids else "unfunded"
+    params = {"personIds": person_ids, "force": force, "batchSize": batch_size, "maxInFlight": max_in_flight}
+    return await enqueue_job(JOB_PERSON_FUNDING, entity_id, params)
 
 
 @router.get("/{person_id}", response_model=PersonOut, response_description="Person data obtained")
 async def get_person(person_id: str) -> PersonOut:
-    return find_in_collection(person_id, PersonOut)
+    return await find_in_collection(person_id, PersonOut)
 
 
 @router.get("/all/json", response_model=list[PersonOut], response_description="Persons obtained")
 async def get_all_persons(
     page:int = 1, 
-    items:int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items:int = settings.MONGO_DOCUMENTS_PER_PAGE,
+    after: str | None = None,
+    fields: str | None = None
 ):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(PersonOut, page, items)
+    return await get_json_list_response(PersonOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Locations csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Locations csv created")
 async def get_all_locations_csv(
     fields: str = settings.MODEL_CSV_PERSON_FIELDS, 
     delimiter: str = settings.MODEL_CSV_DELIMITER,
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(PersonOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(PersonOut, fields, delimiter, page, items, after)
+
+
+def to_person_out(person: PersonIn, wallet_index: int) -> PersonOut:
+    # address only, no account or vault needed
+    wallet_address = derive_address(settings.FARMER_WALLET_MNEMONIC, wallet_index)
+
+    # persist wallet info
+    person_dict = person.toMongoDict()
+    person_dict['walletIndex'] = wallet_index
+    person_dict['wallet'] = wallet_address
+    return PersonOut.fromMongoDict(person_dict)
+
+
+def to_persons_out(persons: list[PersonIn], wallet_indices: list[int]) -> list[PersonOut]:
+    return [to_person_out(person, wallet_index) for (person, wallet_index) in zip(persons, wallet_indices)]
@@ -1,17 +1,22 @@
 from typing import List
-from fastapi.responses import FileResponse
+from fastapi import Body, Request
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
+from server.aio.bulk import create_in_collection_bulk
+from server.aio.reference import verify_references
+from server.model.bulk import BulkResult
 from server.model.payout import PayoutOut
 from server.model.claim import ClaimOut
 from server.config import settings
-from server.api.util import verify_person_exists, verify_risk_exists
+from server.api.util import get_csv_response, get_json_list_response, read_bulk_rows
 from server.model.policy import PolicyIn, PolicyOut
-from server.mongo import create_in_collection, find_in_collection, get_collection_for_class, get_list_of_models_in_collection, get_list_of_dicts_in_collection
-from server.sync.policy import sync_policy_onchain
+from server.aio.mongo import create_in_collection, find_in_collection, get_filtered_list_of_models_in_collection
+from server.model.job import JobOut
+from server.queue import JOB_POLICY_SYNC, JOB_POLICY_SYNC_BULK, enqueue_job
 
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
+from util.nanoid import generate_nanoid
 
 PATH_PREFIX = "/policy"
 TAGS = ["Policy"]
@@ -22,48 +27,60 @@ router = APIRouter(prefix=PATH_PREFIX, tags=TAGS)
 
 @router.post("/", response_model=PolicyOut, response_description="Policy data created")
 async def create_policy(policy: PolicyIn) -> PolicyOut:
-    verify_person_exists(policy.personId)
-    verify_risk_exists(policy.riskId)
-    return create_in_collection(policy, PolicyOut)
+    await verify_references(policy)
+    return await create_in_collection(policy, PolicyOut)
 
-@router.post("/{policy_id}/sync", response_description="Policy synched onchain")
-async def create_policy_onchain(policy_id: str):
+@router.post("/bulk", response_model=list[BulkResult], response_description="Policies data created")
+async def create_policies(request: Request, batch_size: int = settings.MONGO_BULK_BATCH_SIZE) -> list[BulkResult]:
+    logger.info(f"POST {PATH_PREFIX}/bulk batch_size {batch_size}")
+    return await create_in_collection_bulk(read_bulk_rows(request), PolicyIn, PolicyOut, batch_size)
+
+@router.post("/sync/bulk", response_model=JobOut, response_description="Policies onchain sync job queued")
+async def create_policies_onchain(
+    policy_ids: list[str] | None = Body(default=None),
+    force: bool = False,
+    max_in_flight: int = settings.SYNC_MAX_IN_FLIGHT_TXS
+) -> JobOut:
+    logger.info(f"POST {PATH_PREFIX}/sync/bulk policies {len(policy_ids) if policy_ids else 'unsynched'} force {force} max_in_flight {max_in_flight}")
+
+    # without ids the worker selects all policies not yet synched onchain
+    entity_id = generate_nanoid() if policy_ids else "unsynched"
+    params = {"policyIds": policy_ids, "force": force, "maxInFlight": max_in_flight}
+    return await enqueue_job(JOB_POLICY_SYNC_BULK, entity_id, params)
+
+@router.post("/{policy_id}/sync", response_model=JobOut, response_description="Policy onchain sync job queued")
+async def create_policy_onchain(policy_id: str) -> JobOut:
     force = policy_id.endswith(":force")
     if force:
         policy_id = policy_id[:-6]
 
-    policy = find_in_collection(policy_id, PolicyOut)
-    sync_policy_onchain(policy, force)
+    policy = await find_in_collection(policy_id, PolicyOut)
+    return await enqueue_job(JOB_POLICY_SYNC, policy.id, {"force": force})
 
 @router.get("/{policy_id}", response_description="Policy data obtained")
 async def get_policy(policy_id: str):
-    return find_in_collection(policy_id, PolicyOut)
+    return await find_in_collection(policy_id, PolicyOut)
 
 @router.get("/{policy_id}/claims", summary="Get all claims for a policy", response_description="Policy claim data obtained")
 async def get_claims(policy_id: str) -> List[ClaimOut]:
-    claim_collection = get_collection_for_class(ClaimOut)
-    claims = claim_collection.find({"policyId": policy_id})
-    return [ClaimOut.fromMongoDict(c) for c in claims]
+    return await get_filtered_list_of_models_in_collection(ClaimOut, {"policyId": policy_id})
 
 @router.get("/{policy_id}/payouts", summary="Get all payouts for a policy", response_description="Policy payout data obtained")
 async def get_payouts(policy_id: str) -> List[PayoutOut]:
-    payout_collection = get_collection_for_class(PayoutOut)
-    payouts = payout_collection.find({"policyId": policy_id})
-    return [PayoutOut.fromMongoDict(p) for p in payouts]
+    return await get_filtered_list_of_models_in_collection(PayoutOut, {"policyId": policy_id})
 
 @router.get("/all/json", response_description="Policies data obtained")
-async def get_all_policies(page:int = 1, items:int = settings.MONGO_DOCUMENTS_PER_PAGE):
+async def get_all_policies(page:int = 1, items:int = settings.MONGO_DOCUMENTS_PER_PAGE, after: str | None = None, fields: str | None = None):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(PolicyOut, page, items)
+    return await get_json_list_response(PolicyOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Locations csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Locations csv created")
 async def get_all_locations_csv(
     fields: str = settings.MODEL_CSV_POLICY_FIELDS, 
     delimiter: str = settings.MODEL_CSV_DELIMITER,
     page: int = 1, 
-    items: int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items: int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(PolicyOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(PolicyOut, fields, delimiter, page, items, after)
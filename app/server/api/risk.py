@@ -1,19 +1,20 @@
-import time
-from fastapi.responses import FileResponse
+from fastapi import Request
+from fastapi.responses import StreamingResponse
 from fastapi.routing import APIRouter
 
-from server.model.payout import Payout, PayoutOut
-from server.model.person import PersonOut
-from server.model.claim import Claim, ClaimOut
-from server.model.policy import PolicyOut
+from server.aio.bulk import create_in_collection_bulk
+from server.aio.payout import process_risk_payouts
+from server.aio.reference import verify_references
+from server.model.bulk import BulkResult
+from server.api.util import get_csv_response, get_json_list_response, read_bulk_rows
 from server.config import settings
+from server.error import raise_with_log
 from server.model.risk import RiskIn, RiskUpdateIn, RiskOut, Risk, from_risk_in, update_risk
-from server.mongo import create_in_collection, find_in_collection, get_collection_for_class, get_list_of_models_in_collection, get_list_of_dicts_in_collection, update_in_collection
-from server.sync.risk import update_payout_factor_onchain, get_risk_id
-from server.sync.onchain import product
+from server.aio.mongo import create_in_collection, find_in_collection, update_fields_in_collection
+from server.model.job import JobOut
+from server.queue import JOB_RISK_PAYOUT_SYNC, enqueue_job
 
 from data.onchain_data import get_risk, get_risks
-from util.csv import write_csv_temp_file, get_field_list
 from util.logging import get_logger
 
 PATH_PREFIX = "/risk"
@@ -26,88 +27,63 @@ router = APIRouter(prefix=PATH_PREFIX, tags=TAGS)
 
 @router.post("/", response_model=RiskOut, response_description="Risk data created")
 async def create_risk(riskIn: RiskIn) -> RiskOut:
-    return create_in_collection(from_risk_in(riskIn), RiskOut)
+    await verify_references(riskIn)
+    return await create_in_collection(from_risk_in(riskIn), RiskOut)
+
+@router.post("/bulk", response_model=list[BulkResult], response_description="Risks data created")
+async def create_risks(request: Request, batch_size: int = settings.MONGO_BULK_BATCH_SIZE) -> list[BulkResult]:
+    logger.info(f"POST {PATH_PREFIX}/bulk batch_size {batch_size}")
+
+    async def prepare(risks: list[RiskIn]) -> list[Risk]:
+        return [from_risk_in(risk) for risk in risks]
+
+    return await create_in_collection_bulk(read_bulk_rows(request), RiskIn, RiskOut, batch_size, prepare)
 
 @router.put("/{risk_id}", response_model=RiskOut, response_description="Risk data updated")
 async def update_risk_data(riskUpdateIn: RiskUpdateIn) -> RiskOut:
-    risk = find_in_collection(riskUpdateIn.id, RiskOut)
+    await verify_references(riskUpdateIn)
+    # read-modify-write with updatedAt check, read the current document (not the cached one)
+    risk = await find_in_collection(riskUpdateIn.id, RiskOut, use_cache=False)
     risk = update_risk(risk, riskUpdateIn)
-    return update_in_collection(risk, RiskOut)
+    return await update_fields_in_collection(risk, RiskOut, check_updated_at=True)
 
-@router.put("/{risk_id}/sync", response_description="Payout factor updated")
-async def update_payout_fator(risk_id: str):
-    risk = find_in_collection(risk_id, RiskOut)
-    update_payout_factor_onchain(risk)
+@router.put("/{risk_id}/sync", response_model=JobOut, response_description="Payout factor update job queued")
+async def update_payout_fator(risk_id: str) -> JobOut:
+    risk = await find_in_collection(risk_id, RiskOut)
+    return await enqueue_job(JOB_RISK_PAYOUT_SYNC, risk.id)
 
 @router.post("/{risk_id}/process_policies", response_description="Policies processed")
-async def process_policies(risk_id: str) -> bool:
-    risk = find_in_collection(risk_id, RiskOut)
+async def process_policies(risk_id: str) -> dict:
+    risk = await find_in_collection(risk_id, RiskOut)
 
     if not risk.tx:
-        logger.error(f"risk {risk.id} not synched onchain")
-        return False
-    
-    risk_id_onchain = risk.risk_id
-    if not risk.risk_id:
-        risk_id_onchain = get_risk_id(product.w3, risk.tx)
-
-    logger.info(f"TODO implemnt policy processing")
-    return True
-
-    # TODO implement policy processing
-    # policies_collection = get_collection_for_class(PolicyOut)
-    # num_policies = policies_collection.count_documents({'riskId': risk_id})
-    # policies = policies_collection.find({'riskId': risk_id})
-    # logger.info(f"processing {num_policies} policies for risk {risk_id}")
-
-    # for p in policies:
-    #     policy = PolicyOut.fromMongoDict(p)
-    #     person = find_in_collection(policy.personId, PersonOut)
-    #     logger.info(f"processing policy {policy.id} for risk {risk_id}")
-    #     claim = Claim(
-    #         onChainId = "",
-    #         policyId = policy.id,
-    #         claimAmount = 1000,
-    #         paidAmount=1000,
-    #         closedAt=int(time.time()),
-    #         createdAt=int(time.time()),
-    #         updatedAt=int(time.time())
-    #     )
-    #     claim = create_in_collection(claim, ClaimOut)
-    #     payout = Payout(
-    #         onChainId = "",
-    #         policyId = policy.id,
-    #         claimId = claim.id,
-    #         amount = claim.claimAmount,
-    #         paidAt = claim.closedAt,
-    #         beneficiary = person.wallet,
-    #         createdAt = int(time.time()),
-    #         updatedAt = int(time.time())
-    #     )
-    #     create_in_collection(payout, PayoutOut)
+        raise_with_log(ValueError, f"risk {risk.id} not synched onchain")
+
+    return await process_risk_payouts(risk)
 
 
 @router.get("/{risk_id}", response_model=RiskOut, response_description="Risk data obtained")
 async def get_single_risk(risk_id: str) -> RiskOut:
-    return find_in_collection(risk_id, RiskOut)
+    return await find_in_collection(risk_id, RiskOut)
 
 
 @router.get("/all/json", response_model=list[RiskOut], response_description="Risks obtained")
 async def get_all_risks(
     page:int = 1, 
-    items:int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items:int = settings.MONGO_DOCUMENTS_PER_PAGE,
+    after: str | None = None,
+    fields: str | None = None
 ):
     logger.info(f"GET {PATH_PREFIX}/all/json")
-    return get_list_of_models_in_collection(RiskOut, page, items)
+    return await get_json_list_response(RiskOut, fields, page, items, after)
 
 
-@router.get("/all/csv", response_class=FileResponse, response_description="Risks csv created")
+@router.get("/all/csv", response_class=StreamingResponse, response_description="Risks csv created")
 async def get_onchain_risks_csv(
     fields:str = settings.MODEL_CSV_RISK_FIELDS, 
     delimiter:str = settings.MODEL_CSV_DELIMITER,
     page:int = 1, 
-    items:int = settings.MONGO_DOCUMENTS_PER_PAGE
+    items:int = settings.MODEL_CSV_ITEMS,
+    after: str | None = None
 ):
-    documents = get_list_of_dicts_in_collection(RiskOut, page, items)
-    field_list = get_field_list(fields)
-    return write_csv_temp_file(field_list, documents, delimiter)
+    return await get_csv_response(RiskOut, fields, delimiter, page, items, after)
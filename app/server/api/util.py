@@ -1,19 +1,101 @@
-from server.model.location import LocationOut
-from server.model.risk import RiskOut
-from server.model.person import PersonOut
-from server.mongo import find_in_collection
+import json
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+
+from server.config import settings
+from server.error import raise_with_log
+from server.aio.mongo import get_dicts_iterator_in_collection, get_list_of_dicts_in_collection, get_next_cursor_in_collection
+from server.mongo import get_collection_name_for_class, get_model_projection, get_next_cursor, get_projection
+from util.csv import get_field_list, stream_csv
 from util.logging import get_logger
 
 logger = get_logger()
 
-def verify_location_exists(location_id: str) -> None:
-    logger.info(f"verifying existence of location for id {location_id}")
-    find_in_collection(location_id, LocationOut)
+def get_cursor_headers(documents: list, items: int) -> dict:
+    """Returns the next cursor header for a full page (keyset or page number), clients continue with after=<cursor>."""
+    next_cursor = get_next_cursor(documents, items)
+    if next_cursor is None:
+        return {}
+
+    return {settings.MODEL_CURSOR_HEADER: next_cursor}
+
+
+async def get_json_list_response(cls, fields: str | None, page: int, items: int, after: str | None) -> Response:
+    """Returns the (projected) documents of the requested page as json array.
+
+    Documents are serialized as read from mongodb, without model hydration and response model
+    validation, restricted to the fields of the model class (see to_json_array).
+    Without fields all fields of the model class are returned."""
+    field_list = get_field_list(fields) if fields else None
+    projection = get_projection(field_list) if field_list else get_model_projection(cls)
+    documents = await get_list_of_dicts_in_collection(cls, page, items, after, projection)
+
+    return Response(
+        content=to_json_array(cls, documents, field_list),
+        media_type="application/json",
+        headers=get_cursor_headers(documents, items))
+
+
+def to_json_array(cls, documents: list[dict], field_list: list[str] | None = None) -> str:
+    """Returns the json array of the documents with the fields of the model class (or the listed fields of the model and the id).
+
+    Fields stored in mongodb but not part of the model are dropped, as with the response model of the routes."""
+    names = set(cls.model_fields.keys())
+    if field_list:
+        names &= set(field_list) | {settings.MODEL_ID_ATTRIBUTE}
+
+    return json.dumps(
+        [{name: value for (name, value) in document.items() if name in names} for document in documents],
+        separators=(",", ":"),
+        default=str)
+
+
+async def get_csv_response(cls, fields: str, delimiter: str, page: int, items: int, after: str | None) -> StreamingResponse:
+    field_list = get_field_list(fields)
+    documents = await get_dicts_iterator_in_collection(cls, page, items, after, get_projection(field_list))
+
+    file_name = f"{get_collection_name_for_class(cls).lower()}.csv"
+    headers = {"Content-Disposition": f"attachment; filename={file_name}"}
+
+    next_cursor = await get_next_cursor_in_collection(cls, page, items, after)
+    if next_cursor is not None:
+        headers[settings.MODEL_CURSOR_HEADER] = next_cursor
+
+    return StreamingResponse(
+        stream_csv(field_list, documents, delimiter, settings.MODEL_CSV_CHUNK_ROWS),
+        media_type="text/csv",
+        headers=headers)
+
+
+async def read_bulk_rows(request: Request):
+    """Yields the rows of a json array or a newline delimited json (ndjson) request body."""
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            lines = (buffer + chunk).split(b"\n")
+            buffer = lines.pop()
+
+            for line in lines:
+                if line.strip():
+                    yield _parse_ndjson_line(line)
+
+        if buffer.strip():
+            yield _parse_ndjson_line(buffer)
+
+        return
+
+    rows = await request.json()
+    if not isinstance(rows, list):
+        raise_with_log(ValueError, f"request body must be a json array or ndjson")
+
+    for row in rows:
+        yield row
 
-def verify_risk_exists(risk_id: str) -> None:
-    logger.info(f"verifying existence of risk for id {risk_id}")
-    find_in_collection(risk_id, RiskOut)
 
-def verify_person_exists(person_id: str) -> None:
-    logger.info(f"verifying existence of person for id {person_id}")
-    find_in_collection(person_id, PersonOut)
+def _parse_ndjson_line(line: bytes):
+    # invalid lines are reported per row and do not abort the request
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
@@ -1,4 +1,8 @@
-from fastapi import Request
+import asyncio
+import threading
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse, RedirectResponse
 
 from server.api.location import router as router_location
@@ -9,13 +13,38 @@ from server.api.config import router as router_config
 from server.api.claim import router as router_claim
 from server.api.payout import router as router_payout
 from server.api.health import router as router_health
+from server.api.job import router as router_job
 from server.config import settings
-from server.error import NotFoundError
+from server.error import ConflictError, NotFoundError
+from server.mongo import create_all_indexes, run_cache_invalidation_listener
+from server.sync.onchain import onchain
 from server.utils import create_app, include_router
 from util.logging import get_logger
+from web3utils.derivation import load_address_table
 
 logger = get_logger()
-app = create_app(settings)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # onchain handles are resolved lazily, warm up in the background so startup does not wait for the rpc node
+    if settings.ONCHAIN_WARM_UP:
+        app.state.onchain_warm_up = asyncio.create_task(asyncio.to_thread(onchain.warm_up))
+
+    # indexes declared by the models (idempotent), startup fails if an index cannot be created
+    if settings.MONGO_CREATE_INDEXES:
+        await asyncio.to_thread(create_all_indexes)
+
+    # cached seasons, locations and risks updated by other workers
+    if settings.MONGO_CACHE_INVALIDATION_LISTENER:
+        threading.Thread(target=run_cache_invalidation_listener, name="cache-invalidation", daemon=True).start()
+
+    yield
+
+app = create_app(settings, lifespan)
+
+# precomputed farmer wallet addresses
+if settings.FARMER_WALLET_ADDRESS_TABLE:
+    load_address_table(settings.FARMER_WALLET_ADDRESS_TABLE, settings.FARMER_WALLET_MNEMONIC)
 
 # link to api routers
 include_router(app, router_policy, "add policy api")
@@ -25,6 +54,7 @@ include_router(app, router_person, "add person api")
 include_router(app, router_location, "add location api")
 include_router(app, router_claim, "add claim api")
 include_router(app, router_payout, "add payout api")
+include_router(app, router_job, "add job api")
 # include_router(app, router_polygon, "add polygon api")
 include_router(app, router_health, "add health api")
 
@@ -44,6 +74,15 @@ async def not_found_error_handler(request: Request, exc: NotFoundError):
         },
     )
 
+@app.exception_handler(ConflictError)
+async def conflict_error_handler(request: Request, exc: ConflictError):
+    return JSONResponse(
+        status_code = 409,
+        content = {
+            "message": f"ConflictError: {str(exc)}"
+        },
+    )
+
 @app.exception_handler(ValueError)
 async def not_found_error_handler(request: Request, exc: ValueError):
     return JSONResponse(
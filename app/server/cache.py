@@ -0,0 +1,156 @@
+import threading
+import time
+
+from collections import OrderedDict
+from copy import deepcopy
+
+from server.config import settings
+from util.logging import get_logger
+
+# setup for module
+logger = get_logger()
+
+
+class ExistenceCache:
+    """Process wide cache of document ids known to exist, entries expire after ttl seconds.
+
+    Only positive lookups are cached, documents are never deleted by the api.
+    Missing ids are always looked up again so documents created by other
+    workers are visible immediately.
+    """
+
+    def __init__(self, ttl: int, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._expires_at = {}
+        self._lock = threading.Lock()
+
+    def contains(self, collection_name: str, document_id: str) -> bool:
+        key = (collection_name, document_id)
+
+        with self._lock:
+            expires_at = self._expires_at.get(key)
+            if expires_at is None:
+                return False
+
+            if expires_at < time.monotonic():
+                del self._expires_at[key]
+                return False
+
+            return True
+
+    def add(self, collection_name: str, document_ids) -> None:
+        expires_at = time.monotonic() + self.ttl
+
+        with self._lock:
+            for document_id in document_ids:
+                self._expires_at[(collection_name, document_id)] = expires_at
+
+            if len(self._expires_at) > self.max_size:
+                self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires_at.clear()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        self._expires_at = {key: expires_at for (key, expires_at) in self._expires_at.items() if expires_at >= now}
+
+        # drop oldest entries (insertion order) if still too large
+        excess = len(self._expires_at) - self.max_size
+        if excess > 0:
+            for key in list(self._expires_at.keys())[:excess]:
+                del self._expires_at[key]
+
+        logger.debug(f"existence cache evicted, {len(self._expires_at)} entries remaining")
+
+
+existence_cache = ExistenceCache(settings.MONGO_REFERENCE_CACHE_TTL, settings.MONGO_REFERENCE_CACHE_SIZE)
+
+
+class DocumentCache:
+    """Process wide read-through cache of documents of the configured collections.
+
+    Least recently used documents are evicted once max_size is reached, entries
+    expire after ttl seconds. Documents are copied on the way in and out, callers
+    may modify the returned documents. Writes invalidate the cached documents,
+    writes of other workers are seen via the invalidation listener (see server.mongo).
+    """
+
+    def __init__(self, collection_names: set[str], ttl: int, max_size: int) -> None:
+        self.collection_names = collection_names
+        self.ttl = ttl
+        self.max_size = max_size
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def is_cached(self, collection_name: str) -> bool:
+        return collection_name in self.collection_names
+
+    def get(self, collection_name: str, document_id: str) -> dict | None:
+        key = (collection_name, document_id)
+
+        with self._lock:
+            entry = self._documents.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self._documents[key]
+
+                self._counters['misses'] += 1
+                return None
+
+            self._documents.move_to_end(key)
+            self._counters['hits'] += 1
+            return deepcopy(entry[0])
+
+    def put(self, collection_name: str, document_id: str, document: dict) -> None:
+        if not self.is_cached(collection_name):
+            return
+
+        key = (collection_name, document_id)
+        entry = (deepcopy(document), time.monotonic() + self.ttl)
+
+        with self._lock:
+            self._documents[key] = entry
+            self._documents.move_to_end(key)
+
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def invalidate(self, collection_name: str, document_ids = None) -> None:
+        """Drops the specified documents, all documents of the collection if document_ids is None."""
+        if not self.is_cached(collection_name):
+            return
+
+        with self._lock:
+            if document_ids is None:
+                keys = [key for key in self._documents if key[0] == collection_name]
+            else:
+                keys = [(collection_name, document_id) for document_id in document_ids]
+
+            for key in keys:
+                if self._documents.pop(key, None) is not None:
+                    self._counters['invalidations'] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._documents.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._documents)
+
+        requests = stats['hits'] + stats['misses']
+        stats['hitRatio'] = round(stats['hits'] / requests, 4) if requests > 0 else None
+        stats['collections'] = sorted(self.collection_names)
+        return stats
+
+
+document_cache = DocumentCache(
+    {name.strip() for name in settings.MONGO_DOCUMENT_CACHE_COLLECTIONS.split(",") if name.strip()},
+    settings.MONGO_DOCUMENT_CACHE_TTL,
+    settings.MONGO_DOCUMENT_CACHE_SIZE)
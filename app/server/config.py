@@ -10,7 +10,10 @@ class Settings(BaseSettings):
 
     # model fields settings
     MODEL_ID_ATTRIBUTE: str = "id"
+    MODEL_CURSOR_HEADER: str = "X-Next-Cursor"
     MODEL_CSV_DELIMITER: str = ";"
+    MODEL_CSV_CHUNK_ROWS: int = 1000
+    MODEL_CSV_ITEMS: int = 0 # csv exports of the complete collection by default, items > 0 for paged exports
     MODEL_CSV_PERSON_FIELDS: str = "id,locationId,firstName,lastName,gender,mobilePhone,externalId,walletIndex,wallet"
     MODEL_CSV_LOCATION_FIELDS: str = "id,country,region,province,department,village,latitude,longitude,openstreetmap,coordinatesLevel"
     MODEL_CSV_POLICY_FIELDS: str = "id,personId,riskId,subscriptionDate,sumInsuredAmount,premiumAmount,nft,tx"
@@ -24,6 +27,12 @@ class Settings(BaseSettings):
     OPERATOR_WALLET_MNEMONIC: str | None = None
     OPERATOR_ACCOUNT_INDEX: int = 0 # for local testing, for prod set value to 2
 
+    # farmer wallet indices reserved per worker and round-trip
+    WALLET_INDEX_BLOCK_SIZE: int = 100
+
+    # optional precomputed farmer wallet addresses (see scripts/app/address_table.py)
+    FARMER_WALLET_ADDRESS_TABLE: str | None = None
+
     # farmer minimum funding amount
     FARMER_FUNDING_AMOUNT: int = 200000000000
     FARMER_ETH_FUNDING_AMOUNT: int = 0.005 * 10 ** 18
@@ -31,10 +40,38 @@ class Settings(BaseSettings):
     # smart contracs settings
     PRODUCT_CONTRACT_ADDRESS: str | None = None
     TOKEN_CONTRACT_ADDRESS: str | None = None
+    MULTISEND_CONTRACT_ADDRESS: str | None = None
 
     # onchain latitude longitude decimals
     LOCATION_DECIMALS: int = 6
 
+    # onchain sync settings (transactions sent before waiting for the oldest receipt)
+    SYNC_MAX_IN_FLIGHT_TXS: int = 20
+
+    # farmer funding settings (persons per multisend transaction)
+    FUNDING_BATCH_SIZE: int = 100
+
+    # job queue settings (scripts/app/worker.py)
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BACKOFF_SECONDS: int = 10
+    JOB_LOCK_TIMEOUT_SECONDS: int = 900
+    JOB_HEARTBEAT_INTERVAL_SECONDS: int = 60
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # log indexer settings (risk ids and policy nfts, started by scripts/app/worker.py)
+    INDEXER_ENABLED: bool = True
+    INDEXER_POLL_INTERVAL_SECONDS: float = 2.0
+    INDEXER_MAX_BLOCK_RANGE: int = 1000
+    INDEXER_CONFIRMATIONS: int = 0
+    INDEXER_START_BLOCK: int | None = None
+
+    # backfill settings (scripts/app/backfill.py, blocks per getLogs call and concurrent calls)
+    BACKFILL_CHUNK_SIZE: int = 2000
+    BACKFILL_WORKERS: int = 4
+
+    # resolve onchain handles in the background at api startup (otherwise on first use)
+    ONCHAIN_WARM_UP: bool = True
+
     # rpc node settings (default is local anvil node)
     RPC_NODE_URL: str | None = "http://127.0.0.1:8545"
 
@@ -44,7 +81,21 @@ class Settings(BaseSettings):
     # mongodb settings
     MONGO_ID_ATTRIBUTE: str = "_id"
     MONGO_CREATE_COLLECTIONS: bool = True
+    MONGO_CREATE_INDEXES: bool = True
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 5
+    MONGO_MAX_IDLE_TIME_MS: int = 60000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 10000
     MONGO_DOCUMENTS_PER_PAGE: int = 5
+    MONGO_VALIDATE_DOCUMENTS: bool = False
+    MONGO_BULK_BATCH_SIZE: int = 1000
+    MONGO_REFERENCE_CACHE_TTL: int = 300
+    MONGO_REFERENCE_CACHE_SIZE: int = 100000
+    MONGO_DOCUMENT_CACHE_COLLECTIONS: str = "Config,Location,Risk"
+    MONGO_DOCUMENT_CACHE_TTL: int = 60
+    MONGO_DOCUMENT_CACHE_SIZE: int = 10000
+    MONGO_CACHE_INVALIDATION_LISTENER: bool = True
+    MONGO_CACHE_INVALIDATION_SIZE: int = 1048576
 
     # loguru settings
     LOG_LEVEL: str = "INFO"
@@ -12,7 +12,19 @@ class NotFoundError(KeyError):
     pass
 
 
-def raise_with_log(error_class, error_message: str, level: str = WARNING):
+class ConflictError(Exception):
+    pass
+
+
+class IndexCreationError(Exception):
+    pass
+
+
+class SyncError(Exception):
+    pass
+
+
+def raise_with_log(error_class, error_message: str, level: str = WARNING, cause: Exception | None = None):
     current_frame = inspect.currentframe()
     outer_frame = inspect.getouterframes(current_frame)
 
@@ -29,4 +41,7 @@ def raise_with_log(error_class, error_message: str, level: str = WARNING):
     else:
         logger.warning(log_message)
 
+    if cause is not None:
+        raise error_class(error_message) from cause
+
     raise error_class(error_message)
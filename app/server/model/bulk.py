@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+EXAMPLE_OUT = {
+    "row": 0,
+    "id": "fXJ6Gwfgnw-C",
+    "error": None
+}
+
+class BulkResult(BaseModel):
+    row: int
+    id: str | None = Field(default=None)
+    error: str | None = Field(default=None)
+
+    class Config:
+        json_schema_extra = {
+            "example": EXAMPLE_OUT
+        }
@@ -0,0 +1,57 @@
+from typing import ClassVar
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from server.mongo import MongoModel
+
+EXAMPLE_OUT = {
+    "_id": "Vd4sRbD3Kq7n",
+    "type": "policy_sync",
+    "entityId": "7Zv4TZoBLxUi",
+    "key": "policy_sync:7Zv4TZoBLxUi",
+    "params": {"force": False},
+    "status": "done",
+    "attempts": 1,
+    "maxAttempts": 5,
+    "runAfter": 1700316957,
+    "lockedAt": 1700316958,
+    "lockedBy": "worker-1:4711",
+    "error": None,
+    "result": None,
+    "followUp": None,
+    "createdAt": 1700316957,
+    "updatedAt": 1700316972
+}
+
+class Job(MongoModel):
+    type: str
+    entityId: str
+    key: str
+    params: dict = Field(default={})
+    status: str
+    attempts: int = Field(default=0)
+    maxAttempts: int
+    runAfter: int
+    lockedAt: int | None = Field(default=None)
+    lockedBy: str | None = Field(default=None)
+    error: str | None = Field(default=None)
+    result: dict | None = Field(default=None)
+    followUp: dict | None = Field(default=None)
+    createdAt: int
+    updatedAt: int
+
+    # activeKey (type:entityId) is set while the job is queued or running,
+    # followUp holds the params of a forced job enqueued after this one (see server.queue)
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("activeKey", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("status", ASCENDING), ("runAfter", ASCENDING)])
+    ]
+
+
+class JobOut(Job):
+    _id: str
+    id: str = Field(default=None)
+
+    class Config:
+        json_schema_extra = {
+            "example": EXAMPLE_OUT
+        }
@@ -1,8 +1,8 @@
+from typing import ClassVar
 from pydantic import field_validator, Field
-from server.model.claim import ClaimOut
-from server.model.policy import PolicyOut
+from pymongo import ASCENDING, IndexModel
 from server.error import raise_with_log
-from server.mongo import MongoModel, get_collection_for_class
+from server.mongo import MongoModel
 from util.nanoid import is_valid_nanoid
 
 EXAMPLE_OUT = {
@@ -28,6 +28,16 @@ class Payout(MongoModel):
     createdAt: int
     updatedAt: int
 
+    references: ClassVar[dict[str, str]] = {
+        "policyId": "Policy",
+        "claimId": "Claim"
+    }
+
+    # one payout per policy (claim processing is idempotent)
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("policyId", ASCENDING)], unique=True)
+    ]
+
     @field_validator('policyId', 'claimId')
     @classmethod
     def id_must_be_nanoid(cls, v: str) -> str:
@@ -37,24 +47,6 @@ class Payout(MongoModel):
         
         return nanoid
 
-    @field_validator('policyId')
-    @classmethod
-    def policy_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(PolicyOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no policy found for id {nanoid}")
-        return nanoid
-    
-    @field_validator('claimId')
-    @classmethod
-    def claim_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(ClaimOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no claim found for id {nanoid}")
-        return nanoid
-
 
 class PayoutOut(Payout):
     id: str = Field(default=None)
@@ -1,5 +1,7 @@
 from copy import deepcopy
+from typing import ClassVar
 from pydantic import field_validator, Field
+from pymongo import ASCENDING, IndexModel
 
 from server.error import raise_with_log
 from server.mongo import MongoModel
@@ -29,6 +31,15 @@ class PersonIn(MongoModel):
     locationId: str
     externalId: str | None = Field(default=None)
 
+    references: ClassVar[dict[str, str]] = {
+        "locationId": "Location"
+    }
+
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("locationId", ASCENDING)]),
+        IndexModel([("externalId", ASCENDING)])
+    ]
+
     @field_validator('locationId')
     @classmethod
     def id_must_be_nanoid(cls, v: str) -> str:
@@ -71,6 +82,13 @@ class PersonOut(PersonIn):
     wallet: str = Field(default=None)
     tx: str | None = Field(default=None)
 
+    # wallet indices are unique, documents without wallet index are not indexed
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("walletIndex", ASCENDING)], unique=True, partialFilterExpression={"walletIndex": {"$type": "number"}}),
+        IndexModel([("wallet", ASCENDING)]),
+        IndexModel([("tx", ASCENDING)])
+    ]
+
     @field_validator('walletIndex')
     @classmethod
     def wallet_index_must_be_positive(cls, v: int) -> int:
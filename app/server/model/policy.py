@@ -1,5 +1,7 @@
 from copy import deepcopy
+from typing import ClassVar
 from pydantic import field_validator, Field
+from pymongo import ASCENDING, IndexModel
 
 from server.error import raise_with_log
 from server.mongo import MongoModel
@@ -33,6 +35,17 @@ class PolicyIn(MongoModel):
     sumInsuredAmount: float
     premiumAmount: float
 
+    references: ClassVar[dict[str, str]] = {
+        "personId": "Person",
+        "riskId": "Risk"
+    }
+
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("riskId", ASCENDING)]),
+        IndexModel([("personId", ASCENDING)]),
+        IndexModel([("externalId", ASCENDING)])
+    ]
+
     @field_validator('personId', 'riskId')
     @classmethod
     def id_must_be_nanoid(cls, v: str) -> str:
@@ -75,6 +88,10 @@ class PolicyOut(PolicyIn):
     nft: int | None = Field(default=None)
     tx: str | None = Field(default=None)
 
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("tx", ASCENDING)])
+    ]
+
     class Config:
         json_schema_extra = {
             "example": EXAMPLE_OUT
@@ -1,11 +1,11 @@
 from copy import deepcopy
+from typing import ClassVar
 from pydantic import field_validator, Field, BaseModel
+from pymongo import ASCENDING, IndexModel
 
 from server.config import settings
 from server.error import raise_with_log
-from server.model.location import LocationOut
-from server.model.config import ConfigOut
-from server.mongo import MongoModel, get_collection_for_class
+from server.mongo import MongoModel
 from util.nanoid import is_valid_nanoid
 import time
 
@@ -46,6 +46,11 @@ class RiskIn(BaseModel):
     startOfSeason: str
     endOfSeason: str
 
+    references: ClassVar[dict[str, str]] = {
+        "configId": "Config",
+        "locationId": "Location"
+    }
+
 
     @field_validator('configId', 'locationId')
     @classmethod
@@ -56,24 +61,6 @@ class RiskIn(BaseModel):
         
         return nanoid
 
-    @field_validator('locationId')
-    @classmethod
-    def location_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(LocationOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no location found for id {nanoid}")
-        return nanoid
-
-    @field_validator('configId')
-    @classmethod
-    def config_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(ConfigOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no config found for id {nanoid}")
-        return nanoid
-
     @field_validator('crop')
     @classmethod
     def crop_must_be_valid(cls, v: str) -> str:
@@ -97,16 +84,10 @@ class RiskUpdateIn(BaseModel):
     payout: float = Field(default=0.0)
     finalPayout: float = Field(default=0.0)
 
+    references: ClassVar[dict[str, str]] = {
+        "id": "Risk"
+    }
 
-    @field_validator('id')
-    @classmethod
-    def risk_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(Risk)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no risk found for id {nanoid}")
-        return nanoid
-    
     class Config:
         json_schema_extra = {
             "example": EXAMPLE_UPDATE_IN
@@ -131,6 +112,11 @@ class Risk(MongoModel):
     createdAt: int
     updatedAt: int
 
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("configId", ASCENDING)]),
+        IndexModel([("locationId", ASCENDING)])
+    ]
+
     @field_validator('configId', 'locationId')
     @classmethod
     def id_must_be_nanoid(cls, v: str) -> str:
@@ -140,24 +126,6 @@ class Risk(MongoModel):
         
         return nanoid
 
-    @field_validator('locationId')
-    @classmethod
-    def location_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(LocationOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no location found for id {nanoid}")
-        return nanoid
-
-    @field_validator('configId')
-    @classmethod
-    def config_must_exist(cls, v:str) -> str:
-        nanoid = v.strip()
-        collection = get_collection_for_class(ConfigOut)
-        if collection.count_documents({"_id": nanoid}) == 0:
-            raise_with_log(ValueError, f"no config found for id {nanoid}")
-        return nanoid
-
     @field_validator('crop')
     @classmethod
     def crop_must_be_valid(cls, v: str) -> str:
@@ -182,6 +150,10 @@ class RiskOut(Risk):
     tx: str | None = Field(default=None)
     risk_id: str | None = Field(default=None)
 
+    indexes: ClassVar[list[IndexModel]] = [
+        IndexModel([("tx", ASCENDING)])
+    ]
+
     class Config:
         json_schema_extra = {
             "example": EXAMPLE_OUT
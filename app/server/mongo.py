@@ -1,13 +1,19 @@
+import base64
+import binascii
 import sys
+import time
 
 from os import getenv
+from typing import ClassVar
 
 from fastapi import HTTPException
-from pydantic import BaseModel
-from pymongo import MongoClient
+from pydantic import BaseModel, PrivateAttr
+from pymongo import CursorType, IndexModel, MongoClient
+from pymongo.errors import CollectionInvalid, OperationFailure
 
+from server.cache import document_cache, existence_cache
 from server.config import settings
-from server.error import NotFoundError, raise_with_log
+from server.error import ERROR, ConflictError, IndexCreationError, NotFoundError, raise_with_log
 from util.logging import get_logger
 from util.mongo import (
     get_client,
@@ -17,7 +23,41 @@ from util.mongo import (
 )
 from util.nanoid import generate_nanoid, is_valid_nanoid
 
+# index specs per collection name, registered by the models (class variable indexes),
+# created once at startup of the api and the worker (see create_all_indexes)
+model_indexes: dict[str, dict[str, IndexModel]] = {}
+
+# duplicate keys reported per unique index that could not be created
+MAX_REPORTED_DUPLICATES = 10
+
+
 class MongoModel(BaseModel):
+    indexes: ClassVar[list[IndexModel]] = []
+
+    # original values of the fields set since the model was loaded (see update_fields_in_collection)
+    _changes: dict = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        register_indexes(get_collection_name_for_class(cls), cls.indexes)
+
+    def __setattr__(self, name, value) -> None:
+        if name in type(self).model_fields and name not in self._changes:
+            self._changes[name] = getattr(self, name, None)
+
+        super().__setattr__(name, value)
+
+    def getChangedFields(this) -> dict:
+        """Returns the fields with a value different from the loaded value (mongo representation)."""
+        names = {name for (name, original) in this._changes.items() if getattr(this, name, None) != original}
+        return this.model_dump(include=names) if len(names) > 0 else {}
+
+    def getLoadedValue(this, name: str):
+        return this._changes[name] if name in this._changes else getattr(this, name, None)
+
+    def clearChanges(this) -> None:
+        this._changes.clear()
 
     def toMongoDict(this) -> dict:
         model = this.dict()
@@ -29,7 +69,7 @@ class MongoModel(BaseModel):
         return model
 
     @classmethod
-    def fromMongoDict(cls, model:dict):
+    def fromMongoDict(cls, model:dict, validate:bool = True):
         if model is None:
             raise_with_log(ValueError, f"None not allowed as mongo dict model")
 
@@ -37,8 +77,14 @@ class MongoModel(BaseModel):
         if not id_attr in model:
             raise_with_log(ValueError, f"Id attribugte '{id_attr}' missing in dict")
 
-        modelOut = cls(**model)
+        if validate:
+            modelOut = cls(**model)
+        else:
+            # trusted (already validated) documents, fields missing in projected documents are left unset
+            modelOut = cls.model_construct(**model)
+
         modelOut.id = model[id_attr]
+        modelOut.clearChanges()
         return modelOut
 
 logger = get_logger()
@@ -47,6 +93,13 @@ mongo_client = None
 
 mongo_collections = {}
 
+# documents of collections in the document cache changed by other workers are
+# invalidated via a change stream (replica set) or, without replica set, via
+# invalidation messages tailed from a capped collection
+CACHE_INVALIDATION_COLLECTION = "CacheInvalidation"
+UPDATED_AT_ATTRIBUTE = "updatedAt"
+change_streams_available = None
+
 
 def count_documents(cls) -> int:
     collection = get_collection_for_class(cls)
@@ -63,23 +116,33 @@ def create_in_collection(obj, cls):
         document[settings.MONGO_ID_ATTRIBUTE] = document_id
 
     collection.insert_one(document)
+    existence_cache.add(collection.name, [document_id])
+    document_cache.invalidate(collection.name, [document_id])
     logger.info(f"document {document} for id {document_id} created in {collection.name}")
     model = cls.fromMongoDict(document)
     return model
 
 
-def find_in_collection(obj_id: str, cls):
+def find_in_collection(obj_id: str, cls, projection: dict | None = None, use_cache: bool = True):
     if not is_valid_nanoid(obj_id):
         raise_with_log(ValueError, f"id {obj_id} is not a valid nanoid");
 
-    collection = get_collection_for_class(cls)
-    logger.info(f"fetching document with id {obj_id} from {collection.name}")
-    document = collection.find_one({settings.MONGO_ID_ATTRIBUTE: obj_id})
+    collection_name = get_collection_name_for_class(cls)
+    cached = use_cache and document_cache.is_cached(collection_name) and projection is None
+    document = document_cache.get(collection_name, obj_id) if cached else None
 
     if document is None:
-        raise_with_log(NotFoundError, f"no document found for id {obj_id} in collection {collection.name}")
+        collection = get_collection_for_class(cls)
+        logger.info(f"fetching document with id {obj_id} from {collection.name}")
+        document = collection.find_one({settings.MONGO_ID_ATTRIBUTE: obj_id}, projection)
+
+        if document is None:
+            raise_with_log(NotFoundError, f"no document found for id {obj_id} in collection {collection.name}")
 
-    return cls.fromMongoDict(document)
+        if cached:
+            document_cache.put(collection.name, obj_id, document)
+
+    return to_model(cls, document, projection)
 
 
 def update_in_collection(obj, cls):
@@ -92,39 +155,96 @@ def update_in_collection(obj, cls):
         raise_with_log(ValueError, f"document id not set for update")
 
     collection.replace_one({settings.MONGO_ID_ATTRIBUTE: document_id}, document)
+    invalidate_documents(collection.name, [document_id])
     logger.info(f"document {document} for id {document_id} updated in {collection.name}")
     model = cls.fromMongoDict(document)
     return model
 
 
-def get_list_of_models_in_collection(cls, page: int, items_per_page: int):
+def update_fields_in_collection(obj, cls, check_updated_at: bool = False):
+    """Writes the fields changed since the object was loaded with a single $set, returns the object.
+
+    With check_updated_at the update only applies if updatedAt in the collection still has the
+    loaded value (optimistic concurrency), updatedAt is increased and a ConflictError is raised otherwise."""
+    collection = get_collection_for_object(obj)
+    (query, fields) = get_field_update(obj, check_updated_at)
+
+    if len(fields) == 0:
+        logger.info(f"document {obj.id} unchanged in {collection.name}")
+        return obj
+
+    result = collection.update_one(query, {'$set': fields})
+    check_field_update(result, obj, collection.name, check_updated_at)
+
+    invalidate_documents(collection.name, [obj.id])
+    obj.clearChanges()
+    logger.info(f"document {obj.id} fields {fields} updated in {collection.name}")
+    return obj
+
+
+def get_field_update(obj, check_updated_at: bool) -> tuple[dict, dict]:
+    """Returns the filter and the fields to $set for the changed fields of the object."""
+    if not obj.id:
+        raise_with_log(ValueError, f"document id not set for update")
+
+    query = {settings.MONGO_ID_ATTRIBUTE: obj.id}
+    fields = obj.getChangedFields()
+    fields.pop(settings.MODEL_ID_ATTRIBUTE, None)
+
+    if check_updated_at and len(fields) > 0:
+        if UPDATED_AT_ATTRIBUTE not in type(obj).model_fields:
+            raise_with_log(ValueError, f"{type(obj).__name__} has no attribute {UPDATED_AT_ATTRIBUTE}")
+
+        # updatedAt (seconds) must change with each update, even within the same second
+        loaded_at = obj.getLoadedValue(UPDATED_AT_ATTRIBUTE)
+        query[UPDATED_AT_ATTRIBUTE] = loaded_at
+        fields[UPDATED_AT_ATTRIBUTE] = max(fields.get(UPDATED_AT_ATTRIBUTE, int(time.time())), (loaded_at or 0) + 1)
+        setattr(obj, UPDATED_AT_ATTRIBUTE, fields[UPDATED_AT_ATTRIBUTE])
+
+    return (query, fields)
+
+
+def check_field_update(result, obj, collection_name: str, check_updated_at: bool) -> None:
+    if result.matched_count > 0:
+        return
+
+    # the object may have been read from a stale cached document, retries must read from mongodb
+    document_cache.invalidate(collection_name, [obj.id])
+
+    if check_updated_at:
+        raise_with_log(ConflictError, f"document {obj.id} in {collection_name} modified concurrently (updatedAt {obj.getLoadedValue(UPDATED_AT_ATTRIBUTE)})")
+
+    raise_with_log(NotFoundError, f"no document found for id {obj.id} in collection {collection_name}")
+
+
+def get_list_of_models_in_collection(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
     collection_name = get_collection_name_for_class(cls)
-    logger.info(f"fetching from {collection_name} page {page} items {items_per_page}")
-    result_set = _get_list_as_result_set(cls, page, items_per_page)
+    logger.info(f"fetching from {collection_name} page {page} items {items_per_page} after {after}")
+    result_set = _get_list_as_result_set(cls, page, items_per_page, after, projection)
 
     documents = []
     for document in result_set:
-        documents.append(cls.fromMongoDict(document))
+        documents.append(to_model(cls, document, projection))
     
     return documents
 
 
-def get_filtered_list_of_models_in_collection(cls, filter):
+def get_filtered_list_of_models_in_collection(cls, filter, projection: dict | None = None):
     collection_name = get_collection_name_for_class(cls)
     logger.info(f"fetching from {collection_name} with filter {filter}")
 
     collection = get_collection_for_class(cls)
-    result_set = collection.find(filter)
+    result_set = collection.find(filter, projection)
     documents = []
 
     for document in result_set:
-        documents.append(cls.fromMongoDict(document))
+        documents.append(to_model(cls, document, projection))
     
     return documents
 
 
-def get_list_of_dicts_in_collection(cls, page: int, items_per_page: int):
-    result_set = _get_list_as_result_set(cls, page, items_per_page)
+def get_list_of_dicts_in_collection(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
+    result_set = _get_list_as_result_set(cls, page, items_per_page, after, projection)
 
     documents = []
     for document in result_set:
@@ -135,16 +255,87 @@ def get_list_of_dicts_in_collection(cls, page: int, items_per_page: int):
     return documents
 
 
-def _get_list_as_result_set(cls, page: int, items_per_page: int):
+def _get_list_as_result_set(cls, page: int, items_per_page: int, after: str | None = None, projection: dict | None = None):
     collection = get_collection_for_class(cls)
+
+    # keyset pagination, no counting and skipping required
+    if after is not None:
+        logger.info(f"fetching documents from {collection.name}, after: {after}, items: {items_per_page}")
+        return collection.find(get_cursor_filter(after), projection).sort(settings.MONGO_ID_ATTRIBUTE, 1).limit(max(items_per_page, 0))
+
+    # no paging, full collection
+    if items_per_page <= 0:
+        logger.info(f"fetching all documents from {collection.name}")
+        return collection.find({}, projection)
+
     logger.info(f"fetching documents from {collection.name}, page: {page}, items: {items_per_page}")
 
     pages_count = int((collection.count_documents({}) + items_per_page - 1) / items_per_page)
     if page > 1 and page > pages_count:
         raise_with_log(ValueError, f"page {page} > expected number of pages ({pages_count})")
 
+    # sorted by id, the last document of a page is the cursor for the following documents
     skip_count = (page - 1) * items_per_page
-    return collection.find().skip(skip_count).limit(items_per_page)
+    return collection.find({}, projection).sort(settings.MONGO_ID_ATTRIBUTE, 1).skip(skip_count).limit(items_per_page)
+
+
+def get_projection(field_list: list[str]) -> dict:
+    """Returns the mongo projection for the provided model field names (the id is always included)."""
+    return {field: 1 for field in field_list if field != settings.MODEL_ID_ATTRIBUTE}
+
+
+def get_model_projection(cls) -> dict:
+    """Returns the mongo projection for the fields of the model class."""
+    return get_projection(list(cls.model_fields.keys()))
+
+
+def to_model(cls, document: dict, projection: dict | None = None):
+    """Returns the model for the document read from mongodb.
+
+    Documents are validated by pydantic only if MONGO_VALIDATE_DOCUMENTS is set
+    (and the document is complete), otherwise the model is constructed as is."""
+    return cls.fromMongoDict(document, validate=settings.MONGO_VALIDATE_DOCUMENTS and projection is None)
+
+
+def get_cursor_filter(after: str) -> dict:
+    last_id = decode_cursor(after)
+    if last_id is None:
+        return {}
+
+    return {settings.MONGO_ID_ATTRIBUTE: {"$gt": last_id}}
+
+
+def get_next_cursor(documents: list, items_per_page: int) -> str | None:
+    """Returns the cursor for the page following the provided documents or None for the last page."""
+    if items_per_page <= 0 or len(documents) == 0 or len(documents) < items_per_page:
+        return None
+
+    last = documents[-1]
+    if isinstance(last, dict):
+        return encode_cursor(last[settings.MODEL_ID_ATTRIBUTE])
+
+    return encode_cursor(last.id)
+
+
+def encode_cursor(document_id: str) -> str:
+    return base64.urlsafe_b64encode(document_id.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str | None:
+    # empty cursor starts keyset pagination at the beginning of the collection
+    if not cursor:
+        return None
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        document_id = base64.urlsafe_b64decode(cursor + padding).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise_with_log(ValueError, f"cursor {cursor} is invalid")
+
+    if not is_valid_nanoid(document_id):
+        raise_with_log(ValueError, f"cursor {cursor} is invalid")
+
+    return document_id
 
 
 def get_collection_for_object(obj):
@@ -194,6 +385,68 @@ def get_mongo_collection(collection_name: str):
     return collection
 
 
+def register_indexes(collection_name: str, indexes: list[IndexModel]) -> None:
+    """Adds the index specs for the collection, specs are identified by index name."""
+    if len(indexes) == 0:
+        return
+
+    specs = model_indexes.setdefault(collection_name, {})
+    for index in indexes:
+        specs[index.document['name']] = index
+
+
+def get_indexes(collection_name: str) -> list[IndexModel]:
+    return list(model_indexes.get(collection_name, {}).values())
+
+
+def create_all_indexes() -> None:
+    """Creates the registered indexes of all collections, raises an IndexCreationError if an index cannot be created."""
+    for collection_name in list(model_indexes.keys()):
+        create_indexes(get_mongo_collection(collection_name))
+
+
+def create_indexes(collection) -> None:
+    """Creates the registered indexes of the collection, existing indexes with the same spec are left untouched."""
+    indexes = get_indexes(collection.name)
+    if len(indexes) == 0:
+        return
+
+    try:
+        names = collection.create_indexes(indexes)
+        logger.info(f"indexes {names} ensured for {collection.name}")
+    except OperationFailure as e:
+        # unique indexes are not built over existing duplicates, the guard would silently not exist
+        duplicates = {
+            index.document['name']: find_duplicates(collection, index)
+            for index in indexes if index.document.get('unique')}
+
+        duplicates = {name: keys for (name, keys) in duplicates.items() if len(keys) > 0}
+        raise_with_log(IndexCreationError, f"failed to create indexes for {collection.name}: {e} (duplicates {duplicates})", ERROR)
+
+
+def find_duplicates(collection, index: IndexModel, limit: int = MAX_REPORTED_DUPLICATES) -> list[dict]:
+    """Returns the keys of the unique index shared by more than one document, with the ids of these documents."""
+    spec = index.document
+    fields = list(spec['key'].keys())
+    match = dict(spec.get('partialFilterExpression', {}))
+
+    if spec.get('sparse'):
+        match.update({field: {'$exists': True} for field in fields})
+
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            settings.MONGO_ID_ATTRIBUTE: {field.replace('.', '_'): f"${field}" for field in fields},
+            'ids': {'$push': f"${settings.MONGO_ID_ATTRIBUTE}"},
+            'count': {'$sum': 1}}},
+        {'$match': {'count': {'$gt': 1}}},
+        {'$limit': limit}]
+
+    return [
+        {'key': document[settings.MONGO_ID_ATTRIBUTE], 'ids': document['ids']}
+        for document in collection.aggregate(pipeline)]
+
+
 def get_mongo() -> MongoClient:
     global mongo_client_available
     global mongo_client
@@ -204,7 +457,7 @@ def get_mongo() -> MongoClient:
 
     logger.info(f"creating new mongo client")
     mongo_uri = get_mongo_uri()
-    mongo_client = get_client(mongo_uri)
+    mongo_client = get_client(mongo_uri, **get_pool_options())
 
     if isinstance(mongo_client, MongoClient):
         mongo_client_available = True
@@ -212,6 +465,96 @@ def get_mongo() -> MongoClient:
     return mongo_client
 
 
+def invalidate_documents(collection_name: str, document_ids = None) -> None:
+    """Drops updated documents from the document cache (all of the collection if document_ids is None) and notifies the other workers."""
+    if not document_cache.is_cached(collection_name):
+        return
+
+    document_cache.invalidate(collection_name, document_ids)
+
+    if not has_change_streams():
+        get_invalidation_collection().insert_one({
+            'collection': collection_name,
+            'ids': list(document_ids) if document_ids is not None else None})
+
+
+def has_change_streams() -> bool:
+    """Returns True if the deployment supports change streams (replica set or sharded cluster)."""
+    global change_streams_available
+
+    if change_streams_available is None:
+        hello = get_mongo().admin.command('hello')
+        change_streams_available = 'setName' in hello or hello.get('msg') == 'isdbgrid'
+        logger.info(f"change streams available: {change_streams_available}")
+
+    return change_streams_available
+
+
+def get_invalidation_collection():
+    if CACHE_INVALIDATION_COLLECTION in mongo_collections:
+        return mongo_collections[CACHE_INVALIDATION_COLLECTION]
+
+    db = get_mongo().get_database()
+    try:
+        db.create_collection(CACHE_INVALIDATION_COLLECTION, capped=True, size=settings.MONGO_CACHE_INVALIDATION_SIZE)
+        # tailable cursors on empty capped collections are closed immediately
+        db[CACHE_INVALIDATION_COLLECTION].insert_one({'collection': None, 'ids': []})
+    except CollectionInvalid:
+        pass
+
+    mongo_collections[CACHE_INVALIDATION_COLLECTION] = db[CACHE_INVALIDATION_COLLECTION]
+    return mongo_collections[CACHE_INVALIDATION_COLLECTION]
+
+
+def run_cache_invalidation_listener() -> None:
+    """Invalidates cached documents changed by other workers, runs forever (e.g. in a daemon thread)."""
+    logger.info(f"start cache invalidation listener for {document_cache.collection_names}")
+
+    while True:
+        try:
+            if has_change_streams():
+                _watch_changes()
+            else:
+                _tail_invalidations()
+        except Exception as e:
+            # changes may have been missed
+            logger.warning(f"cache invalidation listener failed: {e}")
+            document_cache.clear()
+            time.sleep(5)
+
+
+def _watch_changes() -> None:
+    pipeline = [{'$match': {
+        'ns.coll': {'$in': list(document_cache.collection_names)},
+        'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}}]
+
+    with get_mongo().get_database().watch(pipeline) as stream:
+        for change in stream:
+            document_cache.invalidate(change['ns']['coll'], [change['documentKey'][settings.MONGO_ID_ATTRIBUTE]])
+
+
+def _tail_invalidations() -> None:
+    # messages written before the listener started are replayed, they only drop documents not yet cached
+    cursor = get_invalidation_collection().find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+
+    while cursor.alive:
+        for message in cursor:
+            if message['collection'] is not None:
+                document_cache.invalidate(message['collection'], message['ids'])
+
+    # cursor lost its position (collection wrapped around)
+    document_cache.clear()
+
+
+def get_pool_options() -> dict:
+    return {
+        'maxPoolSize': settings.MONGO_MAX_POOL_SIZE,
+        'minPoolSize': settings.MONGO_MIN_POOL_SIZE,
+        'maxIdleTimeMS': settings.MONGO_MAX_IDLE_TIME_MS,
+        'waitQueueTimeoutMS': settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    }
+
+
 def get_mongo_uri() -> str:
     mongo_url = getenv('MONGO_URL')
     if mongo_url and len(mongo_url) > 0:
@@ -0,0 +1,214 @@
+import time
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from server.aio.mongo import get_collection_for_class as get_async_collection_for_class
+from server.config import settings
+from server.error import NotFoundError, raise_with_log
+from server.model.job import JobOut
+from server.mongo import get_collection_for_class
+from util.logging import get_logger
+from util.nanoid import generate_nanoid, is_valid_nanoid
+
+# durable job queue backed by the 'Job' collection.
+# jobs are enqueued by the api and processed by a separate worker process (see scripts/app/worker.py).
+# while a job is queued or running its idempotency key (type:entityId) is stored in
+# 'activeKey' (unique index), enqueuing the same key again returns the active job.
+# a forced request for an active job is chained as 'followUp' and enqueued once the active job is done.
+
+JOB_POLICY_SYNC = "policy_sync"
+JOB_POLICY_SYNC_BULK = "policy_sync_bulk"
+JOB_RISK_PAYOUT_SYNC = "risk_payout_sync"
+JOB_PERSON_FUNDING = "person_funding"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+ACTIVE_KEY = "activeKey"
+
+# setup for module
+logger = get_logger()
+
+
+async def enqueue_job(job_type: str, entity_id: str, params: dict | None = None) -> JobOut:
+    """Enqueues a job, returns the already queued or running job for the same type and entity.
+
+    A forced job (params 'force') for an entity with an active job that is not forced replaces
+    the params of the queued job, or is chained as follow up of the running job (see complete_job)."""
+    collection = await get_async_collection_for_class(JobOut)
+    key = get_job_key(job_type, entity_id)
+    params = params or {}
+
+    try:
+        document = await collection.find_one_and_update(
+            {ACTIVE_KEY: key},
+            {"$setOnInsert": new_job_document(job_type, entity_id, params)},
+            upsert=True,
+            return_document=ReturnDocument.AFTER)
+
+    except DuplicateKeyError:
+        # concurrent enqueue of the same key
+        document = await collection.find_one({ACTIVE_KEY: key})
+
+    job = JobOut.fromMongoDict(document)
+
+    if params.get('force') and not job.params.get('force') and job.followUp is None:
+        document = await chain_forced_job(collection, key, params)
+
+        # active job completed in the meantime
+        if document is None:
+            return await enqueue_job(job_type, entity_id, params)
+
+        job = JobOut.fromMongoDict(document)
+
+    logger.info(f"job {job.id} {key} {job.status}")
+    return job
+
+
+async def chain_forced_job(collection, key: str, params: dict) -> dict | None:
+    now = int(time.time())
+    document = await collection.find_one_and_update(
+        {ACTIVE_KEY: key, "status": STATUS_QUEUED},
+        {"$set": {"params": params, "updatedAt": now}},
+        return_document=ReturnDocument.AFTER)
+
+    if document is not None:
+        return document
+
+    # running job, the forced job is enqueued when the running job is done or failed
+    return await collection.find_one_and_update(
+        {ACTIVE_KEY: key},
+        {"$set": {"followUp": params, "updatedAt": now}},
+        return_document=ReturnDocument.AFTER)
+
+
+async def find_job(job_id: str) -> JobOut:
+    if not is_valid_nanoid(job_id):
+        raise_with_log(ValueError, f"id {job_id} is not a valid nanoid")
+
+    collection = await get_async_collection_for_class(JobOut)
+    document = await collection.find_one({settings.MONGO_ID_ATTRIBUTE: job_id})
+
+    if document is None:
+        raise_with_log(NotFoundError, f"no job found for id {job_id}")
+
+    return JobOut.fromMongoDict(document)
+
+
+def claim_next_job(worker_id: str) -> JobOut | None:
+    """Marks the next due job as running for the provided worker and returns it."""
+    now = int(time.time())
+    document = get_collection_for_class(JobOut).find_one_and_update(
+        {"status": STATUS_QUEUED, "runAfter": {"$lte": now}},
+        {"$set": {"status": STATUS_RUNNING, "lockedAt": now, "lockedBy": worker_id, "updatedAt": now},
+         "$inc": {"attempts": 1}},
+        sort=[("runAfter", ASCENDING)],
+        return_document=ReturnDocument.AFTER)
+
+    if document is None:
+        return None
+
+    return JobOut.fromMongoDict(document)
+
+
+def heartbeat_job(job: JobOut, worker_id: str) -> bool:
+    """Refreshes the lock of the running job, returns False if the job is no longer locked by the worker."""
+    now = int(time.time())
+    result = get_collection_for_class(JobOut).update_one(
+        {settings.MONGO_ID_ATTRIBUTE: job.id, "status": STATUS_RUNNING, "lockedBy": worker_id},
+        {"$set": {"lockedAt": now}})
+
+    if result.matched_count == 0:
+        logger.warning(f"job {job.id} {job.key} no longer locked by worker {worker_id}")
+        return False
+
+    return True
+
+
+def update_job_params(job: JobOut, params: dict) -> None:
+    get_collection_for_class(JobOut).update_one(
+        {settings.MONGO_ID_ATTRIBUTE: job.id},
+        {"$set": {"params": params, "updatedAt": int(time.time())}})
+
+
+def complete_job(job: JobOut, result: dict | None = None) -> None:
+    now = int(time.time())
+    document = get_collection_for_class(JobOut).find_one_and_update(
+        {settings.MONGO_ID_ATTRIBUTE: job.id},
+        {"$set": {"status": STATUS_DONE, "result": result, "error": None, "updatedAt": now},
+         "$unset": {ACTIVE_KEY: ""}})
+
+    logger.info(f"job {job.id} {job.key} done")
+    enqueue_follow_up(job, document)
+
+
+def fail_job(job: JobOut, error: str) -> None:
+    """Re-queues the job with exponential backoff or marks it as failed after the last attempt."""
+    now = int(time.time())
+
+    if job.attempts < job.maxAttempts:
+        run_after = now + settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        update = {"$set": {"status": STATUS_QUEUED, "runAfter": run_after, "error": error, "updatedAt": now}}
+        logger.warning(f"job {job.id} {job.key} attempt {job.attempts} failed, retry at {run_after}: {error}")
+    else:
+        update = {"$set": {"status": STATUS_FAILED, "error": error, "updatedAt": now}, "$unset": {ACTIVE_KEY: ""}}
+        logger.error(f"job {job.id} {job.key} failed after {job.attempts} attempts: {error}")
+
+    document = get_collection_for_class(JobOut).find_one_and_update({settings.MONGO_ID_ATTRIBUTE: job.id}, update)
+
+    if job.attempts >= job.maxAttempts:
+        enqueue_follow_up(job, document)
+
+
+def enqueue_follow_up(job: JobOut, document: dict | None) -> None:
+    """Enqueues the follow up job chained to the provided job (document before the active key was removed)."""
+    params = document.get("followUp") if document else None
+    if params is None:
+        return
+
+    collection = get_collection_for_class(JobOut)
+
+    try:
+        follow_up = new_job_document(job.type, job.entityId, params)
+        collection.insert_one({**follow_up, ACTIVE_KEY: job.key})
+        logger.info(f"job {follow_up[settings.MONGO_ID_ATTRIBUTE]} {job.key} queued as follow up of job {job.id}")
+
+    except DuplicateKeyError:
+        # enqueued in the meantime, chain the follow up to the new active job
+        collection.update_one({ACTIVE_KEY: job.key}, {"$set": {"followUp": params}})
+
+
+def requeue_stale_jobs() -> int:
+    """Re-queues running jobs whose lock was not refreshed in time (e.g. crashed workers)."""
+    now = int(time.time())
+    result = get_collection_for_class(JobOut).update_many(
+        {"status": STATUS_RUNNING, "lockedAt": {"$lt": now - settings.JOB_LOCK_TIMEOUT_SECONDS}},
+        {"$set": {"status": STATUS_QUEUED, "runAfter": now, "updatedAt": now}})
+
+    if result.modified_count > 0:
+        logger.warning(f"{result.modified_count} stale jobs re-queued")
+
+    return result.modified_count
+
+
+def new_job_document(job_type: str, entity_id: str, params: dict) -> dict:
+    now = int(time.time())
+    return {
+        settings.MONGO_ID_ATTRIBUTE: generate_nanoid(),
+        "type": job_type,
+        "entityId": entity_id,
+        "key": get_job_key(job_type, entity_id),
+        "params": params,
+        "status": STATUS_QUEUED,
+        "attempts": 0,
+        "maxAttempts": settings.JOB_MAX_ATTEMPTS,
+        "runAfter": now,
+        "createdAt": now,
+        "updatedAt": now}
+
+
+def get_job_key(job_type: str, entity_id: str) -> str:
+    return f"{job_type}:{entity_id}"
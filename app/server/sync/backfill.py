@@ -0,0 +1,154 @@
+from collections.abc import Mapping
+
+from pymongo import UpdateOne
+
+from util.logging import get_logger
+from web3utils.logs import LogScanner
+
+from server.config import settings
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import get_mongo_collection
+from server.sync.indexer import CHECKPOINT_COLLECTION, update_by_tx
+from server.sync.onchain import onchain
+from server.sync.policy import get_policy_nft_from_log
+from server.sync.risk import get_risk_id_from_log
+
+# reconciles mongo against the chain for a historical block range (e.g. after outages).
+# all product, token and risk set logs of the range are decoded with the contract abis and
+# stored in the 'Event' collection (one document per log), risk ids and policy nfts are
+# set on the matching risk and policy documents. progress is checkpointed per chunk.
+
+EVENT_COLLECTION = "Event"
+CHECKPOINT_ID = "backfill"
+
+MONGO_MAX_INT = 2 ** 63 - 1
+
+# setup for module
+logger = get_logger()
+
+
+def backfill(from_block: int | None = None, to_block: int | None = None, chunk_size: int = settings.BACKFILL_CHUNK_SIZE, workers: int = settings.BACKFILL_WORKERS) -> dict:
+    """Scans the block range and reconciles mongo, resumes from the checkpoint when from_block is not provided."""
+    checkpoint = get_checkpoint()
+
+    if from_block is None:
+        from_block = checkpoint['block'] if checkpoint else settings.INDEXER_START_BLOCK or 0
+
+    if to_block is None:
+        to_block = checkpoint['toBlock'] if checkpoint and checkpoint['block'] <= checkpoint['toBlock'] else onchain.w3.eth.block_number
+
+    # contracts may share an address (e.g. the risk set of the mock deployment is the product itself)
+    contracts = {}
+    for contract in [onchain.product, onchain.token, onchain.riskSet]:
+        contracts.setdefault(contract.address.lower(), []).append(contract)
+
+    scanner = LogScanner(onchain.w3, list(contracts.keys()), chunk_size=chunk_size, workers=workers)
+    result = {'fromBlock': from_block, 'toBlock': to_block, 'events': 0, 'risks': 0, 'policies': 0}
+
+    def on_chunk(start: int, end: int, logs: list) -> None:
+        counts = reconcile_logs(contracts, logs)
+        for (name, count) in counts.items():
+            result[name] += count
+
+        set_checkpoint(end + 1, to_block)
+        logger.info(f"backfilled blocks {start}-{end} ({len(logs)} logs)")
+
+    logger.info(f"backfill blocks {from_block}-{to_block} for {list(contracts.keys())}")
+    scanner.scan(from_block, to_block, on_chunk)
+
+    result['rpcCalls'] = scanner.rpc_calls
+    logger.info(f"backfill completed {result}")
+    return result
+
+
+def reconcile_logs(contracts: dict, logs: list) -> dict:
+    """Stores the decoded logs and sets risk ids and policy nfts on the matching documents.
+
+    contracts: lists of contracts by (lower case) address, each abi is tried in turn."""
+    risk_topic = onchain.riskSet.contract.events.LogRiskSetRiskAdded.topic
+    policy_topic = onchain.product.contract.events.LogCropPolicyCreated.topic
+    operations = []
+    risk_ids = {}
+    nfts = {}
+
+    for log in logs:
+        (contract, event) = decode_log(contracts.get(log['address'].lower(), []), log)
+        if event is None:
+            continue
+
+        tx = log['transactionHash'].hex()
+        topic = log['topics'][0].to_0x_hex()
+
+        operations.append(UpdateOne(
+            {settings.MONGO_ID_ATTRIBUTE: f"{tx}:{log['logIndex']}"},
+            {'$set': {
+                'contract': contract.name,
+                'address': contract.address,
+                'event': event.event,
+                'block': log['blockNumber'],
+                'tx': tx,
+                'logIndex': log['logIndex'],
+                'args': to_mongo_value(dict(event.args))}},
+            upsert=True))
+
+        if topic == risk_topic:
+            risk_ids[tx] = get_risk_id_from_log(log)
+        elif topic == policy_topic:
+            nfts[tx] = get_policy_nft_from_log(log)
+
+    if len(operations) > 0:
+        get_mongo_collection(EVENT_COLLECTION).bulk_write(operations, ordered=False)
+
+    unmatched_risks = update_by_tx(RiskOut, 'risk_id', risk_ids)
+    unmatched_policies = update_by_tx(PolicyOut, 'nft', nfts)
+
+    for tx in unmatched_risks | unmatched_policies:
+        logger.warning(f"no risk or policy document for tx {tx}")
+
+    return {
+        'events': len(operations),
+        'risks': len(risk_ids) - len(unmatched_risks),
+        'policies': len(nfts) - len(unmatched_policies)}
+
+
+def decode_log(contracts: list, log) -> tuple:
+    """Returns the first contract whose abi knows the event and the decoded log, (None, None) for unknown events."""
+    for contract in contracts:
+        event = contract.decode_log(log)
+        if event is not None:
+            return (contract, event)
+
+    return (None, None)
+
+
+def to_mongo_value(value):
+    """Converts decoded event args to values storable in mongo (hex for bytes, str for ints beyond int64)."""
+    if isinstance(value, Mapping):
+        return {key: to_mongo_value(item) for (key, item) in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [to_mongo_value(item) for item in value]
+
+    if isinstance(value, bytes):
+        return f"0x{value.hex()}"
+
+    if isinstance(value, int) and not isinstance(value, bool) and abs(value) > MONGO_MAX_INT:
+        return str(value)
+
+    return value
+
+
+def get_checkpoint() -> dict | None:
+    return get_mongo_collection(CHECKPOINT_COLLECTION).find_one({settings.MONGO_ID_ATTRIBUTE: CHECKPOINT_ID})
+
+
+def set_checkpoint(block: int, to_block: int) -> None:
+    get_mongo_collection(CHECKPOINT_COLLECTION).update_one(
+        {settings.MONGO_ID_ATTRIBUTE: CHECKPOINT_ID},
+        {'$set': {'block': block, 'toBlock': to_block}},
+        upsert=True)
+
+
+def reset_checkpoint() -> None:
+    get_mongo_collection(CHECKPOINT_COLLECTION).delete_one({settings.MONGO_ID_ATTRIBUTE: CHECKPOINT_ID})
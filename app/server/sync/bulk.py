@@ -0,0 +1,116 @@
+from util.logging import get_logger
+from web3utils.batch import batch_call
+from web3utils.short_string import to_str
+
+from server.config import settings
+from server.model.config import ConfigOut
+from server.model.location import LocationOut
+from server.model.person import PersonOut
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import get_filtered_list_of_models_in_collection
+from server.sync.config import get_season_args
+from server.sync.funding import submit_approvals, submit_funding
+from server.sync.force import needs_sync
+from server.sync.location import get_location_args
+from server.sync.onchain import onchain
+from server.sync.pipeline import TxPipeline, complete_tier, set_fields
+from server.sync.policy import get_policy_args, get_policy_nft_from_receipt
+from server.sync.risk import get_risk_args, get_risk_id_from_receipt
+
+# setup for module
+logger = get_logger()
+
+
+def sync_policies_onchain_bulk(policy_ids: list[str], force: bool = False, max_in_flight: int = settings.SYNC_MAX_IN_FLIGHT_TXS, since_nonce: int | None = None) -> dict:
+    """Syncs the specified policies including their persons, risks, seasons and locations onchain.
+
+    Shared parents are synced once. Transactions are sent tier by tier (seasons and locations,
+    risks and person funding, farmer approvals, policies) and results are written in bulk per tier.
+    Retries of a forced sync skip the transactions sent since since_nonce (see server.sync.force)."""
+    pipeline = TxPipeline(max_in_flight)
+    updates = {}
+
+    # resolve dependency graph
+    policies = list(_find_many(PolicyOut, policy_ids).values())
+    policies = [policy for policy in policies if needs_sync(policy.tx, force, since_nonce)]
+
+    persons = _find_many(PersonOut, {policy.personId for policy in policies})
+    risks = _find_many(RiskOut, {policy.riskId for policy in policies})
+    configs = _find_many(ConfigOut, {risk.configId for risk in risks.values()})
+    locations = _find_many(LocationOut, {risk.locationId for risk in risks.values()})
+    logger.info(f"bulk sync of {len(policies)} policies, {len(persons)} persons, {len(risks)} risks, {len(configs)} seasons, {len(locations)} locations")
+
+    # tier 1: seasons and locations
+    for config in _to_sync(configs, force, since_nonce):
+        pipeline.submit(config.id,
+            lambda config=config: onchain.product.createSeason(*get_season_args(config), {'from': onchain.operator, 'wait': False}),
+            set_fields(updates, ConfigOut, config))
+
+    for location in _to_sync(locations, force, since_nonce):
+        pipeline.submit(location.id,
+            lambda location=location: onchain.product.createLocation(*get_location_args(location), {'from': onchain.operator, 'wait': False}),
+            set_fields(updates, LocationOut, location))
+
+    complete_tier(pipeline, updates)
+
+    # tier 2: risks and farmer funding (independent of each other)
+    for risk in _to_sync(risks, force, since_nonce):
+        if pipeline.failed(risk.configId, risk.locationId) or risk.configId not in configs or risk.locationId not in locations:
+            pipeline.errors[risk.id] = f"season or location of risk {risk.id} not synced"
+            continue
+
+        config = configs[risk.configId]
+        pipeline.submit(risk.id,
+            lambda risk=risk, config=config: onchain.product.createRisk(*get_risk_args(risk, config), {'from': onchain.operator, 'wait': False}),
+            set_fields(updates, RiskOut, risk, lambda receipt: {'risk_id': get_risk_id_from_receipt(receipt)}))
+
+    # funding receipts set person.tx, persons to fund and approve are selected once
+    funded_persons = _to_sync(persons, force, since_nonce)
+    submit_funding(pipeline, updates, funded_persons, force)
+    complete_tier(pipeline, updates)
+
+    # tier 3: farmer approvals for premium payments
+    submit_approvals(pipeline, [person for person in funded_persons if not pipeline.failed(person.id)], force)
+    complete_tier(pipeline, updates)
+
+    # tier 4: policies
+    decimals = onchain.token.decimals()
+
+    # risk ids are set from the createRisk receipts (tier 2) or by the indexer. getRiskId is a
+    # mapping lookup of ids derived from the onchain risk counter, it cannot be computed locally
+    missing = [risk for risk in risks.values() if not risk.risk_id and risk.tx]
+    risk_ids = {risk.id: risk.risk_id for risk in risks.values() if risk.risk_id}
+    onchain_risk_ids = batch_call(onchain.w3, [onchain.product.contract.functions.getRiskId(to_str(risk.id)) for risk in missing])
+    risk_ids.update({risk.id: risk_id for (risk, risk_id) in zip(missing, onchain_risk_ids) if any(risk_id)})
+
+    for policy in policies:
+        if pipeline.failed(policy.personId, policy.riskId) or policy.personId not in persons or not risk_ids.get(policy.riskId):
+            pipeline.errors[policy.id] = f"person or risk of policy {policy.id} not synced"
+            continue
+
+        args = get_policy_args(policy, persons[policy.personId], risk_ids[policy.riskId], decimals)
+        pipeline.submit(policy.id,
+            lambda args=args: onchain.product.createPolicy(*args, {'from': onchain.operator, 'gasLimit': 10000000, 'gasPrice': settings.GAS_PRICE, 'wait': False}),
+            set_fields(updates, PolicyOut, policy, lambda receipt: {'nft': get_policy_nft_from_receipt(receipt)}))
+
+    complete_tier(pipeline, updates)
+
+    result = {
+        'policies': len(policies),
+        'synced': len([policy for policy in policies if policy.id not in pipeline.errors]),
+        'errors': pipeline.errors
+    }
+
+    logger.info(f"bulk sync completed, {result['synced']} of {result['policies']} policies synced, {len(pipeline.errors)} errors")
+    return result
+
+
+def _find_many(cls, ids) -> dict:
+    documents = get_filtered_list_of_models_in_collection(cls, {settings.MONGO_ID_ATTRIBUTE: {'$in': list(ids)}})
+    return {document.id: document for document in documents}
+
+
+def _to_sync(documents: dict, force: bool, since_nonce: int | None) -> list:
+    return [document for document in documents.values() if needs_sync(document.tx, force, since_nonce)]
+
@@ -1,31 +1,40 @@
 from util.logging import get_logger
+from web3utils.short_string import to_str
 
 from server.config import settings
 from server.model.config import ConfigOut
-from server.mongo import update_in_collection
-from server.sync.onchain import operator, product
+from server.mongo import update_fields_in_collection
+from server.sync.force import needs_sync
+from server.sync.onchain import onchain, send_tx
 
 # setup for module
 logger = get_logger()
 
-def sync_config_onchain(config: ConfigOut, force: bool = False):
-    if not force and config.tx:
+def sync_config_onchain(config: ConfigOut, force: bool = False, since_nonce: int | None = None):
+    if not needs_sync(config.tx, force, since_nonce):
         logger.info(f"config {config.id} already synched onchain (tx: {config.tx})") 
         return
 
     logger.info(f"synching config {config.id} onchain")
 
-    id = product.toStr(config.id)
-    year = config.year
-    name = product.toStr(config.name)
-    season_start = product.toStr(config.startOfSeason)
-    season_end = product.toStr(config.endOfSeason)
-    season_days = config.seasonDays
+    (id, year, name, season_start, season_end, season_days) = get_season_args(config)
 
     # execute transaction
-    tx = product.createSeason(id, year, name, season_start, season_end, season_days, {'from': operator})
+    tx = send_tx(f"createSeason of config {config.id}",
+        lambda: onchain.product.createSeason(id, year, name, season_start, season_end, season_days, {'from': onchain.operator, 'wait': False}))
     logger.info(f"tx {tx} config {config.id} year {config.year} name {config.name} created")
 
     # update config with tx
     config.tx = tx
-    update_in_collection(config, ConfigOut)
+    update_fields_in_collection(config, ConfigOut)
+
+
+def get_season_args(config: ConfigOut) -> tuple:
+    """Returns the arguments for product.createSeason."""
+    return (
+        to_str(config.id),
+        config.year,
+        to_str(config.name),
+        to_str(config.startOfSeason),
+        to_str(config.endOfSeason),
+        config.seasonDays)
@@ -0,0 +1,46 @@
+from hexbytes import HexBytes
+from util.logging import get_logger
+from web3.exceptions import TransactionNotFound
+
+from server.sync.onchain import onchain
+
+# forced syncs send the transactions of documents already synched onchain again.
+# before the first attempt of a forced job the worker stores the pending operator
+# nonce in the job params ('sinceNonce', see server.sync.jobs), retries of the job
+# skip the documents whose stored tx was sent with this nonce or later.
+
+# setup for module
+logger = get_logger()
+
+
+def needs_sync(tx: str | None, force: bool = False, since_nonce: int | None = None) -> bool:
+    """True for documents without tx, or forced and the tx was not sent by a previous attempt of the job."""
+    if not tx:
+        return True
+
+    if not force:
+        return False
+
+    return not sent_since(tx, since_nonce)
+
+
+def sent_since(tx: str, nonce: int | None) -> bool:
+    """True if the tx was sent by the operator with the provided nonce or later."""
+    if nonce is None:
+        return False
+
+    try:
+        transaction = onchain.w3.eth.get_transaction(HexBytes(tx))
+    except TransactionNotFound:
+        # dropped by the node, needs to be sent again
+        return False
+
+    if transaction['from'].lower() != onchain.operator.address.lower() or transaction['nonce'] < nonce:
+        return False
+
+    logger.info(f"tx {tx} (nonce {transaction['nonce']}) already sent since nonce {nonce}")
+    return True
+
+
+def get_operator_nonce() -> int:
+    return onchain.w3.eth.get_transaction_count(onchain.operator.address, 'pending')
@@ -0,0 +1,138 @@
+import time
+
+from util.logging import get_logger
+from web3utils.batch import batch_call
+from web3utils.send_eth import send_eth
+
+from server.config import settings
+from server.model.person import PersonOut
+from server.mongo import get_filtered_list_of_models_in_collection
+from server.sync.force import needs_sync
+from server.sync.onchain import onchain
+from server.sync.person import get_farmer_wallet
+from server.sync.pipeline import TxPipeline, complete_tier, set_fields
+
+# farmer wallets need tokens (premium payment), eth (gas for the approval) and an
+# approval of the product token handler. token and eth top ups are sent with one
+# multisend transaction per group of persons (if MULTISEND_CONTRACT_ADDRESS is set,
+# otherwise pipelined per person transfers), approvals are sent from the farmer
+# wallets concurrently (independent nonces per wallet).
+
+MULTISEND_GAS_BASE = 50000
+MULTISEND_GAS_PER_RECIPIENT = 80000
+
+# setup for module
+logger = get_logger()
+
+
+def fund_farmers(person_ids: list[str], force: bool = False, batch_size: int = settings.FUNDING_BATCH_SIZE, max_in_flight: int = settings.SYNC_MAX_IN_FLIGHT_TXS, since_nonce: int | None = None) -> dict:
+    """Funds and approves the specified farmer wallets, returns throughput metrics."""
+    start = time.monotonic()
+    pipeline = TxPipeline(max_in_flight)
+    updates = {}
+
+    persons = get_filtered_list_of_models_in_collection(PersonOut, {settings.MONGO_ID_ATTRIBUTE: {'$in': list(person_ids)}})
+    persons = [person for person in persons if needs_sync(person.tx, force, since_nonce)]
+
+    funded = submit_funding(pipeline, updates, persons, force, batch_size)
+    complete_tier(pipeline, updates)
+    funding_seconds = time.monotonic() - start
+
+    approved = submit_approvals(pipeline, [person for person in persons if not pipeline.failed(person.id)], force)
+    complete_tier(pipeline, updates)
+    elapsed = time.monotonic() - start
+
+    result = {
+        'persons': len(persons),
+        'funded': len([person for person in funded if not pipeline.failed(person.id)]),
+        'approved': len([person for person in approved if not pipeline.failed(person.id)]),
+        'transactions': pipeline.submitted,
+        'multisend': onchain.multisend is not None,
+        'fundingSeconds': round(funding_seconds, 3),
+        'elapsedSeconds': round(elapsed, 3),
+        'transactionsPerSecond': round(pipeline.submitted / elapsed, 2) if elapsed > 0 else None,
+        'personsPerSecond': round(len(persons) / elapsed, 2) if elapsed > 0 else None,
+        'errors': pipeline.errors
+    }
+
+    logger.info(f"farmer funding completed {({key: value for (key, value) in result.items() if key != 'errors'})}, {len(pipeline.errors)} errors")
+    return result
+
+
+def submit_funding(pipeline: TxPipeline, updates: dict, persons: list[PersonOut], force: bool, batch_size: int = settings.FUNDING_BATCH_SIZE) -> list[PersonOut]:
+    """Submits token and eth top ups for farmers below the funding amount, returns the funded persons."""
+    balances = batch_call(onchain.w3, [onchain.token.contract.functions.balanceOf(person.wallet) for person in persons])
+    funding = [
+        (person, settings.FARMER_FUNDING_AMOUNT - balance)
+        for (person, balance) in zip(persons, balances)
+        if balance < settings.FARMER_FUNDING_AMOUNT or force]
+
+    if onchain.multisend:
+        _submit_multisend(pipeline, updates, funding, batch_size)
+    else:
+        _submit_transfers(pipeline, updates, funding)
+
+    logger.info(f"funding {len(funding)} of {len(persons)} farmer wallets")
+    return [person for (person, _) in funding]
+
+
+def submit_approvals(pipeline: TxPipeline, persons: list[PersonOut], force: bool) -> list[PersonOut]:
+    """Submits token handler approvals from the farmer wallets below the funding amount, returns the approving persons."""
+    token_handler = onchain.product.getTokenHandler()
+    allowances = batch_call(onchain.w3, [onchain.token.contract.functions.allowance(person.wallet, token_handler) for person in persons])
+    approving = [
+        person for (person, allowance) in zip(persons, allowances)
+        if allowance < settings.FARMER_FUNDING_AMOUNT or force]
+
+    # each farmer wallet has its own nonce, all approvals can be in flight at the same time
+    for person in approving:
+        pipeline.submit(person.id,
+            lambda person=person: onchain.token.approve(token_handler, settings.FARMER_FUNDING_AMOUNT, {'from': get_farmer_wallet(person), 'gasPrice': settings.GAS_PRICE, 'wait': False}))
+
+    logger.info(f"approving token handler {token_handler} for {len(approving)} of {len(persons)} farmer wallets")
+    return approving
+
+
+def _submit_multisend(pipeline: TxPipeline, updates: dict, funding: list[tuple], batch_size: int) -> None:
+    if len(funding) == 0:
+        return
+
+    multisend = onchain.multisend
+    eth_amount = int(settings.FARMER_ETH_FUNDING_AMOUNT)
+    total = sum(amount for (_, amount) in funding)
+
+    # multisend pulls the tokens from the operator, approval is mined first (operator nonce order)
+    if onchain.token.allowance(onchain.operator.address, multisend.address) < total:
+        pipeline.submit([person.id for (person, _) in funding],
+            lambda: onchain.token.approve(multisend.address, total, {'from': onchain.operator, 'wait': False}))
+
+    for start in range(0, len(funding), batch_size):
+        group = funding[start:start + batch_size]
+        recipients = [person.wallet for (person, _) in group]
+        amounts = [amount for (_, amount) in group]
+        eth_amounts = [eth_amount] * len(group)
+
+        pipeline.submit([person.id for (person, _) in group],
+            lambda recipients=recipients, amounts=amounts, eth_amounts=eth_amounts: multisend.multisend(
+                onchain.token.address, recipients, amounts, eth_amounts,
+                {'from': onchain.operator, 'value': sum(eth_amounts), 'gas': MULTISEND_GAS_BASE + MULTISEND_GAS_PER_RECIPIENT * len(recipients), 'wait': False}),
+            _set_group_fields(updates, [person for (person, _) in group]))
+
+
+def _submit_transfers(pipeline: TxPipeline, updates: dict, funding: list[tuple]) -> None:
+    for (person, amount) in funding:
+        pipeline.submit(person.id,
+            lambda person=person, amount=amount: onchain.token.transfer(person.wallet, amount, {'from': onchain.operator, 'wait': False}),
+            set_fields(updates, PersonOut, person))
+        pipeline.submit(person.id,
+            lambda person=person: send_eth(onchain.operator, person.wallet, int(settings.FARMER_ETH_FUNDING_AMOUNT), settings.GAS_PRICE, wait=False))
+
+
+def _set_group_fields(updates: dict, persons: list[PersonOut]):
+    callbacks = [set_fields(updates, PersonOut, person) for person in persons]
+
+    def on_receipt(tx: str, receipt) -> None:
+        for callback in callbacks:
+            callback(tx, receipt)
+
+    return on_receipt
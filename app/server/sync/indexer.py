@@ -0,0 +1,145 @@
+import time
+
+from hexbytes import HexBytes
+from pymongo import UpdateMany
+
+from util.logging import get_logger
+
+from server.config import settings
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import get_collection_for_class, get_mongo_collection, invalidate_documents
+from server.sync.onchain import onchain
+from server.sync.policy import get_policy_nft_from_log
+from server.sync.risk import get_risk_id_from_log
+
+# follows new blocks and sets the onchain risk ids and policy nfts on the risk and policy
+# documents by tx hash. sync functions only submit transactions and store the tx hash,
+# no per transaction receipt wait is needed to pick up the ids created onchain.
+
+CHECKPOINT_COLLECTION = "Checkpoint"
+CHECKPOINT_ID = "indexer"
+
+# events of txs not yet stored in mongo are retried for this number of index runs
+MAX_UNMATCHED_RETRIES = 10
+
+# setup for module
+logger = get_logger()
+
+
+class LogIndexer:
+
+    def __init__(self, max_block_range: int = settings.INDEXER_MAX_BLOCK_RANGE, confirmations: int = settings.INDEXER_CONFIRMATIONS) -> None:
+        if max_block_range <= 0:
+            raise ValueError(f"max block range {max_block_range} invalid, must be positive")
+
+        self.max_block_range = max_block_range
+        self.confirmations = confirmations
+        self.risk_topic = HexBytes(onchain.riskSet.contract.events.LogRiskSetRiskAdded.topic)
+        self.policy_topic = HexBytes(onchain.product.contract.events.LogCropPolicyCreated.topic)
+        self._unmatched = {}
+
+    def index_new_blocks(self) -> int:
+        """Indexes all confirmed blocks after the checkpoint, returns the number of indexed blocks."""
+        head = onchain.w3.eth.block_number - self.confirmations
+        from_block = self.get_checkpoint()
+
+        if from_block is None:
+            from_block = settings.INDEXER_START_BLOCK if settings.INDEXER_START_BLOCK is not None else head
+
+        if from_block > head:
+            return 0
+
+        start_block = from_block
+        while from_block <= head:
+            to_block = min(from_block + self.max_block_range - 1, head)
+            self.index_range(from_block, to_block)
+            self.set_checkpoint(to_block + 1)
+            from_block = to_block + 1
+
+        return head - start_block + 1
+
+    def index_range(self, from_block: int, to_block: int) -> None:
+        """Fetches the risk and policy events of the block range with a single getLogs call and updates the matching documents."""
+        logs = onchain.product.get_logs({
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': [onchain.product.address, onchain.riskSet.address],
+            'topics': [[self.risk_topic.to_0x_hex(), self.policy_topic.to_0x_hex()]]
+        })
+
+        risk_ids = dict(self._unmatched.get(RiskOut, {}))
+        nfts = dict(self._unmatched.get(PolicyOut, {}))
+
+        for log in logs:
+            tx = log['transactionHash'].hex()
+            topic = log['topics'][0]
+
+            if topic == self.risk_topic:
+                risk_ids[tx] = (get_risk_id_from_log(log), 0)
+            elif topic == self.policy_topic:
+                nfts[tx] = (get_policy_nft_from_log(log), 0)
+
+        self._unmatched = {
+            RiskOut: self._update(RiskOut, 'risk_id', risk_ids),
+            PolicyOut: self._update(PolicyOut, 'nft', nfts),
+        }
+
+        logger.info(f"indexed blocks {from_block}-{to_block}, {len(logs)} events")
+
+    def get_checkpoint(self) -> int | None:
+        document = get_mongo_collection(CHECKPOINT_COLLECTION).find_one({settings.MONGO_ID_ATTRIBUTE: CHECKPOINT_ID})
+        return document['block'] if document else None
+
+    def set_checkpoint(self, block: int) -> None:
+        get_mongo_collection(CHECKPOINT_COLLECTION).update_one(
+            {settings.MONGO_ID_ATTRIBUTE: CHECKPOINT_ID},
+            {'$set': {'block': block}},
+            upsert=True)
+
+    def _update(self, cls, attribute: str, values: dict) -> dict:
+        """Sets the attribute on the documents with the provided tx hashes, returns the values without matching document."""
+        unmatched_txs = update_by_tx(cls, attribute, {tx: value for (tx, (value, _)) in values.items()})
+
+        # txs without document (tx hash not yet stored) are kept for the next runs
+        unmatched = {}
+        for tx in unmatched_txs:
+            (value, retries) = values[tx]
+
+            if retries < MAX_UNMATCHED_RETRIES:
+                unmatched[tx] = (value, retries + 1)
+            else:
+                logger.warning(f"no {cls.__name__} document for tx {tx} ({attribute} {value})")
+
+        return unmatched
+
+
+def update_by_tx(cls, attribute: str, values: dict) -> set:
+    """Sets the attribute on the documents with the provided tx hashes (without 0x), returns the txs without matching document."""
+    if len(values) == 0:
+        return set()
+
+    collection = get_collection_for_class(cls)
+    collection.bulk_write([
+        UpdateMany({'tx': {'$in': [tx, f"0x{tx}"]}}, {'$set': {attribute: value}})
+        for (tx, value) in values.items()], ordered=False)
+
+    documents = list(collection.find(
+        {'tx': {'$in': [tx for tx in values] + [f"0x{tx}" for tx in values]}}, {'tx': 1}))
+
+    invalidate_documents(collection.name, [document[settings.MONGO_ID_ATTRIBUTE] for document in documents])
+    matched = {document['tx'].removeprefix('0x') for document in documents}
+
+    return set(values.keys()) - matched
+
+def run_indexer(poll_interval: float = settings.INDEXER_POLL_INTERVAL_SECONDS) -> None:
+    indexer = LogIndexer()
+    logger.info(f"start log indexer for product {onchain.product.address} and risk set {onchain.riskSet.address}")
+
+    while True:
+        try:
+            indexer.index_new_blocks()
+        except Exception:
+            logger.exception("log indexer run failed")
+
+        time.sleep(poll_interval)
@@ -0,0 +1,69 @@
+from util.logging import get_logger
+
+from server.config import settings
+from server.model.job import JobOut
+from server.model.person import PersonOut
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import find_in_collection, get_filtered_list_of_models_in_collection
+from server.queue import JOB_PERSON_FUNDING, JOB_POLICY_SYNC, JOB_POLICY_SYNC_BULK, JOB_RISK_PAYOUT_SYNC, update_job_params
+from server.sync.bulk import sync_policies_onchain_bulk
+from server.sync.force import get_operator_nonce
+from server.sync.funding import fund_farmers
+from server.sync.policy import sync_policy_onchain
+from server.sync.risk import update_payout_factor_onchain
+
+# setup for module
+logger = get_logger()
+
+
+def run_policy_sync(entity_id: str, params: dict) -> dict | None:
+    policy = find_in_collection(entity_id, PolicyOut)
+    sync_policy_onchain(policy, params.get('force', False), params.get('sinceNonce'))
+    return None
+
+
+def run_policy_sync_bulk(entity_id: str, params: dict) -> dict | None:
+    policy_ids = params.get('policyIds')
+
+    # default: all policies not yet synched onchain
+    if not policy_ids:
+        policy_ids = [policy.id for policy in get_filtered_list_of_models_in_collection(PolicyOut, {"tx": None})]
+
+    return sync_policies_onchain_bulk(policy_ids, params.get('force', False), params.get('maxInFlight') or settings.SYNC_MAX_IN_FLIGHT_TXS, params.get('sinceNonce'))
+
+
+def run_person_funding(entity_id: str, params: dict) -> dict | None:
+    person_ids = params.get('personIds')
+
+    # default: all persons not yet funded onchain
+    if not person_ids:
+        person_ids = [person.id for person in get_filtered_list_of_models_in_collection(PersonOut, {"tx": None})]
+
+    return fund_farmers(person_ids, params.get('force', False), params.get('batchSize') or settings.FUNDING_BATCH_SIZE, params.get('maxInFlight') or settings.SYNC_MAX_IN_FLIGHT_TXS, params.get('sinceNonce'))
+
+
+def run_risk_payout_sync(entity_id: str, params: dict) -> dict | None:
+    risk = find_in_collection(entity_id, RiskOut)
+    tx = update_payout_factor_onchain(risk)
+    return {'tx': tx}
+
+
+def get_job_params(job: JobOut) -> dict:
+    """Returns the handler params, stores the operator nonce before the first attempt of a forced job.
+
+    Retries of the job only send the transactions not sent since this nonce (see server.sync.force)."""
+    if not job.params.get('force') or job.params.get('sinceNonce') is not None:
+        return job.params
+
+    params = {**job.params, 'sinceNonce': get_operator_nonce()}
+    update_job_params(job, params)
+    return params
+
+
+JOB_HANDLERS = {
+    JOB_POLICY_SYNC: run_policy_sync,
+    JOB_POLICY_SYNC_BULK: run_policy_sync_bulk,
+    JOB_RISK_PAYOUT_SYNC: run_risk_payout_sync,
+    JOB_PERSON_FUNDING: run_person_funding,
+}
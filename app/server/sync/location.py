@@ -1,28 +1,37 @@
 from util.logging import get_logger
+from web3utils.short_string import to_str
 
 from server.config import settings
 from server.model.location import LocationOut
-from server.mongo import update_in_collection
-from server.sync.onchain import operator, product
+from server.mongo import update_fields_in_collection
+from server.sync.force import needs_sync
+from server.sync.onchain import onchain, send_tx
 
 # setup for module
 logger = get_logger()
 
-def sync_location_onchain(location: LocationOut, force: bool = False):
-    if not force and location.tx:
+def sync_location_onchain(location: LocationOut, force: bool = False, since_nonce: int | None = None):
+    if not needs_sync(location.tx, force, since_nonce):
         logger.info(f"location {location.id} already synched onchain (tx: {location.tx})") 
         return
 
     logger.info(f"synching location {location.id} onchain")
 
-    id = product.toStr(location.id)
-    latitude = int(location.latitude * 10 ** settings.LOCATION_DECIMALS)
-    longitude = int(location.longitude * 10 ** settings.LOCATION_DECIMALS)
+    (id, latitude, longitude) = get_location_args(location)
 
     # execute transaction
-    tx = product.createLocation(id, latitude, longitude, {'from': operator})
+    tx = send_tx(f"createLocation of location {location.id}",
+        lambda: onchain.product.createLocation(id, latitude, longitude, {'from': onchain.operator, 'wait': False}))
     logger.info(f"tx {tx} location {location.id} latitude {latitude} longitude {longitude} created")
 
     # update location with tx
     location.tx = tx
-    update_in_collection(location, LocationOut)
+    update_fields_in_collection(location, LocationOut)
+
+
+def get_location_args(location: LocationOut) -> tuple:
+    """Returns the arguments for product.createLocation."""
+    return (
+        to_str(location.id),
+        int(location.latitude * 10 ** settings.LOCATION_DECIMALS),
+        int(location.longitude * 10 ** settings.LOCATION_DECIMALS))
@@ -1,18 +1,104 @@
+import threading
+
 from util.logging import get_logger
 from web3 import Web3
 from web3utils.contract import Contract
 from web3utils.wallet import Wallet
 
 from server.config import settings
+from server.error import ERROR, SyncError, raise_with_log
+
+ABI_PATH = "./app/abi"
 
 # setup for module
 logger = get_logger()
 
-w3 = Web3(Web3.HTTPProvider(settings.RPC_NODE_URL))
-product = Contract(w3, "CropProduct", settings.PRODUCT_CONTRACT_ADDRESS, out_path="./app/abi")
-instance = Contract(w3, "Instance", product.getInstance(), out_path="./app/abi")
-riskSet = Contract(w3, "RiskSet", instance.getRiskSet(), out_path="./app/abi")
-token = Contract(w3, "AccountingToken", product.getToken(), out_path="./app/abi")
 
-operator = Wallet.from_mnemonic(settings.OPERATOR_WALLET_MNEMONIC, index=settings.OPERATOR_ACCOUNT_INDEX)
-logger.info(f"operator wallet {operator.address}")
+class Onchain:
+    """Lazy onchain handles (web3, contracts, operator wallet).
+
+    Nothing connects to the rpc node on import, each handle is resolved and
+    memoized on first use (or by warm_up in the background at app startup).
+    """
+
+    def __init__(self) -> None:
+        self._handles = {}
+        self._lock = threading.RLock()
+
+    @property
+    def w3(self) -> Web3:
+        return self._resolve('w3', lambda: Web3(Web3.HTTPProvider(settings.RPC_NODE_URL)))
+
+    @property
+    def product(self) -> Contract:
+        return self._resolve('product', lambda: self._create_contract("CropProduct", settings.PRODUCT_CONTRACT_ADDRESS))
+
+    @property
+    def instance(self) -> Contract:
+        return self._resolve('instance', lambda: self._create_contract("Instance", self.product.getInstance()))
+
+    @property
+    def riskSet(self) -> Contract:
+        return self._resolve('riskSet', lambda: self._create_contract("RiskSet", self.instance.getRiskSet()))
+
+    @property
+    def token(self) -> Contract:
+        return self._resolve('token', lambda: self._create_contract("AccountingToken", self.product.getToken()))
+
+    @property
+    def multisend(self) -> Contract | None:
+        """Multisend contract for batched farmer funding, None if not deployed/configured."""
+        return self._resolve('multisend', lambda: self._create_contract("Multisend", settings.MULTISEND_CONTRACT_ADDRESS) if settings.MULTISEND_CONTRACT_ADDRESS else None)
+
+    @property
+    def operator(self) -> Wallet:
+        return self._resolve('operator', self._create_operator)
+
+    def is_ready(self) -> bool:
+        return all(name in self._handles for name in ['w3', 'product', 'instance', 'riskSet', 'token', 'operator'])
+
+    def warm_up(self) -> None:
+        """Resolves all handles, failures are logged and retried on next use."""
+        try:
+            (self.riskSet, self.token, self.operator)
+            logger.info(f"onchain handles ready (product {self.product.address})")
+        except Exception as e:
+            logger.warning(f"onchain warm up failed: {e}")
+
+    def reset(self) -> None:
+        with self._lock:
+            self._handles.clear()
+
+    def _resolve(self, name: str, create):
+        handle = self._handles.get(name)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            if name not in self._handles:
+                self._handles[name] = create()
+
+            return self._handles[name]
+
+    def _create_contract(self, name: str, address: str | None) -> Contract:
+        # contract reads return None on rpc errors, do not memoize contracts without address
+        if not address:
+            raise ValueError(f"no address for contract {name} (rpc node {settings.RPC_NODE_URL} reachable?)")
+
+        return Contract(self.w3, name, address, out_path=ABI_PATH)
+
+    def _create_operator(self) -> Wallet:
+        operator = Wallet.from_mnemonic(settings.OPERATOR_WALLET_MNEMONIC, index=settings.OPERATOR_ACCOUNT_INDEX)
+        logger.info(f"operator wallet {operator.address}")
+        return operator
+
+
+onchain = Onchain()
+
+
+def send_tx(description: str, send):
+    """Returns the result of send (a contract write), send errors are raised as SyncError with the original error as cause."""
+    try:
+        return send()
+    except Exception as e:
+        raise_with_log(SyncError, f"{description} failed: {e.__class__.__name__}: {e}", ERROR, e)
@@ -0,0 +1,101 @@
+from collections import deque
+
+from pymongo import UpdateOne
+
+from util.logging import get_logger
+from web3utils.nonce import wait_for_receipt
+
+from server.config import settings
+from server.mongo import get_collection_for_class, invalidate_documents
+from server.sync.onchain import onchain
+
+# setup for module
+logger = get_logger()
+
+
+class TxPipeline:
+    """Sends transactions back-to-back with a bounded number of transactions in flight.
+
+    Receipts are harvested oldest first (operator transactions are mined in nonce order),
+    the on_receipt callback of a transaction is called once it is mined successfully.
+    A transaction may be submitted for a list of keys (e.g. a multisend to several persons),
+    errors are then recorded for each key.
+    """
+
+    def __init__(self, max_in_flight: int) -> None:
+        if max_in_flight <= 0:
+            raise ValueError(f"max in flight {max_in_flight} invalid, must be positive")
+
+        self.max_in_flight = max_in_flight
+        self.errors = {}
+        self.submitted = 0
+        self._pending = deque()
+
+    def submit(self, key: str | list[str], send, on_receipt = None) -> None:
+        try:
+            tx = send()
+        except Exception as e:
+            logger.warning(f"failed to send tx for {key}: {e}")
+            self._set_error(key, str(e))
+            return
+
+        self.submitted += 1
+        self._pending.append((key, tx, on_receipt))
+
+        while len(self._pending) >= self.max_in_flight:
+            self._harvest()
+
+    def drain(self) -> None:
+        while len(self._pending) > 0:
+            self._harvest()
+
+    def failed(self, *keys) -> bool:
+        return any(key in self.errors for key in keys)
+
+    def _harvest(self) -> None:
+        (key, tx, on_receipt) = self._pending.popleft()
+
+        try:
+            receipt = wait_for_receipt(onchain.w3, tx)
+            if receipt['status'] != 1:
+                raise ValueError(f"tx {tx} failed")
+
+            if on_receipt:
+                on_receipt(tx, receipt)
+
+        except Exception as e:
+            logger.warning(f"tx {tx} for {key} failed: {e}")
+            self._set_error(key, str(e))
+
+    def _set_error(self, key: str | list[str], error: str) -> None:
+        for k in (key if isinstance(key, list) else [key]):
+            self.errors[k] = error
+
+
+def set_fields(updates: dict, cls, obj, get_fields = None):
+    """Returns a receipt callback collecting the update for the provided object."""
+    def on_receipt(tx: str, receipt) -> None:
+        fields = {'tx': tx}
+        if get_fields:
+            fields.update(get_fields(receipt))
+
+        for (name, value) in fields.items():
+            setattr(obj, name, value)
+
+        updates.setdefault(cls, []).append((obj.id, UpdateOne({settings.MONGO_ID_ATTRIBUTE: obj.id}, {'$set': fields})))
+
+    return on_receipt
+
+
+def complete_tier(pipeline: TxPipeline, updates: dict) -> None:
+    """Waits for all transactions in flight and writes the collected updates in bulk per class."""
+    pipeline.drain()
+
+    for (cls, entries) in updates.items():
+        if len(entries) > 0:
+            collection = get_collection_for_class(cls)
+            result = collection.bulk_write([operation for (_, operation) in entries], ordered=False)
+            invalidate_documents(collection.name, [document_id for (document_id, _) in entries])
+            logger.info(f"{result.modified_count} documents updated in {cls.__name__}")
+
+    updates.clear()
@@ -2,20 +2,21 @@ from datetime import datetime
 from util.logging import get_logger
 
 from server.config import settings
-from server.mongo import find_in_collection, update_in_collection
+from server.mongo import find_in_collection, update_fields_in_collection
 from server.model.person import PersonOut
 from server.model.policy import PolicyOut
 from server.model.risk import RiskOut
-from server.sync.onchain import operator, product, token
+from server.sync.force import needs_sync
+from server.sync.onchain import onchain, send_tx
 
 from server.sync.person import sync_person_onchain
-from server.sync.risk import sync_risk_onchain
+from server.sync.risk import get_risk_id, sync_risk_onchain
 
 # setup for module
 logger = get_logger()
 
-def sync_policy_onchain(policy: PolicyOut, force: bool = False):
-    if not force and policy.tx:
+def sync_policy_onchain(policy: PolicyOut, force: bool = False, since_nonce: int | None = None):
+    if not needs_sync(policy.tx, force, since_nonce):
         logger.info(f"policy {policy.id} already synced onchain (nft {policy.nft}")
         return
 
@@ -23,36 +24,47 @@ def sync_policy_onchain(policy: PolicyOut, force: bool = False):
 
     # sync person if not yet done
     person = find_in_collection(policy.personId, PersonOut)
-    sync_person_onchain(person, force)
+    sync_person_onchain(person, force, since_nonce)
 
     # sync risk if not yet done
     risk = find_in_collection(policy.riskId, RiskOut)
-    sync_risk_onchain(risk, force)
+    sync_risk_onchain(risk, force, since_nonce)
 
     # execute transaction
-    policy_holder = person.wallet
-    risk_id_str = product.toStr(risk.id)
-    risk_id = product.getRiskId(risk_id_str)
-    subscription_date = datetime.fromisoformat(policy.subscriptionDate)
-    activate_at = int(subscription_date.timestamp())
-    sum_insured = int(policy.sumInsuredAmount * 10 ** token.decimals())
-    premium = int(policy.premiumAmount * 10 ** token.decimals())
+    risk_id = risk.risk_id or get_risk_id(onchain.product.w3, risk.tx)
+    (policy_holder, risk_id, activate_at, sum_insured, premium) = get_policy_args(policy, person, risk_id, onchain.token.decimals())
 
     logger.info(f"creating policy policy_holder {policy_holder} risk_id {risk_id} activate_at {activate_at} sum_insured {sum_insured} premium {premium}")
-    tx = product.createPolicy(policy_holder, risk_id, activate_at, sum_insured, premium, {'from': operator, 'gasLimit': 10000000, 'gasPrice': settings.GAS_PRICE})
+    tx = send_tx(f"createPolicy of policy {policy.id}",
+        lambda: onchain.product.createPolicy(policy_holder, risk_id, activate_at, sum_insured, premium, {'from': onchain.operator, 'gasLimit': 10000000, 'gasPrice': settings.GAS_PRICE, 'wait': False}))
 
     logger.info(f"{tx} onchain policy {policy.id} created")
 
-    # update policy with tx
+    # update policy with tx, policy nft is set by the indexer (see server.sync.indexer)
     policy.tx = tx
+    update_fields_in_collection(policy, PolicyOut)
+
+
+def get_policy_args(policy: PolicyOut, person: PersonOut, risk_id, decimals: int) -> tuple:
+    """Returns the arguments for product.createPolicy."""
+    subscription_date = datetime.fromisoformat(policy.subscriptionDate)
 
-    # update policy with policy nft
-    receipt = product.w3.eth.wait_for_transaction_receipt(tx)
+    return (
+        person.wallet,
+        risk_id,
+        int(subscription_date.timestamp()),
+        int(policy.sumInsuredAmount * 10 ** decimals),
+        int(policy.premiumAmount * 10 ** decimals))
+
+
+def get_policy_nft_from_receipt(receipt) -> int:
     logs = receipt['logs']
-    logger.debug(f"policy {policy.id} transaction logs {logs}")
+    logger.debug(f"policy transaction logs {logs}")
+
+    log = [log for log in logs if log['address'].lower() == onchain.product.address.lower()][0]
+    logger.info(f"policy nft log {log}")
+    return get_policy_nft_from_log(log)
 
-    log = [log for log in logs if log['address'].lower() == product.address.lower()][0]
-    logger.info(f"policy {policy.id} policy nft log {log}")
 
-    policy.nft = product.contract.events.LogCropPolicyCreated.process_log(log).args.policyNftId
-    update_in_collection(policy, PolicyOut)
+def get_policy_nft_from_log(log) -> int:
+    return onchain.product.contract.events.LogCropPolicyCreated.process_log(log).args.policyNftId
@@ -1,22 +1,24 @@
 from datetime import datetime, timedelta
 from util.logging import get_logger
 from web3 import Web3
+from web3utils.short_string import to_str
 
 from server.model.config import ConfigOut
 from server.model.location import LocationOut
 from server.model.risk import RiskOut
-from server.mongo import find_in_collection, update_in_collection
+from server.mongo import find_in_collection, update_fields_in_collection
 from server.sync.config import sync_config_onchain
+from server.sync.force import needs_sync
 from server.sync.location import sync_location_onchain
-from server.sync.onchain import operator, product, riskSet
+from server.sync.onchain import onchain, send_tx
 
 U_FIXED_EXP = 15
 
 # setup for module
 logger = get_logger()
 
-def sync_risk_onchain(risk: RiskOut, force: bool = False) -> str:
-    if not force and risk.tx:
+def sync_risk_onchain(risk: RiskOut, force: bool = False, since_nonce: int | None = None) -> str:
+    if not needs_sync(risk.tx, force, since_nonce):
         logger.info(f"risk {risk.id} already synched onchain (tx: {risk.tx})")
         return
 
@@ -24,39 +26,55 @@ def sync_risk_onchain(risk: RiskOut, force: bool = False) -> str:
 
     # sync configuration (season) if not yet done
     config = find_in_collection(risk.configId, ConfigOut)
-    sync_config_onchain(config, force)
+    sync_config_onchain(config, force, since_nonce)
 
     # sync risk if not yet done
     location = find_in_collection(risk.locationId, LocationOut)
-    sync_location_onchain(location, force)
+    sync_location_onchain(location, force, since_nonce)
 
     # execute transaction
-    id = product.toStr(risk.id)
-    season_id = product.toStr(config.id)
-    location_id = product.toStr(location.id)
-    crop = product.toStr(risk.crop)
-    season_end_at = int(
-        (datetime.fromisoformat(config.startOfSeason) + timedelta(days=config.seasonDays)).timestamp())
+    (id, season_id, location_id, crop, season_end_at) = get_risk_args(risk, config)
 
-    tx = product.createRisk(id, season_id, location_id, crop, season_end_at, {'from': operator})
+    tx = send_tx(f"createRisk of risk {risk.id}",
+        lambda: onchain.product.createRisk(id, season_id, location_id, crop, season_end_at, {'from': onchain.operator, 'wait': False}))
     logger.info(f"tx {tx} risk {risk.id} season {config.id} ({config.name}) location {location.id} ({location.latitude}/{location.longitude}) crop {risk.crop} created")
 
-    # update risk with tx and risk id
+    # update risk with tx, risk id is set by the indexer (see server.sync.indexer)
     risk.tx = tx
-    risk.risk_id = get_risk_id(product.w3, tx)
-    update_in_collection(risk, RiskOut)
+    update_fields_in_collection(risk, RiskOut)
 
     return tx
 
 
+def get_risk_args(risk: RiskOut, config: ConfigOut) -> tuple:
+    """Returns the arguments for product.createRisk."""
+    season_end_at = int(
+        (datetime.fromisoformat(config.startOfSeason) + timedelta(days=config.seasonDays)).timestamp())
+
+    return (
+        to_str(risk.id),
+        to_str(config.id),
+        to_str(risk.locationId),
+        to_str(risk.crop),
+        season_end_at)
+
+
 def get_risk_id(w3:Web3, tx:str) -> str:
     receipt = w3.eth.wait_for_transaction_receipt(tx)
+    return get_risk_id_from_receipt(receipt)
+
+
+def get_risk_id_from_receipt(receipt) -> str:
     logs = receipt['logs']
-    logger.debug(f"risk {id} creation logs {logs}")
+    logger.debug(f"risk creation logs {logs}")
+
+    log = [log for log in logs if log['address'].lower() == onchain.riskSet.address.lower()][0]
+    logger.info(f"risk id log {log}")
+    return get_risk_id_from_log(log)
+
 
-    log = [log for log in logs if log['address'].lower() == riskSet.address.lower()][0]
-    logger.info(f"risk {id} id log {log}")
-    return f"0x{riskSet.contract.events.LogRiskSetRiskAdded.process_log(log).args.riskId.hex()}"
+def get_risk_id_from_log(log) -> str:
+    return f"0x{onchain.riskSet.contract.events.LogRiskSetRiskAdded.process_log(log).args.riskId.hex()}"
 
 
 def update_payout_factor_onchain(risk: RiskOut) -> str:
@@ -66,12 +84,12 @@ def update_payout_factor_onchain(risk: RiskOut) -> str:
     
     risk_id = risk.risk_id
     if not risk.risk_id:
-        risk_id = get_risk_id(product.w3, risk.tx)
+        risk_id = get_risk_id(onchain.product.w3, risk.tx)
     
     payout_factor = to_u_fixed(risk.finalPayout)
     logger.info(f"updating risk {risk.id} payout factor to {risk.finalPayout} ({payout_factor}) onchain")
 
-    tx = product.updatePayoutFactor(risk_id, payout_factor, {'from': operator})
+    tx = send_tx(f"updatePayoutFactor of risk {risk.id}", lambda: onchain.product.updatePayoutFactor(risk_id, payout_factor, {'from': onchain.operator}))
     logger.info(f"tx {tx} risk {risk.id} payout factor updated to {payout_factor}")
 
     return tx
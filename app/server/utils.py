@@ -18,10 +18,11 @@ NANO_ID_SIZE=12
 
 logger = get_logger()
 
-def create_app(settings: Settings) -> FastAPI:
+def create_app(settings: Settings, lifespan = None) -> FastAPI:
     return FastAPI(
         title=settings.APP_TITLE,
-        debug=settings.APP_DEBUG)
+        debug=settings.APP_DEBUG,
+        lifespan=lifespan)
 
 
 def include_router(app: FastAPI, router: APIRouter, message: str) -> None:
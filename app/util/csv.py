@@ -1,6 +1,7 @@
 import csv
-import tempfile
+import io
 
+from server.error import raise_with_log
 from util.logging import get_logger
 
 logger = get_logger()
@@ -29,18 +30,28 @@ def validate_column_headers_csv(csv_row, header, exception_type):
             ))
 
 
-def write_csv_temp_file(field_names:list[str], data:list, delimiter:str) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as temp_file:
-        temp_file_path = temp_file.name
+async def stream_csv(field_names:list[str], data, delimiter:str, chunk_rows:int):
+    """Yields utf-8 encoded csv chunks of chunk_rows rows from the provided async iterable of dicts."""
+    buffer = io.StringIO()
+    csv_writer = csv.DictWriter(buffer, fieldnames=field_names, extrasaction='ignore', delimiter=delimiter)
+    csv_writer.writeheader()
+    rows = 0
 
-    with open(temp_file_path, 'w', newline='', encoding='utf-8') as f:
-        csv_writer = csv.DictWriter(f, fieldnames=field_names, extrasaction='ignore', delimiter=delimiter)
-        csv_writer.writeheader()
+    async for row in data:
+        csv_writer.writerow(row)
+        rows += 1
 
-        for row in data:
-            csv_writer.writerow(row)
+        if rows % chunk_rows == 0:
+            yield _flush_buffer(buffer)
 
-    return temp_file_path
+    yield _flush_buffer(buffer)
+
+
+def _flush_buffer(buffer:io.StringIO) -> bytes:
+    chunk = buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
 
 
 def load_csv(csv_file_path, with_header_row=True, delimiter=','):
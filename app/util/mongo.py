@@ -1,29 +1,141 @@
 import json
 import sys
+import threading
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.errors import CollectionInvalid
+from pymongo.monitoring import ConnectionPoolListener
 from util.logging import get_logger
 
+# shared mongodb connections and collection registry.
+# one pooled client per uri (and kind, sync or async) per process, the collections
+# of a database are listed once (bootstrap), missing collections are created once.
+
+MAX_POOL_SIZE = 100
+MIN_POOL_SIZE = 0
+MAX_IDLE_TIME_MS = 60000
+WAIT_QUEUE_TIMEOUT_MS = 10000
+
 logger = get_logger()
 
-def get_client(db_uri:str) -> MongoClient:
-    logger.info(f"connecting to mongo {db_uri} ...")
-    mongo = MongoClient(db_uri)
-    logger.info(f"connected with database {mongo.get_database().name}")
-    return mongo
+
+class PoolStats(ConnectionPoolListener):
+    """Connection pool counters of all shared clients (pymongo pool events)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = {
+            'pools': 0,
+            'connectionsOpen': 0,
+            'connectionsCreated': 0,
+            'connectionsClosed': 0,
+            'checkedOut': 0,
+            'checkOuts': 0,
+            'checkOutFailures': 0
+        }
+
+    def get(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+    def _add(self, **increments) -> None:
+        with self._lock:
+            for (name, increment) in increments.items():
+                self._counters[name] += increment
+
+    def pool_created(self, event) -> None:
+        self._add(pools=1)
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        self._add(pools=-1)
+
+    def connection_created(self, event) -> None:
+        self._add(connectionsOpen=1, connectionsCreated=1)
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        self._add(connectionsOpen=-1, connectionsClosed=1)
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        self._add(checkOutFailures=1)
+
+    def connection_checked_out(self, event) -> None:
+        self._add(checkedOut=1, checkOuts=1)
+
+    def connection_checked_in(self, event) -> None:
+        self._add(checkedOut=-1)
+
+
+pool_stats = PoolStats()
+
+clients = {}
+collection_names = {}
+registry_lock = threading.Lock()
+
+
+def get_client(db_uri:str, **pool_options) -> MongoClient:
+    """Returns the shared pooled client for the uri, created on first use."""
+    return _get_shared_client(MongoClient, db_uri, pool_options)
+
 
 def get_collection(mongo, collection_name, create=False):
     db = mongo.get_database()
-    logger.info(f"database {db} fetched")
+    key = (id(mongo), db.name)
 
-    collection = db.get_collection(collection_name)
-    logger.info(f"collection {collection} obtained")
+    with registry_lock:
+        # bootstrap, list the collections of the database once
+        if key not in collection_names:
+            collection_names[key] = set(db.list_collection_names())
+            logger.info(f"{len(collection_names[key])} collections found in database {db.name}")
+
+        names = collection_names[key]
+
+        # check source collection exists
+        if not collection_name in names:
+            if create:
+                logger.info(f"creating collection '{collection_name}' in db")
+                _create_collection(db, collection_name)
+                names.add(collection_name)
+            else:
+                logger.error(f"no collection '{collection_name}' found in db")
+                return None
+
+    return db[collection_name]
+
+
+def get_async_client(db_uri:str, **pool_options) -> AsyncMongoClient:
+    """Returns the shared pooled async client for the uri, created on first use."""
+    return _get_shared_client(AsyncMongoClient, db_uri, pool_options)
+
+async def get_async_collection(mongo, collection_name, create=False):
+    db = mongo.get_database()
+    key = (id(mongo), db.name)
+
+    # bootstrap, list the collections of the database once (concurrent bootstraps are harmless)
+    if key not in collection_names:
+        names = set(await db.list_collection_names())
+        collection_names.setdefault(key, names)
+        logger.info(f"{len(names)} collections found in database {db.name}")
+
+    names = collection_names[key]
 
     # check source collection exists
-    if not collection_name in db.list_collection_names():
+    if not collection_name in names:
         if create:
             logger.info(f"creating collection '{collection_name}' in db")
-            db.create_collection(collection_name)
+            await _create_async_collection(db, collection_name)
+            names.add(collection_name)
         else:
             logger.error(f"no collection '{collection_name}' found in db")
             return None
@@ -31,6 +143,56 @@ def get_collection(mongo, collection_name, create=False):
     return db[collection_name]
 
 
+def get_pool_stats() -> dict:
+    """Returns the pool counters and the pool options of the shared clients."""
+    stats = pool_stats.get()
+    stats['clients'] = [
+        {
+            'type': client_type.__name__,
+            'maxPoolSize': client.options.pool_options.max_pool_size,
+            'minPoolSize': client.options.pool_options.min_pool_size
+        }
+        for ((client_type, _), client) in list(clients.items())]
+
+    return stats
+
+
+def _get_shared_client(client_type, db_uri:str, pool_options:dict):
+    key = (client_type, db_uri)
+
+    with registry_lock:
+        if key not in clients:
+            options = {
+                'maxPoolSize': MAX_POOL_SIZE,
+                'minPoolSize': MIN_POOL_SIZE,
+                'maxIdleTimeMS': MAX_IDLE_TIME_MS,
+                'waitQueueTimeoutMS': WAIT_QUEUE_TIMEOUT_MS
+            }
+            options.update({name: value for (name, value) in pool_options.items() if value is not None})
+
+            logger.info(f"connecting {client_type.__name__} to mongo {db_uri} ({options}) ...")
+            mongo = client_type(db_uri, event_listeners=[pool_stats], **options)
+            clients[key] = mongo
+
+        return clients[key]
+
+
+def _create_collection(db, collection_name):
+    try:
+        db.create_collection(collection_name)
+    except CollectionInvalid:
+        # created concurrently by another process
+        pass
+
+
+async def _create_async_collection(db, collection_name):
+    try:
+        await db.create_collection(collection_name)
+    except CollectionInvalid:
+        # created concurrently by another process
+        pass
+
+
 def get_pipeline(pipeline_file:str):
     logger.info(f"read mongo db pipeline from file {pipeline_file}")
 
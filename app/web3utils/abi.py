@@ -0,0 +1,79 @@
+import hashlib
+import json
+import threading
+
+from typing import Any, Dict, List
+
+from eth_abi.codec import ABICodec
+from eth_utils.abi import abi_to_signature, get_abi_input_types, get_abi_output_types
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS, abi_address_to_hex, abi_bytes_to_bytes, abi_string_to_text
+
+
+INPUT_NORMALIZERS = [abi_address_to_hex, abi_bytes_to_bytes, abi_string_to_text]
+
+
+class AbiMethod:
+    """A contract function compiled once per abi.
+
+    Holds the signature, the 4 byte selector, the abi types and the (curried)
+    argument and return value normalizers, so calls only encode the arguments
+    and decode the return data.
+    """
+
+    def __init__(self, abi:Dict[str, Any]) -> None:
+        self.abi = abi
+        self.name = abi['name']
+        self.mutability = abi.get('stateMutability')
+        self.inputs = abi.get('inputs', [])
+        self.outputs = abi.get('outputs', [])
+        self.argument_names = tuple(item['name'] for item in self.inputs)
+        self.signature = abi_to_signature(abi)
+        self.selector = Web3.keccak(text=self.signature)[:4]
+        self.selector_hex = self.selector.hex()
+        self.input_types = get_abi_input_types(abi)
+        self.output_types = get_abi_output_types(abi)
+        self._normalize_inputs = map_abi_data(INPUT_NORMALIZERS, self.input_types)
+        self._normalize_outputs = map_abi_data(BASE_RETURN_NORMALIZERS, self.output_types)
+
+    def is_read(self) -> bool:
+        return self.mutability in ['view', 'pure']
+
+    def encode(self, codec:ABICodec, args:tuple|list) -> bytes:
+        """Returns the call data (selector and encoded arguments) for the provided arguments."""
+        if len(args) != len(self.input_types):
+            raise TypeError(f"{self.signature} expects {len(self.input_types)} arguments, {len(args)} provided")
+
+        return self.selector + codec.encode(self.input_types, self._normalize_inputs(list(args)))
+
+    def decode(self, codec:ABICodec, data:bytes) -> Any:
+        """Decodes the return data, a single value is returned as such (same as web3 call())."""
+        values = self._normalize_outputs(codec.decode(self.output_types, data))
+        return values[0] if len(values) == 1 else values
+
+
+tables = {}
+tables_lock = threading.Lock()
+
+
+def get_method_table(abi:List[Dict[str, Any]]) -> Dict[str, AbiMethod]:
+    """Returns the compiled functions of the abi by name, shared by all contracts with the same abi.
+
+    Overloaded functions are not compiled (they are resolved by web3 per call)."""
+    key = get_abi_hash(abi)
+
+    with tables_lock:
+        if key not in tables:
+            functions = [item for item in abi if item.get('type') == 'function']
+            names = [item['name'] for item in functions]
+            tables[key] = {
+                item['name']: AbiMethod(item)
+                for item in functions
+                if names.count(item['name']) == 1}
+
+        return tables[key]
+
+
+def get_abi_hash(abi:List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(json.dumps(abi, sort_keys=True).encode()).hexdigest()
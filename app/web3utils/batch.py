@@ -0,0 +1,44 @@
+from typing import Any
+
+from web3 import Web3
+
+from util.logging import get_logger
+
+# batched contract reads over json-rpc batch requests.
+# a list of prepared contract function calls (contract.functions.f(args))
+# is sent as a single http request per chunk of BATCH_SIZE calls.
+
+BATCH_SIZE = 100
+
+# setup for module
+logger = get_logger()
+
+
+def batch_call(w3: Web3, calls: list, batch_size: int = BATCH_SIZE) -> list[Any]:
+    """Returns the decoded results of the provided contract function calls in the order provided.
+
+    Falls back to sequential calls if the node rejects a batch,
+    errors of individual calls are raised as with call()."""
+    results = []
+
+    for start in range(0, len(calls), batch_size):
+        chunk = calls[start:start + batch_size]
+
+        try:
+            with w3.batch_requests() as batch:
+                for call in chunk:
+                    batch.add(call)
+
+                results.extend(batch.execute())
+
+        except Exception as e:
+            logger.warning(f"batch of {len(chunk)} calls failed, falling back to sequential calls: {e}")
+            results.extend([call.call() for call in chunk])
+
+    return results
+
+
+def batch_call_mapping(w3: Web3, calls: dict[str, Any], batch_size: int = BATCH_SIZE) -> dict[str, Any]:
+    """Same as batch_call for a dict of named calls, returns the results under the same names."""
+    names = list(calls.keys())
+    return dict(zip(names, batch_call(w3, list(calls.values()), batch_size)))
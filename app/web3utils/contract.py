@@ -2,13 +2,16 @@ import json
 import logging
 
 from functools import wraps
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from hexbytes import HexBytes
 from web3 import Web3
 from web3.contract import Contract as Web3Contract
 from web3.exceptions import TimeExhausted
 from web3.types import FilterParams
 
+from web3utils.abi import AbiMethod, get_method_table
+from web3utils.nonce import get_nonce_manager, wait_for_receipt
 from web3utils.wallet import Wallet
 
 class Contract:
@@ -18,70 +21,137 @@ class Contract:
     GAS = 1000000
     TX_TIMEOUT_SECONDS = 120
 
+    # parameterless read functions whose results never change for a deployment (cached per instance).
+    # parameterless pure functions are added automatically. UPPER_CASE getters are not, they may be
+    # mutable storage (e.g. CropProduct MIN_PREMIUM, set via setConstants), true constants are listed here
+    CONSTANTS = {
+        "CropProduct": ["getInstance", "getNftId", "getRegistry", "getToken", "getTokenHandler"],
+        "AccountingToken": ["DECIMALS", "INITIAL_SUPPLY", "NAME", "SYMBOL", "name", "symbol"],
+        "Instance": ["getInstanceReader", "getInstanceStore", "getNftId", "getRegistry", "getRiskSet"],
+        "RiskSet": ["getInstanceAddress", "getRegistry"],
+    }
+
     name:str|None = None
     abi:Dict[str, Any]|None = None
     address:str|None = None
     contract:Web3Contract|None = None
     w3:Web3|None = None
 
-    def __init__(self, w3:Web3, contract_name:str, contract_address:str, out_path:str = FOUNDRY_OUT):
+    def __init__(self, w3:Web3, contract_name:str, contract_address:str, out_path:str = FOUNDRY_OUT, constants:List[str]|None = None):
         self.w3 = w3
         self.name = contract_name
         self.abi = self._load_abi(contract_name, out_path)
         self.contract = w3.eth.contract(address=contract_address, abi=self.abi)
         self.address = self.contract.address
-        self._setup_functions()
+        self._events_by_topic = None
+        self._constants = {}
+        self._setup_functions(constants or [])
 
     def is_connected(self) -> bool:
         return self.w3.is_connected()
     
-    def get_logs(self, filter_params:FilterParams|None = None) -> Any:
+    def get_logs(self, filter_params:FilterParams|None = None, from_block:int|str|None = None, to_block:int|str|None = None) -> Any:
         if not filter_params:
             filter_params = {
-                'fromBlock': 'latest',
+                'fromBlock': from_block if from_block is not None else 'latest',
                 'address': self.address
             }
 
+            if to_block is not None:
+                filter_params['toBlock'] = to_block
+
         return self.w3.eth.get_logs(filter_params=filter_params)
 
-    def _setup_functions(self) -> None:
+    def decode_log(self, log:Dict[str, Any]) -> Any:
+        """Decodes the provided log with the matching event of the contract abi, returns None for unknown events."""
+        if len(log['topics']) == 0:
+            return None
+
+        if self._events_by_topic is None:
+            self._events_by_topic = {
+                HexBytes(event.topic): event
+                for event in self.contract.events
+                if not event.abi.get('anonymous', False)}
+
+        event = self._events_by_topic.get(HexBytes(log['topics'][0]))
+        if event is None:
+            return None
+
+        return event.process_log(log)
+
+    def _setup_functions(self, constants:List[str]) -> None:
+        # compiled once per abi and shared by all instances (selectors, abi types, normalizers)
+        self.methods = get_method_table(self.abi)
+        self.constant_names = self._get_constant_names(constants)
+
         for func in self.contract.abi:
             if func.get('type') == 'function':
                 func_name = func['name']
                 mutability = func.get('stateMutability')
 
                 if mutability in ['nonpayable', 'payable']:
-                    logging.info(f"creating {func_name}(...) tx")
+                    logging.debug(f"creating {func_name}(...) tx")
                     setattr(self, func_name, self._create_write_method(func_name))
                 elif mutability in ['view', 'pure']:
-                    logging.info(f"creating {func_name}(...) call")
+                    logging.debug(f"creating {func_name}(...) call")
                     setattr(self, func_name, self._create_read_method(func_name))
 
     def _create_read_method(self, func_name: str):
+        method = self.methods.get(func_name)
+        is_constant = func_name in self.constant_names
+
         def read_method(*args, **kwargs) -> Any:
+            if is_constant and not args and not kwargs and func_name in self._constants:
+                return self._constants[func_name]
+
             try:
                 modified_args = [arg.address if isinstance(arg, Wallet) else arg for arg in args]
-                return getattr(self.contract.functions, func_name)(*modified_args, **kwargs).call()
+
+                # compiled call: encode, eth_call, decode without the web3 function lookup
+                if method and not kwargs:
+                    result = method.decode(self.w3.codec, self.w3.eth.call({'to': self.address, 'data': method.encode(self.w3.codec, modified_args)}))
+                else:
+                    result = getattr(self.contract.functions, func_name)(*modified_args, **kwargs).call()
             except Exception as e:
                 logging.warning(f"Error calling function '{func_name}': {e}")
                 return None
 
+            if is_constant and not args and not kwargs:
+                self._constants[func_name] = result
+
+            return result
+
         # add docstrings signature and selector
         self._amend_method(read_method, func_name)
 
         return read_method
 
+    def _get_constant_names(self, constants:List[str]) -> set:
+        names = set(self.CONSTANTS.get(self.name, [])) | set(constants)
+
+        for func in self.abi:
+            if func.get('type') == 'function' and len(func.get('inputs', [])) == 0:
+                if func.get('stateMutability') == 'pure':
+                    names.add(func['name'])
+
+        return names
+
     def _amend_method(self, method, name):
         method.__name__ = name
         method.__doc__ = f"Calls the '{name}' contract function."
 
-        signature = getattr(self.contract.functions, name).signature
-        method.signature = signature
-        method.argument_names = getattr(self.contract.functions, name).argument_names
-        method.inputs = getattr(self.contract.functions, name).abi['inputs']
-        method.outputs = getattr(self.contract.functions, name).abi['outputs']
-        method.selector = Web3.keccak(text=signature)[:4]
-        method.selector_hex = method.selector.hex()
+        compiled = self.methods.get(name)
+        if compiled is None:
+            # overloaded function, resolved by web3
+            function = getattr(self.contract.functions, name)
+            compiled = AbiMethod(function.abi)
+
+        method.signature = compiled.signature
+        method.argument_names = compiled.argument_names
+        method.inputs = compiled.inputs
+        method.outputs = compiled.outputs
+        method.selector = compiled.selector
+        method.selector_hex = compiled.selector_hex
 
     def _get_tx_params(self, args:tuple) -> Dict[str, Any]:
         if len(args) == 0:
@@ -101,59 +171,67 @@ class Contract:
         return tx_params
 
     def _create_write_method(self, func_name: str):
+        method = self.methods.get(func_name)
+
         def write_method(*args) -> str:
             tx_params = self._get_tx_params(args)
             function_args = args[:-1]
+            nonce_manager = get_nonce_manager(self.w3)
 
             try:
                 wallet = tx_params['from']
 
-                # create tx properties
-                chain_id = self.w3.eth.chain_id
+                # create tx properties (chain id and gas price cached, nonce tracked locally)
+                chain_id = nonce_manager.chain_id()
                 gas = tx_params.get('gas', self.GAS)
-                gas_price = tx_params.get('gasPrice', self.w3.eth.gas_price)
-                nonce = self.w3.eth.get_transaction_count(wallet.address)
+                gas_price = tx_params.get('gasPrice') or nonce_manager.gas_price()
 
-                # transform wallet args to addresses (str)
+                # transform wallet args to addresses (str)
                 modified_args = [arg.address if isinstance(arg, Wallet) else arg for arg in function_args]
 
-                # create tx
-                txn = getattr(self.contract.functions, func_name)(*modified_args).build_transaction({
+                # create tx (compiled call data, web3 for overloaded functions)
+                tx_fields = {
                     'chainId': chain_id,
                     'gas': gas,
                     'gasPrice': gas_price,
-                    'nonce': nonce,
-                })
+                    'nonce': nonce_manager.next_nonce(wallet.address),
+                    'value': tx_params.get('value', 0),
+                }
 
-                # sign tx
-                private_key = bytes(wallet.account.key)
-                signed_txn = self.w3.eth.account.sign_transaction(txn, private_key=private_key)
+                if method:
+                    txn = {**tx_fields, 'to': self.address, 'data': method.encode(self.w3.codec, modified_args)}
+                else:
+                    txn = getattr(self.contract.functions, func_name)(*modified_args).build_transaction(tx_fields)
 
-                # send signed transaction
-                tx_hash = self.w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                # sign and send tx
+                tx_hash = nonce_manager.send_transaction(wallet.account, txn)
                 logging.info(f"Transaction sent: {tx_hash.hex()}")
 
-                if 'timeout' not in tx_params:
-                    timeout = self.TX_TIMEOUT_SECONDS
-                else:
-                    timeout = tx_params['timeout'] if tx_params['timeout'] is not None else self.TX_TIMEOUT_SECONDS
+            except Exception as e:
+                logging.warning(f"Error sending transaction for function '{func_name}': {e}")
 
-                try:
-                    receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
-                except TimeExhausted:
-                    logging.warning(f"Transaction timeout after {timeout} seconds.")
-                    return tx_hash.hex()
+                # the reserved nonce was not used, the next one is fetched from the node
+                wallet = tx_params.get('from')
+                if isinstance(wallet, Wallet):
+                    nonce_manager.resync(wallet.address)
 
-                if receipt['status'] == 1:
-                    logging.info(f"Transaction successful: {receipt}")
-                else:
-                    logging.warning(f"Transaction failed: {receipt}")
+                raise
 
+            # return without waiting for the receipt, use wait_for_receipt later on
+            if not tx_params.get('wait', True):
                 return tx_hash.hex()
 
-            except Exception as e:
-                logging.warning(f"Error sending transaction for function '{func_name}': {e}")
-                return tx_hash.hex()
+            if 'timeout' not in tx_params:
+                timeout = self.TX_TIMEOUT_SECONDS
+            else:
+                timeout = tx_params['timeout'] if tx_params['timeout'] is not None else self.TX_TIMEOUT_SECONDS
+
+            try:
+                wait_for_receipt(self.w3, tx_hash, timeout)
+            except TimeExhausted:
+                logging.warning(f"Transaction timeout after {timeout} seconds.")
+
+            return tx_hash.hex()
 
         # add docstrings signature and selector
         self._amend_method(write_method, func_name)
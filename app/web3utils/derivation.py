@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from eth_account import Account
+from eth_account.hdaccount import ETHEREUM_DEFAULT_PATH, seed_from_mnemonic
+from eth_account.hdaccount.deterministic import (
+    SECP256K1_N,
+    HDPath,
+    Node,
+    SoftNode,
+    derive_child_key,
+    ec_point,
+    hmac_sha512
+)
+from eth_account.signers.local import LocalAccount
+from eth_keys import keys
+
+from util.logging import get_logger
+
+# bip32 derivation with cached intermediate nodes.
+# seed generation (pbkdf2, 2048 rounds) and the derivation of the parent node
+# (m/44'/60'/0'/0 for the default path) happen once per mnemonic and parent path,
+# every additional index costs a single child key derivation.
+
+PARENT_CACHE_SIZE = 16
+RANGE_CHUNK_SIZE = 1000
+
+# setup for module
+logger = get_logger()
+address_tables = {}
+address_tables_lock = threading.Lock()
+
+
+def derive_key(mnemonic: str, path: str = ETHEREUM_DEFAULT_PATH) -> bytes:
+    """Returns the private key for the provided mnemonic and full derivation path."""
+    (parent_path, node) = split_path(path)
+    return _derive_child(_get_parent_node(mnemonic, parent_path), node)
+
+
+def derive_account(mnemonic: str, path: str = ETHEREUM_DEFAULT_PATH) -> LocalAccount:
+    """Returns the account for the provided mnemonic and full derivation path.
+
+    Equivalent to Account.from_mnemonic(mnemonic, account_path=path)."""
+    return Account.from_key(derive_key(mnemonic, path))
+
+
+def derive_address(mnemonic: str, index: int, path: str = ETHEREUM_DEFAULT_PATH) -> str:
+    """Returns the address for the provided index, served from a loaded address table when available."""
+    parent_path = get_parent_path(path)
+    table = address_tables.get((mnemonic, parent_path))
+
+    if table is not None and index in table:
+        return table[index]
+
+    return _to_address(derive_key(mnemonic, get_path(parent_path, index)))
+
+
+def derive_range(mnemonic: str, start: int, count: int, path: str = ETHEREUM_DEFAULT_PATH, processes: int | None = None) -> dict[int, str]:
+    """Returns the addresses for indices start .. start + count - 1.
+
+    Chunks of indices are derived in a process pool when processes is not 1,
+    processes None uses the number of available cpus."""
+    parent_path = get_parent_path(path)
+    chunks = [(index, min(RANGE_CHUNK_SIZE, start + count - index)) for index in range(start, start + count, RANGE_CHUNK_SIZE)]
+    logger.info(f"deriving {count} addresses starting at index {start} for {parent_path} ({len(chunks)} chunks)")
+
+    addresses = {}
+    if processes == 1 or len(chunks) <= 1:
+        for (chunk_start, chunk_count) in chunks:
+            addresses.update(_derive_chunk(mnemonic, parent_path, chunk_start, chunk_count))
+        return addresses
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_derive_chunk, mnemonic, parent_path, chunk_start, chunk_count) for (chunk_start, chunk_count) in chunks]
+        for future in futures:
+            addresses.update(future.result())
+
+    return addresses
+
+
+def save_address_table(file_name: str, addresses: dict[int, str], path: str = ETHEREUM_DEFAULT_PATH) -> None:
+    """Persists an index to address table as json file."""
+    table = {
+        "path": get_parent_path(path),
+        "addresses": {str(index): address for (index, address) in sorted(addresses.items())}
+    }
+
+    with open(file_name, "w") as table_file:
+        json.dump(table, table_file, indent=2)
+
+    logger.info(f"address table with {len(addresses)} entries saved to {file_name}")
+
+
+def load_address_table(file_name: str, mnemonic: str) -> dict[int, str]:
+    """Loads an address table persisted with save_address_table and registers it for derive_address.
+
+    A single entry is re-derived to verify the table belongs to the provided mnemonic."""
+    if not os.path.exists(file_name):
+        raise ValueError(f"Error: The file {file_name} does not exist.")
+
+    with open(file_name, "r") as table_file:
+        table = json.load(table_file)
+
+    parent_path = table["path"]
+    addresses = {int(index): address for (index, address) in table["addresses"].items()}
+
+    if len(addresses) > 0:
+        index = next(iter(addresses))
+        if _to_address(derive_key(mnemonic, get_path(parent_path, index))) != addresses[index]:
+            raise ValueError(f"address table {file_name} does not match provided mnemonic")
+
+    with address_tables_lock:
+        address_tables[(mnemonic, parent_path)] = addresses
+
+    logger.info(f"address table with {len(addresses)} entries loaded from {file_name}")
+    return addresses
+
+
+def split_path(path: str) -> tuple[str, Node]:
+    parts = path.split("/")
+    return ("/".join(parts[:-1]), Node.decode(parts[-1]))
+
+
+def get_parent_path(path: str) -> str:
+    return "/".join(path.split("/")[:-1])
+
+
+def get_path(parent_path: str, index: int) -> str:
+    return f"{parent_path}/{index}"
+
+
+@lru_cache(maxsize=PARENT_CACHE_SIZE)
+def _get_parent_node(mnemonic: str, parent_path: str) -> tuple[bytes, bytes, bytes]:
+    """Returns private key, chain code and compressed public key of the node at parent_path."""
+    seed = seed_from_mnemonic(mnemonic, "")
+
+    # same loop as HDPath.derive, which only returns the key and drops the chain code
+    main_node = hmac_sha512(b"Bitcoin seed", seed)
+    (key, chain_code) = (main_node[:32], main_node[32:])
+    for node in HDPath(parent_path)._path:
+        (key, chain_code) = derive_child_key(key, chain_code, node)
+
+    return (key, chain_code, ec_point(key))
+
+
+def _derive_child(parent_node: tuple[bytes, bytes, bytes], node: Node) -> bytes:
+    """Returns the child private key, reusing the cached parent public key for soft nodes."""
+    (parent_key, parent_chain_code, parent_point) = parent_node
+
+    if isinstance(node, SoftNode):
+        child = hmac_sha512(parent_chain_code, parent_point + node.serialize())
+        child_key = (int.from_bytes(child[:32], "big") + int.from_bytes(parent_key, "big")) % SECP256K1_N
+
+        if int.from_bytes(child[:32], "big") < SECP256K1_N and child_key != 0:
+            return child_key.to_bytes(32, "big")
+
+    # hardened nodes and invalid keys (probability < 2**-127)
+    (key, _) = derive_child_key(parent_key, parent_chain_code, node)
+    return key
+
+
+def _derive_chunk(mnemonic: str, parent_path: str, start: int, count: int) -> dict[int, str]:
+    parent_node = _get_parent_node(mnemonic, parent_path)
+    addresses = {}
+
+    for index in range(start, start + count):
+        addresses[index] = _to_address(_derive_child(parent_node, Node.decode(str(index))))
+
+    return addresses
+
+
+def _to_address(key: bytes) -> str:
+    return keys.PrivateKey(key).public_key.to_checksum_address()
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from web3 import Web3
+
+from util.logging import get_logger
+
+# historical log scanning over large block ranges.
+# the range is split into chunks that are fetched concurrently with eth_getLogs,
+# chunks rejected by the node (too many results, range too large, timeouts) are
+# split in halves and the chunk size is adapted for the following chunks.
+
+CHUNK_SIZE = 2000
+MIN_CHUNK_SIZE = 1
+MAX_CHUNK_SIZE = 100000
+WORKERS = 4
+
+# setup for module
+logger = get_logger()
+
+
+class LogScanner:
+
+    def __init__(self, w3: Web3, addresses: list[str], topics: list | None = None, chunk_size: int = CHUNK_SIZE, workers: int = WORKERS, max_chunk_size: int = MAX_CHUNK_SIZE) -> None:
+        if chunk_size <= 0 or workers <= 0:
+            raise ValueError(f"chunk size {chunk_size} and workers {workers} must be positive")
+
+        self.w3 = w3
+        self.addresses = addresses
+        self.topics = topics
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max(chunk_size, max_chunk_size)
+        self.workers = workers
+        self.rpc_calls = 0
+        self.rejected = 0
+
+    def scan(self, from_block: int, to_block: int, on_chunk: Callable[[int, int, list], None]) -> int:
+        """Fetches all logs of the block range, on_chunk(from, to, logs) is called per chunk in block order.
+
+        Returns the number of logs. A checkpoint saved in on_chunk covers all blocks up to 'to'."""
+        count = 0
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            block = from_block
+
+            while block <= to_block:
+                # plan the next round with the current chunk size, one chunk per worker
+                chunks = []
+                while block <= to_block and len(chunks) < self.workers:
+                    end = min(block + self.chunk_size - 1, to_block)
+                    chunks.append((block, end))
+                    block = end + 1
+
+                rejected = self.rejected
+                for ((start, end), logs) in zip(chunks, executor.map(lambda chunk: self._fetch(*chunk), chunks)):
+                    on_chunk(start, end, logs)
+                    count += len(logs)
+
+                # shrink after rejections (and stay below), grow again after a clean round
+                if self.rejected > rejected:
+                    self.chunk_size = max(MIN_CHUNK_SIZE, self.chunk_size // 2)
+                    self.max_chunk_size = self.chunk_size
+                    logger.info(f"chunk size reduced to {self.chunk_size} blocks")
+                elif self.chunk_size < self.max_chunk_size:
+                    self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+
+        logger.info(f"scanned blocks {from_block}-{to_block}, {count} logs, {self.rpc_calls} getLogs calls, {self.rejected} rejected")
+        return count
+
+    def _fetch(self, from_block: int, to_block: int) -> list[Any]:
+        filter_params = {
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'address': self.addresses
+        }
+
+        if self.topics:
+            filter_params['topics'] = self.topics
+
+        try:
+            self.rpc_calls += 1
+            return self.w3.eth.get_logs(filter_params)
+
+        except Exception as e:
+            if from_block >= to_block:
+                raise
+
+            self.rejected += 1
+            middle = (from_block + to_block) // 2
+            logger.debug(f"getLogs {from_block}-{to_block} rejected, splitting range: {e}")
+            return self._fetch(from_block, middle) + self._fetch(middle + 1, to_block)
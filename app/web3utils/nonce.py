@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+import weakref
+
+from typing import Any, Dict
+
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
+from web3 import Web3
+
+
+class NonceManager:
+    """Tracks the next nonce per sender locally.
+
+    The pending transaction count is fetched once per sender, afterwards nonces
+    are handed out locally so several transactions of the same sender can be
+    signed and sent back-to-back. A sender is resynced from the node after a
+    failed send.
+    """
+
+    GAS_PRICE_TTL_SECONDS = 5
+
+    w3:Web3|None = None
+
+    def __init__(self, w3:Web3) -> None:
+        self.w3 = w3
+        self._chain_id = None
+        self._gas_price = None
+        self._gas_price_at = 0.0
+        self._nonces = {}
+        self._lock = threading.Lock()
+
+    def chain_id(self) -> int:
+        """Get the chain id, fetched once per manager."""
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+
+        return self._chain_id
+
+    def gas_price(self) -> int:
+        """Get the current gas price, cached for a few seconds."""
+        now = time.monotonic()
+        if self._gas_price is None or now - self._gas_price_at > self.GAS_PRICE_TTL_SECONDS:
+            self._gas_price = self.w3.eth.gas_price
+            self._gas_price_at = now
+
+        return self._gas_price
+
+    def next_nonce(self, address:str) -> int:
+        """Reserve and return the next nonce for the provided sender."""
+        with self._lock:
+            if address not in self._nonces:
+                self._nonces[address] = self.w3.eth.get_transaction_count(address, 'pending')
+
+            nonce = self._nonces[address]
+            self._nonces[address] = nonce + 1
+
+            return nonce
+
+    def resync(self, address:str) -> None:
+        """Drop the local nonce, the next nonce for the sender is fetched from the node."""
+        with self._lock:
+            self._nonces.pop(address, None)
+
+        logging.info(f"nonce for {address} resynced")
+
+    def send_transaction(self, account:LocalAccount, tx:Dict[str, Any]) -> HexBytes:
+        """Sign and send the provided transaction, nonce and chain id are added when missing."""
+        tx = dict(tx)
+        tx.setdefault('chainId', self.chain_id())
+
+        if 'nonce' not in tx:
+            tx['nonce'] = self.next_nonce(account.address)
+
+        try:
+            signed = account.sign_transaction(tx)
+            return self.w3.eth.send_raw_transaction(signed.raw_transaction)
+
+        except Exception:
+            self.resync(account.address)
+            raise
+
+
+managers = weakref.WeakKeyDictionary()
+managers_lock = threading.Lock()
+
+
+def get_nonce_manager(w3:Web3) -> NonceManager:
+    """Get the (shared) nonce manager for the provided web3 instance."""
+    with managers_lock:
+        if w3 not in managers:
+            managers[w3] = NonceManager(w3)
+
+        return managers[w3]
+
+
+def wait_for_receipt(w3:Web3, tx_hash:HexBytes|str, timeout:float = 120) -> Dict[str, Any]:
+    """Wait for the receipt of a transaction sent without waiting."""
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+
+    if receipt['status'] == 1:
+        logging.info(f"Transaction successful: {receipt}")
+    else:
+        logging.warning(f"Transaction failed: {receipt}")
+
+    return receipt
@@ -1,25 +1,26 @@
-from server.sync.onchain import w3
+from server.sync.onchain import onchain
 from util.logging import get_logger
+from web3utils.nonce import get_nonce_manager, wait_for_receipt
 from web3utils.wallet import Wallet
 
 logger = get_logger()
 
-def send_eth(sender: Wallet, rcpt: str, amount: int, gas_price: int) -> str:
+def send_eth(sender: Wallet, rcpt: str, amount: int, gas_price: int, wait: bool = True) -> str:
     """Send a specified amount of wei to a specified address."""
-    nonce = w3.eth.get_transaction_count(sender.account.address)
+    nonce_manager = get_nonce_manager(onchain.w3)
     tx = {
-        'nonce': nonce,  #prevents from sending a transaction twice on ethereum
         'to': rcpt,
-        'value': w3.to_wei(amount, 'wei'),
+        'value': onchain.w3.to_wei(amount, 'wei'),
         'gas': 30000,
         'gasPrice': gas_price,
-        'chainId': w3.eth.chain_id
     }
-    signed_tx = w3.eth.account.sign_transaction(tx, sender.account.key)
     logger.info(f"{sender.address} sending {amount} wei to {rcpt}")
-    #send the transaction
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+    #send the transaction (nonce and chain id added by nonce manager)
+    tx_hash = nonce_manager.send_transaction(sender.account, tx)
     logger.info(f"Transaction sent: {tx_hash.hex()}")
-    tx_receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    logger.info(f"Transaction mined: {tx_hash}")
-    
\ No newline at end of file
+
+    if wait:
+        wait_for_receipt(onchain.w3, tx_hash)
+        logger.info(f"Transaction mined: {tx_hash}")
+
+    return tx_hash.hex()
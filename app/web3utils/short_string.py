@@ -0,0 +1,28 @@
+# python implementation of the short string (Str) helpers of CropProduct
+# (OZ ShortStrings): up to 31 utf-8 bytes left aligned in a bytes32 with the
+# length in the lowest byte. computed locally instead of eth_call to toStr.
+
+STR_MAX_LENGTH = 31
+
+
+def to_str(value:str) -> bytes:
+    """Same as CropProduct.toStr, raises a ValueError for strings longer than 31 bytes."""
+    data = value.encode('utf-8')
+
+    if len(data) > STR_MAX_LENGTH:
+        raise ValueError(f"string '{value}' too long ({len(data)} bytes, max {STR_MAX_LENGTH})")
+
+    return data.ljust(STR_MAX_LENGTH, b'\x00') + bytes([len(data)])
+
+
+def from_str(sstr:bytes) -> str:
+    """Same as CropProduct.toString."""
+    return sstr[:str_length(sstr)].decode('utf-8')
+
+
+def str_length(sstr:bytes) -> int:
+    """Same as CropProduct.length."""
+    if len(sstr) != 32 or sstr[31] > STR_MAX_LENGTH:
+        raise ValueError(f"invalid short string {sstr.hex()}")
+
+    return sstr[31]
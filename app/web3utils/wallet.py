@@ -8,6 +8,8 @@ from eth_account.types import Language
 from web3 import Web3
 
 from util.password import generate_password
+from web3utils.derivation import derive_account
+from web3utils.nonce import get_nonce_manager
 
 
 class Wallet:
@@ -21,7 +23,7 @@ class Wallet:
     INDEX_DEFAULT = 0
 
     password: str | None
-    vault: dict[str, Any]
+    _vault: dict[str, Any] | None
     mnemonic: str | None
     address: str
     account: LocalAccount | None
@@ -39,7 +41,7 @@ class Wallet:
         Account.enable_unaudited_hdwallet_features()
 
         self.password = ""
-        self.vault = {}
+        self._vault = {}
         self.mnemonic = None
         self.address = ""
         self.account = None
@@ -56,6 +58,15 @@ class Wallet:
         return self.w3.eth.get_transaction_count(self.address)
 
 
+    @property
+    def vault(self) -> dict[str, Any]:
+        """Encrypted account, created on first access (scrypt key derivation is expensive)."""
+        if self._vault is None:
+            self._vault = self.account.encrypt(self.password)  # type: ignore  # noqa: PGH003
+
+        return self._vault
+
+
     def balance(self) -> int:
         if not self.w3:
             raise ValueError("Web3 instance not provided")
@@ -70,23 +81,20 @@ class Wallet:
         if isinstance(to, Wallet):
             to = to.address
 
-        nonce = self.nonce()
-        chain_id = self.w3.eth.chain_id
+        nonce_manager = get_nonce_manager(self.w3)
         gas = 21000
-        gas_price = gas_price or self.w3.eth.gas_price
+        gas_price = gas_price or nonce_manager.gas_price()
 
         tx = {
             "to": to,
             "value": amount,
-            "nonce": nonce,
-            "chainId": chain_id, # only replay-protected (EIP-155) transactions allowed over RPC
             "gas": gas,
             "gasPrice": gas_price,
         }
 
+        # nonce and chain id (only replay-protected (EIP-155) transactions allowed over RPC) added by nonce manager
         try:
-            signed = self.account.sign_transaction(tx)
-            tx_hash = self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            tx_hash = nonce_manager.send_transaction(self.account, tx)
 
         except Exception as e:
             raise ValueError(f"Error sending transaction: {e}")
@@ -129,7 +137,7 @@ class Wallet:
             password = generate_password()
 
         wallet.password = password
-        wallet.vault = wallet.account.encrypt(password)  # type: ignore  # noqa: PGH003
+        wallet._vault = None
         wallet.w3 = w3
 
         return wallet
@@ -157,8 +165,8 @@ class Wallet:
             wallet.path = "/".join(path.split("/")[:-1]) + f"/{index}"
 
         wallet.password = password
-        wallet.account = Account.from_mnemonic(mnemonic, account_path=wallet.path)
-        wallet.vault = wallet.account.encrypt(password)  # type: ignore  # noqa: PGH003
+        wallet.account = derive_account(mnemonic, wallet.path)
+        wallet._vault = None
         wallet.address = wallet.account.address  # type: ignore  # noqa: PGH003
 
         return wallet
@@ -168,7 +176,7 @@ class Wallet:
         """Create a new wallet from a vault dict."""
         wallet = Wallet()
         wallet.password = password
-        wallet.vault = vault
+        wallet._vault = vault
         wallet.account = Account.from_key(Account.decrypt(vault, password=password))
         wallet.address = wallet.account.address  # type: ignore  # noqa: PGH003
 
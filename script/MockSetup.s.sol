@@ -5,10 +5,12 @@ import {Script, console} from "forge-std/Script.sol";
 
 import {AccountingToken} from "../src/AccountingToken.sol";
 import {CropProduct} from "../src/CropProduct.sol";
+import {Multisend} from "../src/Multisend.sol";
 
 contract MocksSetupScript is Script {
     AccountingToken public token;
     CropProduct public product;
+    Multisend public multisend;
 
     function run() public {
         uint256 privateKey = vm.envUint("ETH_PRIVATE_KEY");
@@ -17,9 +19,11 @@ contract MocksSetupScript is Script {
         vm.startBroadcast(privateKey);
         token = new AccountingToken();
         product = new CropProduct(token);
+        multisend = new Multisend();
         vm.stopBroadcast();
 
         console.log("Token deployed", address(token));
         console.log("Product deployed", address(product));
+        console.log("Multisend deployed", address(multisend));
     }
 }
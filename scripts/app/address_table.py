@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from server.api.person import PERSON_BASE_INDEX
+from server.config import settings
+from web3utils.derivation import derive_range, save_address_table
+
+ADDRESS_TABLE_FILE = './farmer_addresses.json'
+ADDRESS_COUNT = 100000
+
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description="precompute farmer wallet addresses (index -> address)")
+    parser.add_argument("--start", type=int, default=PERSON_BASE_INDEX)
+    parser.add_argument("--count", type=int, default=ADDRESS_COUNT)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--out", default=settings.FARMER_WALLET_ADDRESS_TABLE or ADDRESS_TABLE_FILE)
+    args = parser.parse_args()
+
+    if not settings.FARMER_WALLET_MNEMONIC:
+        raise ValueError("FARMER_WALLET_MNEMONIC not set")
+
+    addresses = derive_range(settings.FARMER_WALLET_MNEMONIC, args.start, args.count, processes=args.processes)
+    save_address_table(args.out, addresses)
+
+if __name__ == "__main__":
+    main()
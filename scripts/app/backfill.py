@@ -0,0 +1,32 @@
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from server.config import settings
+
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description="backfill product, token and risk set events of a block range into mongo")
+    parser.add_argument("--from-block", type=int, default=None, help="first block (default: checkpoint or INDEXER_START_BLOCK)")
+    parser.add_argument("--to-block", type=int, default=None, help="last block (default: checkpoint range or latest block)")
+    parser.add_argument("--chunk-size", type=int, default=settings.BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.BACKFILL_WORKERS)
+    parser.add_argument("--reset", action="store_true", help="drop the checkpoint before starting")
+    args = parser.parse_args()
+
+    # connects to the rpc node on import
+    from server.sync.backfill import backfill, reset_checkpoint
+
+    if args.reset:
+        reset_checkpoint()
+
+    backfill(args.from_block, args.to_block, args.chunk_size, args.workers)
+
+if __name__ == "__main__":
+    main()
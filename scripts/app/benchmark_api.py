@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+from loguru import logger
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from server import mongo
+from server.aio import mongo as aio_mongo
+from server.model.policy import PolicyOut
+
+# measures requests per second of the policy list/get endpoints with concurrent
+# clients against the mongodb of the settings (e.g. the local docker mongodb):
+# - sync: async routes calling the blocking server.mongo helpers (previous routers)
+# - async: async routes awaiting the server.aio.mongo helpers (current routers)
+# the app runs in the event loop of the clients (as in uvicorn), a blocking call
+# stalls all concurrent requests.
+
+
+def get_sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/policy/all/json")
+    async def get_all_policies(page: int = 1, items: int = 5):
+        return mongo.get_list_of_models_in_collection(PolicyOut, page, items)
+
+    @app.get("/policy/{policy_id}")
+    async def get_policy(policy_id: str):
+        return mongo.find_in_collection(policy_id, PolicyOut)
+
+    return app
+
+
+def get_async_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/policy/all/json")
+    async def get_all_policies(page: int = 1, items: int = 5):
+        return await aio_mongo.get_list_of_models_in_collection(PolicyOut, page, items)
+
+    @app.get("/policy/{policy_id}")
+    async def get_policy(policy_id: str):
+        return await aio_mongo.find_in_collection(policy_id, PolicyOut)
+
+    return app
+
+
+async def measure(name: str, app: FastAPI, urls: list[str], clients: int, requests: int) -> None:
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # warm up, connections pooled and collections resolved
+        for url in urls[:clients]:
+            (await client.get(url)).raise_for_status()
+
+        async def run_client(index: int) -> None:
+            for request in range(index, requests, clients):
+                (await client.get(urls[request % len(urls)])).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[run_client(index) for index in range(clients)])
+        elapsed = time.perf_counter() - start
+
+    logger.info(f"{name}: {requests / elapsed:.0f} req/s ({requests} requests, {clients} clients, {elapsed:.2f}s)")
+
+
+async def run(args) -> None:
+    policies = mongo.get_list_of_models_in_collection(PolicyOut, 1, args.policies)
+    if len(policies) == 0:
+        logger.error("no policies found, upload some data first")
+        return
+
+    get_urls = [f"/policy/{policy.id}" for policy in policies]
+    list_urls = [f"/policy/all/json?page={page}&items={args.items}" for page in range(1, args.pages + 1)]
+    logger.info(f"{len(get_urls)} policies, {len(list_urls)} pages of {args.items} items")
+
+    for clients in args.clients:
+        await measure("sync get", get_sync_app(), get_urls, clients, args.requests)
+        await measure("async get", get_async_app(), get_urls, clients, args.requests)
+        await measure("sync list", get_sync_app(), list_urls, clients, args.requests)
+        await measure("async list", get_async_app(), list_urls, clients, args.requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark sync vs async mongo data layer of the api")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--policies", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
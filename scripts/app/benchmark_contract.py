@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+from loguru import logger
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from web3utils.contract import Contract
+
+# measures the python side overhead of contract reads (no rpc node involved):
+# compiled method table vs web3 function lookup, and contract setup time.
+# run from the repo root (abi files in ./app/abi).
+
+ABI_PATH = "./app/abi"
+ADDRESS = "0x" + "11" * 20
+RESULT = "0x" + "00" * 31 + "2a"
+
+
+class StaticProvider(BaseProvider):
+    """Answers every request with the same 32 byte result."""
+
+    def make_request(self, method, params):
+        return {'jsonrpc': '2.0', 'id': 1, 'result': RESULT}
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        return True
+
+
+def measure(name, func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    elapsed = time.perf_counter() - start
+    logger.info(f"{name}: {elapsed / calls * 1e6:.1f}us per call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark compiled contract method calls")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    w3 = Web3(StaticProvider())
+
+    start = time.perf_counter()
+    product = Contract(w3, "CropProduct", ADDRESS, out_path=ABI_PATH)
+    logger.info(f"first CropProduct setup: {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    start = time.perf_counter()
+    Contract(w3, "CropProduct", ADDRESS, out_path=ABI_PATH)
+    logger.info(f"second CropProduct setup (cached method table): {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+    token = Contract(w3, "AccountingToken", ADDRESS, out_path=ABI_PATH)
+
+    measure("toStr compiled", lambda: product.toStr("7Zv4TZoBLxUi"), args.calls)
+    measure("toStr web3", lambda: product.contract.functions.toStr("7Zv4TZoBLxUi").call(), args.calls)
+    measure("balanceOf compiled", lambda: token.balanceOf(ADDRESS), args.calls)
+    measure("balanceOf web3", lambda: token.contract.functions.balanceOf(ADDRESS).call(), args.calls)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+from loguru import logger
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+import data.onchain_data as onchain_data
+
+# measures http round-trips and wall time of the onchain data readers.
+# point the WEB3_* variables in ./server/.env to the node to benchmark
+# (e.g. a local anvil node forked from polygon).
+
+def count_round_trips(w3, counter):
+    provider = w3.provider
+    make_request = provider.make_request
+    make_batch_request = provider.make_batch_request
+
+    def counted_request(*args, **kwargs):
+        counter['requests'] += 1
+        return make_request(*args, **kwargs)
+
+    def counted_batch_request(*args, **kwargs):
+        counter['requests'] += 1
+        return make_batch_request(*args, **kwargs)
+
+    provider.make_request = counted_request
+    provider.make_batch_request = counted_batch_request
+    return w3
+
+
+def benchmark(name, func, *args):
+    counter = {'requests': 0}
+    get_web3 = onchain_data.get_web3
+    onchain_data.get_web3 = lambda: count_round_trips(get_web3(), counter)
+    onchain_data.invalidate_setup(reload_env=False)
+
+    try:
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+    finally:
+        onchain_data.get_web3 = get_web3
+        onchain_data.invalidate_setup(reload_env=False)
+
+    logger.info(f"{name}: {counter['requests']} round-trips, {elapsed:.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark batched onchain reads")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--yelen-id", default=None)
+    args = parser.parse_args()
+
+    benchmark(f"get_risks(1, {args.items})", onchain_data.get_risks, 1, args.items)
+    benchmark("get_configs(1, 100)", onchain_data.get_configs, 1, 100)
+
+    if args.yelen_id:
+        benchmark(f"get_onchain_onboarding_data({args.yelen_id})", onchain_data.get_onchain_onboarding_data, args.yelen_id)
+
+if __name__ == "__main__":
+    main()
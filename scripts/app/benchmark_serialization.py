@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from loguru import logger
+from pydantic import TypeAdapter
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from server.api.util import to_json_array
+from server.config import settings
+from server.model.policy import PolicyOut
+
+# measures the cost of turning policy documents (as read from mongodb) into a
+# json list response, no mongodb involved:
+# - validated models + response model (previous /all/json path)
+# - constructed models (model_construct) + response model
+# - documents restricted to the model fields, json.dumps (current /all/json path, to_json_array)
+# - raw documents serialized with json.dumps (previous /all/json path, fields not in the model included)
+
+ADAPTER = TypeAdapter(list[PolicyOut])
+
+
+def get_documents(count: int) -> list[dict]:
+    return [
+        {
+            settings.MONGO_ID_ATTRIBUTE: f"{index:012d}",
+            "personId": "7Zv4TZoBLxUi",
+            "riskId": "jxmbyupsh1rv",
+            "externalId": f"EXT{index}",
+            "subscriptionDate": "2025-01-20",
+            "sumInsuredAmount": 1000.0,
+            "premiumAmount": 100.0,
+            "nft": 100000 + index,
+            "tx": "a1" * 32
+        }
+        for index in range(count)]
+
+
+def validated(documents: list[dict]) -> bytes:
+    models = [PolicyOut.fromMongoDict(document, validate=True) for document in documents]
+    return ADAPTER.dump_json(ADAPTER.validate_python(models))
+
+
+def constructed(documents: list[dict]) -> bytes:
+    models = [PolicyOut.fromMongoDict(document, validate=False) for document in documents]
+    return ADAPTER.dump_json(ADAPTER.validate_python(models))
+
+
+def rename_ids(documents: list[dict]) -> list[dict]:
+    # as done by get_list_of_dicts_in_collection
+    for document in documents:
+        document[settings.MODEL_ID_ATTRIBUTE] = document.pop(settings.MONGO_ID_ATTRIBUTE)
+
+    return documents
+
+
+def fast_path(documents: list[dict]) -> bytes:
+    return to_json_array(PolicyOut, rename_ids(documents)).encode()
+
+
+def raw(documents: list[dict]) -> bytes:
+    return json.dumps(rename_ids(documents), separators=(",", ":"), default=str).encode()
+
+
+def measure(name: str, func, count: int, runs: int) -> None:
+    elapsed = 0.0
+    for _ in range(runs):
+        documents = get_documents(count)
+        start = time.perf_counter()
+        func(documents)
+        elapsed += time.perf_counter() - start
+
+    logger.info(f"{name}: {elapsed / runs * 1000:.1f}ms per {count} documents")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark json list response serialization")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    measure("validated models", validated, args.documents, args.runs)
+    measure("constructed models", constructed, args.documents, args.runs)
+    measure("model fields (to_json_array)", fast_path, args.documents, args.runs)
+    measure("raw documents", raw, args.documents, args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import subprocess
+import sys
+import time
+
+from loguru import logger
+
+# measures api cold start: import time of server.app in a fresh interpreter
+# (what every uvicorn reload pays) and the time to resolve the onchain handles.
+
+IMPORT_APP = "import time; start = time.perf_counter(); import server.app; print(time.perf_counter() - start)"
+WARM_UP = "import time; from server.sync.onchain import onchain; start = time.perf_counter(); onchain.warm_up(); print(time.perf_counter() - start, onchain.is_ready())"
+
+
+def run(code: str) -> str:
+    # same layout as 'uv run python app/main.py' (run from the repo root, app on the path)
+    result = subprocess.run([sys.executable, "-c", f"import sys; sys.path.insert(0, './app'); {code}"], capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark api startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        elapsed = float(run(IMPORT_APP))
+        timings.append(elapsed)
+        logger.info(f"import server.app: {elapsed:.3f}s (process {time.perf_counter() - start:.3f}s)")
+
+    logger.info(f"import server.app: min {min(timings):.3f}s avg {sum(timings) / len(timings):.3f}s over {args.runs} runs")
+
+    (elapsed, ready) = run(WARM_UP).split()
+    logger.info(f"onchain warm up: {float(elapsed):.3f}s ready {ready}")
+
+if __name__ == "__main__":
+    main()
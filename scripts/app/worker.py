@@ -0,0 +1,85 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+from dotenv import load_dotenv
+
+# app modules (server, util, web3utils, data) are imported from ./app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from server.config import settings
+from server.mongo import create_all_indexes, run_cache_invalidation_listener
+from server.queue import claim_next_job, complete_job, fail_job, heartbeat_job, requeue_stale_jobs
+from server.sync.indexer import run_indexer
+from server.sync.jobs import JOB_HANDLERS, get_job_params
+from util.logging import get_logger
+
+load_dotenv()
+
+logger = get_logger()
+
+STALE_CHECK_INTERVAL_SECONDS = 60
+
+def run_heartbeat(job, worker_id: str, stopped: threading.Event) -> None:
+    # keeps the lock of long running jobs fresh, requeue_stale_jobs only picks up jobs of dead workers
+    while not stopped.wait(settings.JOB_HEARTBEAT_INTERVAL_SECONDS):
+        try:
+            if not heartbeat_job(job, worker_id):
+                return
+        except Exception:
+            logger.exception(f"heartbeat of job {job.id} {job.key} failed")
+
+def run_job(handlers, job, worker_id: str) -> None:
+    handler = handlers.get(job.type)
+    if handler is None:
+        fail_job(job, f"no handler for job type {job.type}")
+        return
+
+    logger.info(f"running job {job.id} {job.key} attempt {job.attempts}/{job.maxAttempts}")
+
+    stopped = threading.Event()
+    threading.Thread(target=run_heartbeat, args=(job, worker_id, stopped), name=f"heartbeat-{job.id}", daemon=True).start()
+
+    try:
+        result = handler(job.entityId, get_job_params(job))
+        complete_job(job, result)
+    except Exception as e:
+        logger.exception(f"job {job.id} {job.key} failed")
+        fail_job(job, f"{e.__class__.__name__}: {e}")
+    finally:
+        stopped.set()
+
+def main() -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"start worker {worker_id} for job types {list(JOB_HANDLERS.keys())}")
+
+    # indexes declared by the models (job queue included), fails if an index cannot be created
+    if settings.MONGO_CREATE_INDEXES:
+        create_all_indexes()
+
+    stale_check_at = 0
+
+    # risk ids and policy nfts of submitted txs are picked up from the contract logs
+    if settings.INDEXER_ENABLED:
+        threading.Thread(target=run_indexer, name="indexer", daemon=True).start()
+
+    # cached seasons, locations and risks updated by the api or other workers
+    if settings.MONGO_CACHE_INVALIDATION_LISTENER:
+        threading.Thread(target=run_cache_invalidation_listener, name="cache-invalidation", daemon=True).start()
+
+    while True:
+        if time.monotonic() > stale_check_at:
+            requeue_stale_jobs()
+            stale_check_at = time.monotonic() + STALE_CHECK_INTERVAL_SECONDS
+
+        job = claim_next_job(worker_id)
+        if job is None:
+            time.sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+            continue
+
+        run_job(JOB_HANDLERS, job, worker_id)
+
+if __name__ == "__main__":
+    main()
@@ -107,6 +107,10 @@ def process_rows(
     config_id = model.getConfigId(0)
     rows = 1
 
+    # decimals never change, fetch once instead of per row
+    model_decimals = model.decimals()
+    token_decimals = token.decimals()
+
     for row_num in range(row_offset, row_offset + row_count):
         row = data[SHEETS_PAM[0]][row_num]
         yelen_id = row['Policy ID Yelen']
@@ -136,7 +140,9 @@ def process_rows(
                 mnemonic,
                 is_final=is_final,
                 salt=salt,
-                set_gas_price=set_gas_price)
+                set_gas_price=set_gas_price,
+                model_decimals=model_decimals,
+                token_decimals=token_decimals)
 
             mapper.setProcessId(
                 mapper_id, 
@@ -158,7 +164,9 @@ def process_row(
     mnemonic,
     is_final=False,
     salt=SALT_DEFAULT,
-    set_gas_price=False
+    set_gas_price=False,
+    model_decimals=None,
+    token_decimals=None
 ):
     success = False
     policy_id = None
@@ -193,8 +201,11 @@ def process_row(
     crop = CROP_PAM[index_type]
     risk_id = model.toRiskId(config_id, location_id, crop)
 
-    index_refernce = int(row['Index Reference Value'] * 10**model.decimals())
-    index_season = int(row['Index End of Season Value'] * 10**model.decimals())
+    if model_decimals is None:
+        model_decimals = model.decimals()
+
+    index_refernce = int(row['Index Reference Value'] * 10**model_decimals)
+    index_season = int(row['Index End of Season Value'] * 10**model_decimals)
 
     if not model.isValidRisk(risk_id):
         logger.info(f"adding risk {config_id}, {location_id}, {crop}")
@@ -234,8 +245,11 @@ def process_row(
     if isinstance(subscription_date, datetime):
         subscription_date = int(f"{subscription_date.year}{subscription_date.month:02}{subscription_date.day:02}")
 
-    premium_amount = int(row["prime due à l'assureur"] * 10**token.decimals())
-    sum_insured_amount = int(row["montant total assuré"] * 10**token.decimals())
+    if token_decimals is None:
+        token_decimals = token.decimals()
+
+    premium_amount = int(row["prime due à l'assureur"] * 10**token_decimals)
+    sum_insured_amount = int(row["montant total assuré"] * 10**token_decimals)
     
     logger.info(f"creating policy {yelen_id} {beneficiary_wallet}, ({sex}), {risk_id}, {crop}, {premium_amount}, {sum_insured_amount}")
     underwrite = True
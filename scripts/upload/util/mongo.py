@@ -1,33 +1,63 @@
 import json
 import sys
+import threading
 
 from loguru import logger
 from pymongo import MongoClient
+from pymongo.errors import CollectionInvalid
+
+# shared client per uri and collection registry (same approach as app/util/mongo.py,
+# the upload scripts run under brownie without the app modules on the path).
+# databases and collections are listed once per client, not per lookup.
+
+MAX_POOL_SIZE = 20
+
+clients = {}
+database_names = {}
+collection_names = {}
+registry_lock = threading.Lock()
 
 
 def get_client(db_uri:str) -> MongoClient:
-    return MongoClient(db_uri)
+    with registry_lock:
+        if db_uri not in clients:
+            clients[db_uri] = MongoClient(db_uri, maxPoolSize=MAX_POOL_SIZE)
+
+        return clients[db_uri]
 
 
 def get_collection(mongo, db_name, collection_name, create=False):
-    # check if db exists
-    if not db_name in mongo.list_database_names():
-        if create:
-            pass
-        else:
-            logger.error(f"no database '{db_name}' found in {mongo}")
-            return None
-
-    db = mongo[db_name]
-
-    # check source collection exists
-    if not collection_name in db.list_collection_names():
-        if create:
-            logger.info(f"creating collection '{collection_name}' in db")
-            db.create_collection(collection_name)
-        else:
-            logger.error(f"no collection '{collection_name}' found in db")
-            return None
+    with registry_lock:
+        # check if db exists
+        if id(mongo) not in database_names:
+            database_names[id(mongo)] = set(mongo.list_database_names())
+
+        if not db_name in database_names[id(mongo)]:
+            if create:
+                pass
+            else:
+                logger.error(f"no database '{db_name}' found in {mongo}")
+                return None
+
+        db = mongo[db_name]
+        key = (id(mongo), db_name)
+        if key not in collection_names:
+            collection_names[key] = set(db.list_collection_names())
+
+        # check source collection exists
+        if not collection_name in collection_names[key]:
+            if create:
+                logger.info(f"creating collection '{collection_name}' in db")
+                try:
+                    db.create_collection(collection_name)
+                except CollectionInvalid:
+                    pass
+
+                collection_names[key].add(collection_name)
+                database_names[id(mongo)].add(db_name)
+            else:
+                logger.error(f"no collection '{collection_name}' found in db")
+                return None
 
     return db[collection_name]
 
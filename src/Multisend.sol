@@ -0,0 +1,45 @@
+// SPDX-License-Identifier: Apache-2.0
+pragma solidity ^0.8.20;
+
+interface ITransferFrom {
+    function transferFrom(address from, address to, uint256 value) external returns (bool);
+}
+
+/// @dev sends token and eth top ups to many recipients in a single transaction.
+/// tokens are pulled from the sender, the sender needs to approve this contract for the token amounts.
+contract Multisend {
+    error LengthMismatch(uint256 recipients, uint256 tokenAmounts, uint256 ethAmounts);
+    error TokenTransferFailed(address recipient, uint256 value);
+    error EthTransferFailed(address recipient, uint256 value);
+    error EthValueMismatch(uint256 expected, uint256 actual);
+
+    function multisend(
+        address token,
+        address[] calldata recipients,
+        uint256[] calldata tokenAmounts,
+        uint256[] calldata ethAmounts
+    ) external payable {
+        if (recipients.length != tokenAmounts.length || recipients.length != ethAmounts.length) {
+            revert LengthMismatch(recipients.length, tokenAmounts.length, ethAmounts.length);
+        }
+
+        uint256 ethTotal = 0;
+        for (uint256 i = 0; i < recipients.length; i++) {
+            if (tokenAmounts[i] > 0 && !ITransferFrom(token).transferFrom(msg.sender, recipients[i], tokenAmounts[i])) {
+                revert TokenTransferFailed(recipients[i], tokenAmounts[i]);
+            }
+
+            if (ethAmounts[i] > 0) {
+                ethTotal += ethAmounts[i];
+                (bool success,) = recipients[i].call{value: ethAmounts[i]}("");
+                if (!success) {
+                    revert EthTransferFailed(recipients[i], ethAmounts[i]);
+                }
+            }
+        }
+
+        if (ethTotal != msg.value) {
+            revert EthValueMismatch(ethTotal, msg.value);
+        }
+    }
+}
@@ -56,4 +56,15 @@ contract CropProductTest is Test {
         assertEq(product.toString(helloStr), helloString, "unexpected string (b)");
         assertEq(product.length(helloStr), 12, "unexpected string length");
     }
+
+    /// @dev same layout as app/web3utils/short_string.py (to_str), see tests/test_short_string.py
+    function testFuzz_productStringEncoding(bytes memory data) public view {
+        vm.assume(data.length <= 31);
+
+        Str str = product.toStr(string(data));
+
+        assertEq(Str.unwrap(str), bytes32(uint256(bytes32(data)) | data.length), "unexpected str");
+        assertEq(product.length(str), data.length, "unexpected string length");
+        assertEq(bytes(product.toString(str)), data, "unexpected string");
+    }
 }
@@ -0,0 +1,68 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity ^0.8.13;
+
+import {Test, console} from "forge-std/Test.sol";
+import {AccountingToken} from "../src/AccountingToken.sol";
+import {Multisend} from "../src/Multisend.sol";
+
+contract MultisendTest is Test {
+    address deployer = makeAddr("deployer");
+    address personA = makeAddr("personA");
+    address personB = makeAddr("personB");
+
+    AccountingToken public token;
+    Multisend public multisend;
+
+    function setUp() public {
+        vm.deal(deployer, 10 ether);
+        vm.startPrank(deployer);
+        token = new AccountingToken();
+        multisend = new Multisend();
+        vm.stopPrank();
+    }
+
+    function test_multisendTokenAndEth() public {
+        // GIVEN
+        address[] memory recipients = new address[](2);
+        recipients[0] = personA;
+        recipients[1] = personB;
+
+        uint256[] memory tokenAmounts = new uint256[](2);
+        tokenAmounts[0] = 300;
+        tokenAmounts[1] = 0;
+
+        uint256[] memory ethAmounts = new uint256[](2);
+        ethAmounts[0] = 0.005 ether;
+        ethAmounts[1] = 0.005 ether;
+
+        vm.startPrank(deployer);
+        token.approve(address(multisend), 300);
+
+        // WHEN
+        multisend.multisend{value: 0.01 ether}(address(token), recipients, tokenAmounts, ethAmounts);
+        vm.stopPrank();
+
+        // THEN
+        assertEq(token.balanceOf(personA), 300, "unexpected token balance for person a");
+        assertEq(token.balanceOf(personB), 0, "unexpected token balance for person b");
+        assertEq(personA.balance, 0.005 ether, "unexpected eth balance for person a");
+        assertEq(personB.balance, 0.005 ether, "unexpected eth balance for person b");
+        assertEq(token.allowance(deployer, address(multisend)), 0, "unexpected allowance for multisend (after)");
+    }
+
+    function test_multisendEthValueMismatch() public {
+        // GIVEN
+        address[] memory recipients = new address[](1);
+        recipients[0] = personA;
+
+        uint256[] memory tokenAmounts = new uint256[](1);
+        uint256[] memory ethAmounts = new uint256[](1);
+        ethAmounts[0] = 0.005 ether;
+
+        // WHEN + THEN
+        vm.startPrank(deployer);
+        vm.expectRevert(abi.encodeWithSelector(Multisend.EthValueMismatch.selector, 0.005 ether, 0.01 ether));
+        multisend.multisend{value: 0.01 ether}(address(token), recipients, tokenAmounts, ethAmounts);
+        vm.stopPrank();
+    }
+}
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from server import mongo
+from server.model import claim, config, job, location, payout, person, policy, risk  # registers the model indexes
+from server.aio import mongo as aio_mongo
+from server.cache import document_cache, existence_cache
+from server.config import settings
+from server.sync.onchain import onchain
+from util import mongo as util_mongo
+
+# tests run from the repo root with ./app on the path (see pyproject.toml).
+# mongo_db: tests against a real mongodb (MONGO_TEST_URL, e.g. mongodb://localhost:27017/test),
+#   skipped when not set. the database of the url is dropped and the indexes are created before each test.
+# chain: tests against the deployed CropProduct (RPC_NODE_URL, PRODUCT_CONTRACT_ADDRESS, e.g. a local anvil node),
+#   skipped when no product address is set or the rpc node is not reachable.
+
+MONGO_TEST_URL = os.getenv('MONGO_TEST_URL')
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    if not MONGO_TEST_URL:
+        pytest.skip("MONGO_TEST_URL not set")
+
+    monkeypatch.setenv('MONGO_URL', MONGO_TEST_URL)
+    reset_mongo()
+
+    db = mongo.get_mongo().get_database()
+    db.client.drop_database(db.name)
+    mongo.create_all_indexes()
+
+    yield db
+    reset_mongo()
+
+
+@pytest.fixture
+def chain():
+    if not settings.PRODUCT_CONTRACT_ADDRESS:
+        pytest.skip("PRODUCT_CONTRACT_ADDRESS not set")
+
+    onchain.reset()
+    if not onchain.w3.is_connected():
+        pytest.skip(f"rpc node {settings.RPC_NODE_URL} not reachable")
+
+    yield onchain
+    onchain.reset()
+
+
+def reset_mongo() -> None:
+    """Drops clients, collections and cached documents of previous tests."""
+    for module in [mongo, aio_mongo]:
+        module.mongo_client_available = False
+        module.mongo_client = None
+        module.mongo_collections.clear()
+        module.change_streams_available = None
+
+    # async clients are bound to the event loop of the test
+    for key in [key for key in util_mongo.clients if key[0] is not util_mongo.MongoClient]:
+        del util_mongo.clients[key]
+
+    util_mongo.collection_names.clear()
+    document_cache.clear()
+    existence_cache.clear()
@@ -0,0 +1,55 @@
+import pytest
+
+from server import mongo
+from server.aio import mongo as aio_mongo
+from server.error import NotFoundError
+from server.model.location import EXAMPLE_IN, LocationIn, LocationOut
+from util.nanoid import generate_nanoid
+
+# the async data layer returns the same models as the sync server.mongo functions
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_and_find(mongo_db):
+    location = await aio_mongo.create_in_collection(LocationIn(**EXAMPLE_IN), LocationOut)
+
+    found = await aio_mongo.find_in_collection(location.id, LocationOut)
+
+    assert found == location
+    assert mongo.find_in_collection(location.id, LocationOut) == location
+
+
+async def test_find_missing(mongo_db):
+    with pytest.raises(NotFoundError):
+        await aio_mongo.find_in_collection(generate_nanoid(), LocationOut)
+
+
+async def test_list_pages(mongo_db):
+    for index in range(5):
+        await aio_mongo.create_in_collection(LocationIn(**{**EXAMPLE_IN, 'village': f"village {index}"}), LocationOut)
+
+    first = await aio_mongo.get_list_of_models_in_collection(LocationOut, 1, 3)
+    second = await aio_mongo.get_list_of_models_in_collection(LocationOut, 2, 3)
+
+    assert [location.id for location in first] == [location.id for location in mongo.get_list_of_models_in_collection(LocationOut, 1, 3)]
+    assert len(first) == 3
+    assert len(second) == 2
+    assert await aio_mongo.count_documents(LocationOut) == 5
+
+
+async def test_next_cursor(mongo_db):
+    for index in range(5):
+        await aio_mongo.create_in_collection(LocationIn(**{**EXAMPLE_IN, 'village': f"village {index}"}), LocationOut)
+
+    first = await aio_mongo.get_list_of_dicts_in_collection(LocationOut, 1, 2)
+    cursor = await aio_mongo.get_next_cursor_in_collection(LocationOut, 1, 2)
+    assert cursor == mongo.get_next_cursor(first, 2)
+
+    # page numbers and cursors select the same documents
+    second = await aio_mongo.get_list_of_dicts_in_collection(LocationOut, 1, 2, cursor)
+    assert second == await aio_mongo.get_list_of_dicts_in_collection(LocationOut, 2, 2)
+    assert await aio_mongo.get_next_cursor_in_collection(LocationOut, 1, 2, cursor) == await aio_mongo.get_next_cursor_in_collection(LocationOut, 2, 2)
+
+    # last page
+    assert await aio_mongo.get_next_cursor_in_collection(LocationOut, 3, 2) is None
@@ -0,0 +1,42 @@
+import json
+
+from server.api.util import get_cursor_headers, to_json_array
+from server.config import settings
+from server.mongo import decode_cursor
+from server.model.risk import EXAMPLE_OUT, RiskOut
+
+# the json list fast path returns the same fields as the response model of the routes
+
+RISK_ID = "jxmbyupsh1rv"
+
+
+def test_to_json_array():
+    risk = RiskOut(**EXAMPLE_OUT, id=RISK_ID, onchainId="0x1234", tx="ab" * 32)
+
+    # as returned by get_list_of_dicts_in_collection (mongo id renamed to id)
+    document = {**risk.model_dump(), 'internalNote': "not part of the model"}
+
+    assert json.loads(to_json_array(RiskOut, [document])) == [risk.model_dump(mode='json')]
+
+
+def test_to_json_array_fields():
+    document = {'id': RISK_ID, 'crop': "coffee", 'internalNote': "not part of the model"}
+
+    assert json.loads(to_json_array(RiskOut, [document], ["crop", "internalNote"])) == [{'id': RISK_ID, 'crop': "coffee"}]
+
+
+def test_to_json_array_empty():
+    assert json.loads(to_json_array(RiskOut, [])) == []
+
+
+def test_cursor_headers():
+    documents = [{'id': f"{index:012d}"} for index in range(3)]
+
+    # full page, with or without keyset pagination
+    headers = get_cursor_headers(documents, 3)
+    assert decode_cursor(headers[settings.MODEL_CURSOR_HEADER]) == documents[-1]['id']
+
+    # last page or no paging
+    assert get_cursor_headers(documents, 4) == {}
+    assert get_cursor_headers(documents, 0) == {}
+    assert get_cursor_headers([], 3) == {}
@@ -0,0 +1,95 @@
+import pytest
+
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+from server.config import settings
+from server.sync.backfill import EVENT_COLLECTION, decode_log, reconcile_logs
+from server.sync.onchain import ABI_PATH, onchain
+from web3utils.contract import Contract
+
+# reconcile_logs with the contracts of the mock deployment, where the risk set
+# (and instance) address is the product address
+
+PRODUCT_ADDRESS = Web3.to_checksum_address("0x" + "11" * 20)
+TOKEN_ADDRESS = Web3.to_checksum_address("0x" + "22" * 20)
+PRODUCT_NFT_ID = 208000205
+RISK_ID = bytes.fromhex("a1b2c3d4e5f60718")
+POLICY_NFT_ID = 1101
+RISK_TX = "ab" * 32
+POLICY_TX = "cd" * 32
+
+
+@pytest.fixture
+def contracts(monkeypatch):
+    w3 = Web3()
+    product = Contract(w3, "CropProduct", PRODUCT_ADDRESS, out_path=ABI_PATH)
+    token = Contract(w3, "AccountingToken", TOKEN_ADDRESS, out_path=ABI_PATH)
+    risk_set = Contract(w3, "RiskSet", PRODUCT_ADDRESS, out_path=ABI_PATH)
+
+    monkeypatch.setattr(onchain, '_handles', {'w3': w3, 'product': product, 'token': token, 'riskSet': risk_set})
+
+    # same mapping as built by backfill
+    return {
+        PRODUCT_ADDRESS.lower(): [product, risk_set],
+        TOKEN_ADDRESS.lower(): [token]}
+
+
+def get_log(topics: list, data: bytes, tx: str, log_index: int) -> AttributeDict:
+    # as returned by eth_getLogs
+    return AttributeDict({
+        'address': PRODUCT_ADDRESS,
+        'topics': [HexBytes(topic) for topic in topics],
+        'data': HexBytes(data),
+        'blockNumber': 100,
+        'blockHash': HexBytes("ee" * 32),
+        'transactionHash': HexBytes(tx),
+        'transactionIndex': 0,
+        'logIndex': log_index})
+
+
+def get_risk_log() -> AttributeDict:
+    topic = onchain.riskSet.contract.events.LogRiskSetRiskAdded.topic
+    return get_log([topic, encode(['uint96'], [PRODUCT_NFT_ID]), RISK_ID.ljust(32, b'\x00')], b'', RISK_TX, 0)
+
+
+def get_policy_log() -> AttributeDict:
+    topic = onchain.product.contract.events.LogCropPolicyCreated.topic
+    return get_log([topic], encode(['uint96'], [POLICY_NFT_ID]), POLICY_TX, 1)
+
+
+def test_decode_log(contracts):
+    (contract, event) = decode_log(contracts[PRODUCT_ADDRESS.lower()], get_risk_log())
+    assert contract.name == "RiskSet"
+    assert event.args.riskId == RISK_ID
+
+    (contract, event) = decode_log(contracts[PRODUCT_ADDRESS.lower()], get_policy_log())
+    assert contract.name == "CropProduct"
+    assert event.args.policyNftId == POLICY_NFT_ID
+
+    assert decode_log(contracts[TOKEN_ADDRESS.lower()], get_policy_log()) == (None, None)
+
+
+def test_reconcile_logs(contracts, mongo_db):
+    id_attr = settings.MONGO_ID_ATTRIBUTE
+    mongo_db['Risk'].insert_one({id_attr: "jxmbyupsh1rv", 'tx': f"0x{RISK_TX}", 'risk_id': None})
+    mongo_db['Policy'].insert_one({id_attr: "7Zv4TZoBLxUi", 'tx': POLICY_TX, 'nft': None})
+
+    counts = reconcile_logs(contracts, [get_risk_log(), get_policy_log()])
+
+    assert counts == {'events': 2, 'risks': 1, 'policies': 1}
+    assert mongo_db['Risk'].find_one({id_attr: "jxmbyupsh1rv"})['risk_id'] == f"0x{RISK_ID.hex()}"
+    assert mongo_db['Policy'].find_one({id_attr: "7Zv4TZoBLxUi"})['nft'] == POLICY_NFT_ID
+
+    events = {event['event']: event for event in mongo_db[EVENT_COLLECTION].find()}
+    assert events['LogRiskSetRiskAdded']['contract'] == "RiskSet"
+    assert events['LogRiskSetRiskAdded']['args']['riskId'] == f"0x{RISK_ID.hex()}"
+    assert events['LogCropPolicyCreated']['contract'] == "CropProduct"
+    assert events['LogCropPolicyCreated']['address'] == PRODUCT_ADDRESS
+    assert events['LogCropPolicyCreated']['args']['policyNftId'] == POLICY_NFT_ID
+
+    # rerun of the same block range (e.g. after a restart) updates the same documents
+    reconcile_logs(contracts, [get_risk_log(), get_policy_log()])
+    assert mongo_db[EVENT_COLLECTION].count_documents({}) == 2
@@ -0,0 +1,67 @@
+import pytest
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+from server.error import SyncError
+from server.sync.onchain import ABI_PATH, send_tx
+from web3utils.contract import Contract
+from web3utils.nonce import get_nonce_manager
+from web3utils.wallet import Wallet
+
+# send errors of contract write methods: the original error is raised and the sender nonce resynced
+
+MNEMONIC = "test test test test test test test test test test test junk"
+PRODUCT_ADDRESS = Web3.to_checksum_address("0x" + "11" * 20)
+NONCE = 5
+
+
+class FailingSendProvider(BaseProvider):
+    """Answers the tx field requests, fails to send raw transactions."""
+
+    RESULTS = {'eth_chainId': hex(31337), 'eth_gasPrice': hex(10 ** 9), 'eth_getTransactionCount': hex(NONCE)}
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.requests = []
+
+    def make_request(self, method, params):
+        self.requests.append(method)
+
+        if method == 'eth_sendRawTransaction':
+            raise ConnectionError("connection to node lost")
+
+        return {'jsonrpc': '2.0', 'id': 1, 'result': self.RESULTS[method]}
+
+
+@pytest.fixture
+def product():
+    return Contract(Web3(FailingSendProvider()), "CropProduct", PRODUCT_ADDRESS, out_path=ABI_PATH)
+
+
+@pytest.fixture
+def operator():
+    return Wallet.from_mnemonic(MNEMONIC, index=0)
+
+
+def test_write_send_error(product, operator):
+    nonce_manager = get_nonce_manager(product.w3)
+
+    with pytest.raises(ConnectionError, match="connection to node lost"):
+        product.createLocation(b'\x00' * 32, 1, 2, {'from': operator, 'wait': False})
+
+    # resynced, the next tx fetches the pending nonce again instead of skipping the unused one
+    assert operator.address not in nonce_manager._nonces
+    assert nonce_manager.next_nonce(operator.address) == NONCE
+    assert product.w3.provider.requests.count('eth_getTransactionCount') == 2
+
+
+def test_write_without_sender(product):
+    with pytest.raises(ValueError, match="'from'"):
+        product.createLocation(b'\x00' * 32, 1, 2, {'wait': False})
+
+
+def test_send_tx_error(product, operator):
+    with pytest.raises(SyncError, match="createLocation of location 1 failed: ConnectionError") as error:
+        send_tx("createLocation of location 1", lambda: product.createLocation(b'\x00' * 32, 1, 2, {'from': operator, 'wait': False}))
+
+    assert isinstance(error.value.__cause__, ConnectionError)
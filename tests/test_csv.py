@@ -0,0 +1,59 @@
+import csv
+import inspect
+import io
+
+import pytest
+
+from server.api import claim, config, location, payout, person, policy, risk
+from server.api.util import get_csv_response
+from server.aio import mongo as aio_mongo
+from server.config import settings
+from server.model.location import EXAMPLE_IN, LocationIn, LocationOut
+from util.csv import stream_csv
+
+# csv exports contain the complete collection unless items is set
+
+pytestmark = pytest.mark.anyio
+
+ROUTERS = [claim.router, config.router, location.router, payout.router, person.router, policy.router, risk.router]
+LOCATIONS = 2 * settings.MONGO_DOCUMENTS_PER_PAGE + 1
+
+
+async def to_async_iterator(rows: list[dict]):
+    for row in rows:
+        yield row
+
+
+async def read_csv(chunks) -> list[dict]:
+    content = b"".join([chunk async for chunk in chunks]).decode('utf-8')
+    return list(csv.DictReader(io.StringIO(content), delimiter=settings.MODEL_CSV_DELIMITER))
+
+
+@pytest.mark.parametrize('router', ROUTERS)
+def test_csv_route_default_items(router):
+    (route,) = [route for route in router.routes if route.path.endswith("/all/csv")]
+    assert inspect.signature(route.endpoint).parameters['items'].default == settings.MODEL_CSV_ITEMS == 0
+
+
+async def test_stream_csv():
+    rows = [{'id': str(index), 'village': f"village {index}", 'ignored': index} for index in range(2500)]
+    chunks = [chunk async for chunk in stream_csv(['id', 'village'], to_async_iterator(rows), settings.MODEL_CSV_DELIMITER, 1000)]
+
+    assert len(chunks) == 3
+    assert await read_csv(to_async_iterator(chunks)) == [{'id': row['id'], 'village': row['village']} for row in rows]
+
+
+async def test_csv_export(mongo_db):
+    for index in range(LOCATIONS):
+        await aio_mongo.create_in_collection(LocationIn(**{**EXAMPLE_IN, 'village': f"village {index}"}), LocationOut)
+
+    response = await get_csv_response(LocationOut, "id,village", settings.MODEL_CSV_DELIMITER, 1, settings.MODEL_CSV_ITEMS, None)
+    rows = await read_csv(response.body_iterator)
+
+    assert len(rows) == LOCATIONS
+    assert settings.MODEL_CURSOR_HEADER not in response.headers
+
+    # paged export
+    response = await get_csv_response(LocationOut, "id,village", settings.MODEL_CSV_DELIMITER, 1, settings.MONGO_DOCUMENTS_PER_PAGE, None)
+    assert len(await read_csv(response.body_iterator)) == settings.MONGO_DOCUMENTS_PER_PAGE
+    assert settings.MODEL_CURSOR_HEADER in response.headers
@@ -0,0 +1,72 @@
+import pytest
+
+from server.error import IndexCreationError
+from server.model.claim import ClaimOut
+from server.model.job import JobOut
+from server.model.payout import PayoutOut
+from server.model.person import PersonOut
+from server.model.policy import PolicyOut
+from server.model.risk import RiskOut
+from server.mongo import create_indexes, find_duplicates, get_collection_for_class, get_indexes
+
+# the queries issued by the server and the sync worker must be answered by an
+# index scan (IXSCAN) of the indexes declared by the models, not a collection scan (COLLSCAN)
+
+QUERIES = [
+    (ClaimOut, {"policyId": "7Zv4TZoBLxUi"}),
+    (PayoutOut, {"policyId": "7Zv4TZoBLxUi"}),
+    (PolicyOut, {"riskId": "jxmbyupsh1rv"}),
+    (PolicyOut, {"personId": "jxmbyupsh1rv"}),
+    (PolicyOut, {"externalId": "ABC123"}),
+    (PolicyOut, {"tx": None}),
+    (PolicyOut, {"tx": {"$in": ["a1b2", "0xa1b2"]}}),
+    (PersonOut, {"locationId": "kDho7606IRdr"}),
+    (PersonOut, {"externalId": "PRS1234"}),
+    (PersonOut, {"wallet": "0x2769786a7f3f3b3b3b3b3b3b3b3b3b3b3b3b3b3b"}),
+    (PersonOut, {"walletIndex": {"$type": "number"}}),
+    (PersonOut, {"tx": None}),
+    (RiskOut, {"configId": "7Zv4TZoBLxUi"}),
+    (RiskOut, {"locationId": "kDho7606IRdr"}),
+    (RiskOut, {"tx": {"$in": ["a1b2", "0xa1b2"]}}),
+    (JobOut, {"activeKey": "policy_sync:7Zv4TZoBLxUi"}),
+    (JobOut, {"status": "queued", "runAfter": {"$lte": 1700316957}}),
+]
+
+
+@pytest.mark.parametrize("cls, query", QUERIES)
+def test_query_uses_index(mongo_db, cls, query):
+    collection = get_collection_for_class(cls)
+    stages = get_stages(collection.find(query).explain()['queryPlanner']['winningPlan'])
+
+    assert 'IXSCAN' in stages
+    assert 'COLLSCAN' not in stages
+
+
+def test_unique_index_over_duplicates(mongo_db):
+    collection = get_collection_for_class(PersonOut)
+    collection.drop_indexes()
+    collection.insert_many([{'_id': "person00001a", 'walletIndex': 7}, {'_id': "person00002a", 'walletIndex': 7}, {'_id': "person00003a", 'walletIndex': None}])
+
+    (index,) = [index for index in get_indexes(collection.name) if index.document.get('unique')]
+    duplicates = find_duplicates(collection, index)
+    assert [(duplicate['key'], sorted(duplicate['ids'])) for duplicate in duplicates] == [({'walletIndex': 7}, ["person00001a", "person00002a"])]
+
+    with pytest.raises(IndexCreationError):
+        create_indexes(collection)
+
+
+def get_stages(plan) -> list[str]:
+    """Returns the stage names of the (nested) query plan."""
+    stages = []
+
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(get_stages(value))
+
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(get_stages(value))
+
+    return stages
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from server.aio.payout import process_risk_payouts
+from server.config import settings
+from server.model.risk import RiskOut
+from util.nanoid import generate_nanoid
+
+# claims and payouts of a risk, repeated and concurrent runs create one claim and one payout per policy
+
+pytestmark = pytest.mark.anyio
+
+RISK_ID = "jxmbyupsh1rv"
+POLICIES = 5
+WALLET = "0x2769786a7f3f3b3b3b3b3b3b3b3b3b3b3b3b3b3b"
+
+
+@pytest.fixture
+def risk(mongo_db):
+    id_attr = settings.MONGO_ID_ATTRIBUTE
+    person_id = generate_nanoid()
+    mongo_db['Person'].insert_one({id_attr: person_id, 'wallet': WALLET})
+    mongo_db['Policy'].insert_many([
+        {id_attr: generate_nanoid(), 'riskId': RISK_ID, 'personId': person_id, 'sumInsuredAmount': 1000.0}
+        for _ in range(POLICIES)])
+
+    return RiskOut.model_construct(id=RISK_ID, finalPayout=0.5)
+
+
+def get_policy_ids(mongo_db, collection_name: str) -> list[str]:
+    return [document['policyId'] for document in mongo_db[collection_name].find()]
+
+
+async def test_process_twice(mongo_db, risk):
+    first = await process_risk_payouts(risk)
+    second = await process_risk_payouts(risk)
+
+    assert (first['claims'], first['payouts'], first['payoutAmount']) == (POLICIES, POLICIES, POLICIES * 500)
+    assert (second['claims'], second['payouts'], second['skipped']) == (0, 0, POLICIES)
+
+    claim_policy_ids = get_policy_ids(mongo_db, 'Claim')
+    assert len(claim_policy_ids) == len(set(claim_policy_ids)) == POLICIES
+    assert sorted(get_policy_ids(mongo_db, 'Payout')) == sorted(claim_policy_ids)
+    assert {payout['beneficiary'] for payout in mongo_db['Payout'].find()} == {WALLET}
+
+
+async def test_process_concurrently(mongo_db, risk):
+    await asyncio.gather(process_risk_payouts(risk), process_risk_payouts(risk))
+
+    claims = {claim['policyId']: claim[settings.MONGO_ID_ATTRIBUTE] for claim in mongo_db['Claim'].find()}
+    payouts = list(mongo_db['Payout'].find())
+
+    assert mongo_db['Claim'].count_documents({}) == len(claims) == POLICIES
+    assert len(payouts) == POLICIES
+    assert all(payout['claimId'] == claims[payout['policyId']] for payout in payouts)
+
+
+async def test_interrupted_run(mongo_db, risk):
+    # claim created, payout missing
+    policy = mongo_db['Policy'].find_one()
+    claim_id = generate_nanoid()
+    mongo_db['Claim'].insert_one({settings.MONGO_ID_ATTRIBUTE: claim_id, 'policyId': policy[settings.MONGO_ID_ATTRIBUTE]})
+
+    result = await process_risk_payouts(risk)
+
+    assert (result['claims'], result['payouts']) == (POLICIES - 1, POLICIES)
+    assert mongo_db['Payout'].find_one({'policyId': policy[settings.MONGO_ID_ATTRIBUTE]})['claimId'] == claim_id
+
+
+async def test_person_without_wallet(mongo_db, risk):
+    mongo_db['Person'].delete_many({})
+
+    result = await process_risk_payouts(risk)
+
+    assert result['payouts'] == POLICIES
+    assert {payout['beneficiary'] for payout in mongo_db['Payout'].find()} == {""}
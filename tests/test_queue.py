@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+from web3.exceptions import TransactionNotFound
+
+from server.config import settings
+from server.model.job import JobOut
+from server.mongo import get_collection_for_class
+from server.queue import (
+    ACTIVE_KEY, JOB_POLICY_SYNC, STATUS_DONE, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING,
+    claim_next_job, complete_job, enqueue_job, fail_job)
+from server.sync.force import needs_sync
+from server.sync.jobs import get_job_params
+from server.sync.onchain import onchain
+
+# forced requests for entities with an active job, and retries of forced jobs
+
+OPERATOR = "0x" + "aa" * 20
+POLICY_ID = "7Zv4TZoBLxUi"
+SINCE_NONCE = 10
+
+
+def find_active_job(key: str) -> JobOut | None:
+    document = get_collection_for_class(JobOut).find_one({ACTIVE_KEY: key})
+    return JobOut.fromMongoDict(document) if document else None
+
+
+@pytest.mark.anyio
+async def test_force_queued_job(mongo_db):
+    job = await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": False})
+    forced = await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": True})
+
+    assert forced.id == job.id
+    assert (forced.status, forced.params, forced.followUp) == (STATUS_QUEUED, {"force": True}, None)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('outcome', [STATUS_DONE, STATUS_FAILED])
+async def test_force_running_job(mongo_db, outcome):
+    job = await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": False})
+    running = claim_next_job("worker-1")
+
+    forced = await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": True})
+    assert (forced.id, forced.status, forced.followUp) == (job.id, STATUS_RUNNING, {"force": True})
+
+    if outcome == STATUS_DONE:
+        complete_job(running)
+    else:
+        running.attempts = running.maxAttempts
+        fail_job(running, "RuntimeError: failed")
+
+    follow_up = find_active_job(job.key)
+    assert follow_up.id != job.id
+    assert (follow_up.status, follow_up.params, follow_up.attempts) == (STATUS_QUEUED, {"force": True}, 0)
+    assert mongo_db['Job'].find_one({settings.MONGO_ID_ATTRIBUTE: job.id})['status'] == outcome
+
+
+@pytest.mark.anyio
+async def test_force_completed_job(mongo_db):
+    await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": False})
+    complete_job(claim_next_job("worker-1"))
+
+    forced = await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": True})
+    assert (forced.status, forced.params) == (STATUS_QUEUED, {"force": True})
+
+
+@pytest.mark.anyio
+async def test_forced_job_nonce(mongo_db, monkeypatch):
+    eth = SimpleNamespace(get_transaction_count=lambda address, block: SINCE_NONCE)
+    monkeypatch.setattr(onchain, '_handles', {'w3': SimpleNamespace(eth=eth), 'operator': SimpleNamespace(address=OPERATOR)})
+
+    await enqueue_job(JOB_POLICY_SYNC, POLICY_ID, {"force": True})
+    job = claim_next_job("worker-1")
+
+    assert get_job_params(job) == {"force": True, "sinceNonce": SINCE_NONCE}
+
+    # retries keep the nonce of the first attempt
+    eth.get_transaction_count = lambda address, block: SINCE_NONCE + 3
+    fail_job(job, "RuntimeError: failed")
+    retry = find_active_job(job.key)
+    assert get_job_params(retry) == {"force": True, "sinceNonce": SINCE_NONCE}
+
+
+@pytest.fixture
+def transactions(monkeypatch):
+    transactions = {
+        "01" * 32: {'from': OPERATOR, 'nonce': SINCE_NONCE - 1},
+        "02" * 32: {'from': OPERATOR, 'nonce': SINCE_NONCE},
+        "03" * 32: {'from': "0x" + "bb" * 20, 'nonce': SINCE_NONCE + 1}}
+
+    def get_transaction(tx):
+        if tx.hex() not in transactions:
+            raise TransactionNotFound(f"transaction {tx.hex()} not found")
+
+        return transactions[tx.hex()]
+
+    eth = SimpleNamespace(get_transaction=get_transaction)
+    monkeypatch.setattr(onchain, '_handles', {'w3': SimpleNamespace(eth=eth), 'operator': SimpleNamespace(address=OPERATOR)})
+
+
+@pytest.mark.parametrize('tx,force,since_nonce,expected', [
+    (None, False, None, True),
+    ("01" * 32, False, None, False),
+    ("01" * 32, True, None, True),
+    # retry of a forced job: txs sent by the operator since the nonce are skipped
+    ("01" * 32, True, SINCE_NONCE, True),
+    ("02" * 32, True, SINCE_NONCE, False),
+    ("0x" + "02" * 32, True, SINCE_NONCE, False),
+    ("03" * 32, True, SINCE_NONCE, True),
+    ("04" * 32, True, SINCE_NONCE, True),
+])
+def test_needs_sync(transactions, tx, force, since_nonce, expected):
+    assert needs_sync(tx, force, since_nonce) == expected
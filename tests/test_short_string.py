@@ -0,0 +1,87 @@
+import random
+import string
+
+import pytest
+
+from server.sync.risk import get_risk_id
+from web3utils.batch import batch_call
+from web3utils.short_string import STR_MAX_LENGTH, from_str, str_length, to_str
+
+# the local short string (Str) encoding (web3utils.short_string) against the OZ
+# ShortStrings layout and against CropProduct.toStr/toString of a deployed product.
+# inputs are random strings of 0..31 bytes, seeded to make failures reproducible.
+
+SEED = 4711
+SAMPLES = 200
+ALPHABET = string.ascii_letters + string.digits + "-_:. " + "äöüéñ€漢字"
+
+
+def random_strings(samples: int = SAMPLES, seed: int = SEED) -> list[str]:
+    rng = random.Random(seed)
+    values = []
+
+    while len(values) < samples:
+        value = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, STR_MAX_LENGTH)))
+
+        # multi byte characters may exceed the 31 bytes of a Str
+        if len(value.encode('utf-8')) <= STR_MAX_LENGTH:
+            values.append(value)
+
+    return values
+
+
+def oz_short_string(value: str) -> bytes:
+    # ShortStrings.toShortString: bytes32(uint256(bytes32(bytes(str))) | bytes(str).length)
+    data = value.encode('utf-8')
+    return (int.from_bytes(data.ljust(32, b'\x00'), 'big') | len(data)).to_bytes(32, 'big')
+
+
+@pytest.mark.parametrize('value', random_strings())
+def test_to_str(value):
+    sstr = to_str(value)
+
+    assert len(sstr) == 32
+    assert sstr == oz_short_string(value)
+    assert str_length(sstr) == len(value.encode('utf-8'))
+    assert from_str(sstr) == value
+
+
+@pytest.mark.parametrize('value', ["", "a" * STR_MAX_LENGTH, "€" * 10])
+def test_to_str_limits(value):
+    assert from_str(to_str(value)) == value
+
+
+@pytest.mark.parametrize('value', ["a" * (STR_MAX_LENGTH + 1), "€" * 11])
+def test_to_str_too_long(value):
+    with pytest.raises(ValueError):
+        to_str(value)
+
+
+@pytest.mark.parametrize('sstr', [b'', b'\x00' * 31, b'\x00' * 31 + bytes([STR_MAX_LENGTH + 1])])
+def test_str_length_invalid(sstr):
+    with pytest.raises(ValueError):
+        str_length(sstr)
+
+
+def test_to_str_onchain(chain):
+    for value in random_strings(50):
+        sstr = to_str(value)
+
+        assert chain.product.toStr(value) == sstr
+        assert chain.product.toString(sstr) == value
+
+
+def test_risk_id_onchain(chain):
+    # risk ids are derived from the onchain risk counter, getRiskId looks them up by the Str of the risk id
+    ids = ["".join(random.Random(SEED + index).choices(string.ascii_letters + string.digits, k=12)) for index in range(3)]
+    risk_ids = []
+
+    for id in ids:
+        tx = chain.product.createRisk(to_str(id), to_str("season"), to_str("location"), to_str("maize"), 0, {'from': chain.operator})
+        risk_ids.append(get_risk_id(chain.w3, tx))
+
+    assert [f"0x{chain.product.getRiskId(to_str(id)).hex()}" for id in ids] == risk_ids
+
+    # as used by the bulk sync for risks without risk id
+    onchain_risk_ids = batch_call(chain.w3, [chain.product.contract.functions.getRiskId(to_str(id)) for id in ids])
+    assert [f"0x{risk_id.hex()}" for risk_id in onchain_risk_ids] == risk_ids